@@ -117,6 +117,13 @@ class BotConfig:
         if cls._storage is None:
             cls._storage = get_storage(resolve_base_dir())
         return cls._storage
+
+    @classmethod
+    def close_storage(cls):
+        """Flush pending writes and close the shared storage backend."""
+        if cls._storage is not None:
+            cls._storage.close()
+            cls._storage = None
     
     @classmethod
     def ensure_guild_setup(cls, guild_id: int):
@@ -0,0 +1,221 @@
+"""
+Discord edit scheduling for Beanie Bot.
+Plans minimal channel edits and paces them with per-guild token buckets.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+# Discord's documented budgets: about 5 channel PATCHes per 10s per guild, and
+# name/topic changes are capped at 2 per 10 minutes for each channel. Member
+# PATCHes (role changes) are limited separately from channel edits.
+GUILD_EDIT_RATE = (5, 10.0)
+MEMBER_EDIT_RATE = (10, 10.0)
+ROUTE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "channel_rename": (2, 600.0),
+}
+
+
+class TokenBucket:
+    """
+    Token bucket allowing ``capacity`` operations per ``period`` seconds.
+
+    Tokens refill continuously, so a full bucket allows a burst of ``capacity``
+    and then one operation every ``period / capacity`` seconds.
+    """
+
+    def __init__(self, capacity: int, period: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0.0 if one is available now)."""
+        now = self.clock()
+        self._refill(now)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        """Consume a token; callers wait for ``delay()`` first."""
+        self._refill(self.clock())
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Hold the bucket empty for ``seconds`` (e.g. from a 429 ``retry_after``)."""
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+        self.tokens = min(self.tokens, 0.0)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Extract the server's retry delay from a rate-limit error, or None if it isn't one."""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        headers = getattr(error.response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After", 1.0))
+        except (TypeError, ValueError):
+            return 1.0
+    return None
+
+
+def _rate_limit_scope(error: Exception) -> Optional[str]:
+    """Scope of a 429: "user" (per route), "shared", "global", or None when the error doesn't say."""
+    if not isinstance(error, discord.HTTPException):
+        return None
+    headers = getattr(error.response, "headers", None) or {}
+    if str(headers.get("X-RateLimit-Global", "")).lower() == "true":
+        return "global"
+    scope = headers.get("X-RateLimit-Scope")
+    return scope if scope in ("user", "shared", "global") else None
+
+
+class EditScheduler:
+    """
+    Paces Discord edits through a token bucket per guild plus per-route buckets.
+
+    Channel and member edits spend separate per-guild budgets, so neither
+    waits on the other, and guilds never wait on each other. A route-scoped 429
+    pauses the bucket it hit for the server's ``retry_after`` before the edit is
+    retried; a shared or unscoped one pauses every bucket the edit spends, and a
+    global one pauses every bucket the scheduler knows about.
+    """
+
+    def __init__(self, guild_rate: Tuple[int, float] = GUILD_EDIT_RATE,
+                 member_rate: Tuple[int, float] = MEMBER_EDIT_RATE,
+                 route_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+                 max_retries: int = 3, max_wait: float = 120.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the scheduler.
+
+        Args:
+            guild_rate: (channel edits, seconds) allowed per guild
+            member_rate: (member edits, seconds) allowed per guild
+            route_limits: (edits, seconds) per route name, applied per route key
+            max_retries: Attempts per edit when rate limited
+            max_wait: Edits that would wait longer than this are deferred instead
+            clock: Monotonic clock (injectable for tests)
+        """
+        self.guild_rate = guild_rate
+        self.member_rate = member_rate
+        self.route_limits = ROUTE_LIMITS if route_limits is None else route_limits
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.clock = clock
+        self.buckets: Dict[tuple, TokenBucket] = {}
+        self.locks: Dict[tuple, asyncio.Lock] = {}
+
+    def _bucket(self, key: tuple, limit: Tuple[int, float]) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(*limit, clock=self.clock)
+        return bucket
+
+    def _buckets_for(self, guild_id: int, members: bool, route: Optional[str], route_key) -> List[TokenBucket]:
+        if members:
+            buckets = [self._bucket(("members", guild_id), self.member_rate)]
+        else:
+            buckets = [self._bucket(("guild", guild_id), self.guild_rate)]
+        if route in self.route_limits:
+            buckets.append(self._bucket((route, route_key), self.route_limits[route]))
+        return buckets
+
+    async def run(self, guild_id: int, edit: Callable[[], Awaitable], route: Optional[str] = None,
+                  route_key=None, members: bool = False) -> bool:
+        """
+        Run one edit once the guild (and route) buckets allow it.
+
+        Args:
+            guild_id: Guild whose budget the edit spends
+            edit: Zero-argument callable returning the edit coroutine
+            route: Optional route name from ``route_limits`` (e.g. "channel_rename")
+            route_key: Identifies the route bucket, e.g. the channel id
+            members: Spend the guild's member-edit budget instead of the channel one
+
+        Returns:
+            True if the edit was applied, False if it was deferred or failed
+        """
+        lock = self.locks.setdefault(("members" if members else "guild", guild_id), asyncio.Lock())
+        buckets = self._buckets_for(guild_id, members, route, route_key)
+        async with lock:
+            for attempt in range(1, self.max_retries + 1):
+                wait = max(bucket.delay() for bucket in buckets)
+                if wait > self.max_wait:
+                    logging.info(f"Deferring edit in guild {guild_id} ({route or 'edit'} {route_key}): wait {wait:.0f}s")
+                    return False
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                for bucket in buckets:
+                    bucket.take()
+                try:
+                    await edit()
+                    return True
+                except (discord.RateLimited, discord.HTTPException) as e:
+                    retry_after = _retry_after(e)
+                    if retry_after is None:
+                        logging.error(f"Edit failed in guild {guild_id} ({route or 'edit'} {route_key}): {e}")
+                        return False
+                    logging.warning(f"Rate limited in guild {guild_id}, retry after {retry_after:.1f}s (attempt {attempt})")
+                    scope = _rate_limit_scope(e)
+                    if scope == "global":
+                        paused = list(self.buckets.values())
+                    elif scope == "user":
+                        paused = buckets[-1:]
+                    else:
+                        paused = buckets
+                    for bucket in paused:
+                        bucket.pause(retry_after)
+            logging.error(f"Rate limited {self.max_retries}x in guild {guild_id} ({route or 'edit'} {route_key}), skipping")
+            return False
+
+
+_SHARED_SCHEDULER: Optional[EditScheduler] = None
+
+
+def get_edit_scheduler() -> EditScheduler:
+    """Get the process-wide scheduler so every feature spends the same guild budgets."""
+    global _SHARED_SCHEDULER
+    if _SHARED_SCHEDULER is None:
+        _SHARED_SCHEDULER = EditScheduler()
+    return _SHARED_SCHEDULER
+
+
+def plan_channel_edits(desired: List[Tuple[int, str]],
+                       current: Dict[int, Tuple[Optional[str], Optional[int]]]) -> List[Tuple[int, dict]]:
+    """
+    Compute the minimal channel edits to render a ranked list of channel names.
+
+    Args:
+        desired: (channel_id, name) pairs in display order
+        current: {channel_id: (name, position)} as last rendered; unknown
+            values (None) always count as changed
+
+    Returns:
+        (channel_id, edit kwargs) for each channel whose name or position differs
+    """
+    edits = []
+    for position, (channel_id, name) in enumerate(desired):
+        current_name, current_position = current.get(channel_id, (None, None))
+        changes = {}
+        if current_name != name:
+            changes["name"] = name
+        if current_position != position:
+            changes["position"] = position
+        if changes:
+            edits.append((channel_id, changes))
+    return edits
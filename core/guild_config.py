@@ -8,6 +8,7 @@ import logging
 from typing import List
 
 import discord
+from core.ranks import validate_thresholds
 from core.storage import get_storage, resolve_base_dir
 
 
@@ -26,6 +27,7 @@ class GuildConfig:
         self.guilds_dir = os.path.join(self.data_dir, "guilds")
         self.sfx_dir = os.path.join(self.data_dir, "sfx")
         self.guild_dir = os.path.join(self.guilds_dir, self.guild_id)
+        self.version = 0  # Bumped on every save so derived data (rank tables) can be cached
         self._config = self._load_guild_config()
     
     def _ensure_guild_directory(self):
@@ -92,6 +94,7 @@ class GuildConfig:
     
     def _save_guild_config(self, config):
         """Save guild configuration."""
+        self.version += 1
         try:
             get_storage(self.base_dir).save_guild_config(int(self.guild_id), config)
             logging.info(f"Saved guild config for {self.guild_id}")
@@ -205,6 +208,15 @@ class GuildConfig:
         self._config["rank_role_ids"] = role_ids
         self._save_guild_config(self._config)
     
+    def get_rank_thresholds(self) -> list:
+        """Get per-rank minimum hours, or None to use the defaults."""
+        return self._config.get("rank_thresholds")
+    
+    def set_rank_thresholds(self, thresholds: list):
+        """Set per-rank minimum hours (None restores the defaults)."""
+        self._config["rank_thresholds"] = validate_thresholds(thresholds) if thresholds is not None else None
+        self._save_guild_config(self._config)
+    
     def is_feature_enabled(self, feature_name: str) -> bool:
         """Check if a feature is enabled for this guild."""
         return self._config.get("features", {}).get(feature_name, True)
@@ -0,0 +1,158 @@
+"""
+Pre-transcoded Opus audio for Beanie Bot.
+Transcodes sound files once into Opus packet files and plays them without FFmpeg.
+"""
+
+import io
+import logging
+import mmap
+import os
+import struct
+import subprocess
+from typing import Iterable, Iterator, Optional
+
+import discord
+from discord.oggparse import OggStream
+
+PACKET_SUFFIX = ".opuspk"
+
+# File layout: magic, then one little-endian u16 length + Opus packet per 20ms frame
+_MAGIC = b"BOPK\x01"
+_LENGTH = struct.Struct("<H")
+
+# Matches the encoder settings discord.py uses for FFmpegOpusAudio
+_FFMPEG_ARGS = (
+    "-map_metadata", "-1", "-vn",
+    "-c:a", "libopus", "-ar", "48000", "-ac", "2", "-b:a", "96k",
+    "-frame_duration", "20", "-application", "audio",
+    "-loglevel", "warning", "-f", "opus", "pipe:1",
+)
+_TRANSCODE_TIMEOUT = 60
+
+
+def opus_path_for(source: str) -> str:
+    """Path of the packet file transcoded from ``source``."""
+    return f"{source}{PACKET_SUFFIX}"
+
+
+def is_fresh(source: str, packet_path: Optional[str] = None) -> bool:
+    """True if the packet file exists and is not older than ``source``."""
+    packet_path = packet_path or opus_path_for(source)
+    try:
+        return os.path.getmtime(packet_path) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def write_packet_file(packets: Iterable[bytes], dest: str) -> int:
+    """
+    Atomically write Opus packets to ``dest``.
+
+    Args:
+        packets: Raw Opus packets, one per frame
+        dest: Destination packet file
+
+    Returns:
+        Number of packets written
+    """
+    tmp_path = f"{dest}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            for packet in packets:
+                f.write(_LENGTH.pack(len(packet)))
+                f.write(packet)
+                count += 1
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def _audio_packets(ogg: bytes) -> Iterator[bytes]:
+    for packet in OggStream(io.BytesIO(ogg)).iter_packets():
+        # Skip the Ogg Opus identification and comment headers
+        if packet.startswith((b"OpusHead", b"OpusTags")):
+            continue
+        yield packet
+
+
+def transcode_to_opus(source: str, dest: Optional[str] = None, executable: str = "ffmpeg") -> str:
+    """
+    Transcode an audio file into an Opus packet file with a single FFmpeg run.
+
+    Args:
+        source: Input audio file (mp3, ogg, ...)
+        dest: Output packet file (defaults to ``opus_path_for(source)``)
+        executable: FFmpeg binary
+
+    Returns:
+        Path of the packet file
+
+    Raises:
+        RuntimeError: If FFmpeg fails or produces no audio
+    """
+    dest = dest or opus_path_for(source)
+    result = subprocess.run(
+        [executable, "-i", source, *_FFMPEG_ARGS],
+        stdin=subprocess.DEVNULL, capture_output=True, timeout=_TRANSCODE_TIMEOUT,
+    )
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"FFmpeg failed to transcode {source}: {error[-300:]}")
+    if not write_packet_file(_audio_packets(result.stdout), dest):
+        os.remove(dest)
+        raise RuntimeError(f"FFmpeg produced no audio for {source}")
+    logging.info(f"Transcoded {source} -> {dest}")
+    return dest
+
+
+def ensure_opus(source: str, executable: str = "ffmpeg") -> str:
+    """Packet file for ``source``, transcoding only if it is missing or stale."""
+    dest = opus_path_for(source)
+    if is_fresh(source, dest):
+        return dest
+    return transcode_to_opus(source, dest, executable)
+
+
+def remove_opus(source: str):
+    """Delete the packet file transcoded from ``source``, if any."""
+    try:
+        os.remove(opus_path_for(source))
+    except FileNotFoundError:
+        pass
+
+
+class OpusPacketSource(discord.AudioSource):
+    """
+    Opus passthrough source that streams a memory-mapped packet file.
+
+    Packets are handed to discord.py as-is, so playback needs neither an
+    FFmpeg subprocess nor re-encoding.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(_MAGIC)] != _MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not an Opus packet file")
+        self._offset = len(_MAGIC)
+
+    def is_opus(self) -> bool:
+        return True
+
+    def read(self) -> bytes:
+        if self._map.closed or self._offset + _LENGTH.size > len(self._map):
+            return b""
+        (length,) = _LENGTH.unpack_from(self._map, self._offset)
+        start = self._offset + _LENGTH.size
+        self._offset = start + length
+        return self._map[start:self._offset]
+
+    def cleanup(self):
+        if not self._map.closed:
+            self._map.close()
@@ -0,0 +1,104 @@
+"""
+Voice rank model for Beanie Bot.
+Compiles rank thresholds, perks, multipliers and role IDs into a lookup table.
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+# (name, default minimum hours, coin multiplier, perks), lowest rank first
+RANK_DEFINITIONS = (
+    ("Iron", 0, 1.0, []),
+    ("Bronze", 20, 1.2, []),
+    ("Silver", 40, 1.5, []),
+    ("Gold", 60, 1.8, ["/say"]),
+    ("Platinum", 80, 2.2, ["/say"]),
+    ("Diamond", 100, 2.6, ["/say", "/entry on/off", 'Default Entrance: "Xin chào {name}"']),
+    ("Elite", 120, 3.0, ["/say", "/entry on/off", 'Default Entrance: "Xin chào {name}"']),
+    ("Immortal", 140, 3.5, ["/say", "/entry on/off", "/entry add - Custom TTS/File"]),
+    ("Legendary", 160, 4.0, ["/say", "/entry on/off", "/entry add - Custom TTS/File"]),
+)
+RANK_NAMES = tuple(name for name, _, _, _ in RANK_DEFINITIONS)
+DEFAULT_THRESHOLDS = tuple(hours for _, hours, _, _ in RANK_DEFINITIONS)
+
+
+class Rank(NamedTuple):
+    """A resolved rank; unpacks as ``(name, role_id, perks, multiplier)``."""
+    name: str
+    role_id: Optional[int]
+    perks: List[str]
+    multiplier: float
+
+
+def validate_thresholds(thresholds: Sequence[float]) -> List[float]:
+    """
+    Check a list of per-rank minimum hours.
+
+    Args:
+        thresholds: One value per rank, lowest rank first
+
+    Returns:
+        The thresholds as floats
+
+    Raises:
+        ValueError: If the count is wrong, the first is not 0 or they are not strictly increasing
+    """
+    values = [float(hours) for hours in thresholds]
+    if len(values) != len(RANK_NAMES):
+        raise ValueError(f"Expected {len(RANK_NAMES)} thresholds, got {len(values)}")
+    if values[0] != 0:
+        raise ValueError("The first rank must start at 0h")
+    if any(low >= high for low, high in zip(values, values[1:])):
+        raise ValueError("Thresholds must be strictly increasing")
+    return values
+
+
+class RankTable:
+    """Sorted rank thresholds with O(log n) lookup by hours."""
+
+    def __init__(self, thresholds: Sequence[float], ranks: Sequence[Rank]):
+        self.thresholds = list(thresholds)
+        self.ranks = list(ranks)
+        self._by_name: Dict[str, int] = {rank.name: i for i, rank in enumerate(self.ranks)}
+
+    def index(self, total_hours: float) -> int:
+        """Position of the rank reached at ``total_hours`` (0 = lowest)."""
+        return max(0, bisect_right(self.thresholds, total_hours) - 1)
+
+    def lookup(self, total_hours: float) -> Rank:
+        """Rank reached at ``total_hours``."""
+        return self.ranks[self.index(total_hours)]
+
+    def role_id(self, rank_name: str) -> Optional[int]:
+        """Configured role ID for a rank name, or None."""
+        index = self._by_name.get(rank_name)
+        return None if index is None else self.ranks[index].role_id
+
+    def threshold(self, rank_name: str) -> Optional[float]:
+        """Minimum hours for a rank name, or None."""
+        index = self._by_name.get(rank_name)
+        return None if index is None else self.thresholds[index]
+
+
+def compile_rank_table(thresholds: Optional[Sequence[float]] = None,
+                       role_ids: Optional[Sequence[int]] = None) -> RankTable:
+    """
+    Build a rank table.
+
+    Args:
+        thresholds: Per-rank minimum hours (defaults to ``DEFAULT_THRESHOLDS``)
+        role_ids: Per-rank role IDs, lowest rank first; missing entries map to None
+
+    Returns:
+        Compiled RankTable
+
+    Raises:
+        ValueError: If ``thresholds`` is invalid
+    """
+    values = validate_thresholds(thresholds if thresholds is not None else DEFAULT_THRESHOLDS)
+    role_ids = list(role_ids or [])
+    ranks = [
+        Rank(name, role_ids[i] if i < len(role_ids) else None, list(perks), multiplier)
+        for i, (name, _, multiplier, perks) in enumerate(RANK_DEFINITIONS)
+    ]
+    return RankTable(values, ranks)
@@ -1,12 +1,19 @@
 """SQLite-backed persistence for Beanie Bot."""
 
 import asyncio
+import bisect
+import collections
+import contextlib
+import copy
 import json
 import logging
 import os
+import pathlib
+import re
+import sqlite3
 import threading
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 import aiosqlite
 
@@ -31,15 +38,376 @@ def get_storage(base_dir: str | None = None):
         return storage
 
 
+_MISS = object()
+
+# Hot reads, kept as constants so every call hits the same entry in sqlite3's
+# prepared-statement cache. They are fetched as plain tuples (no aiosqlite.Row).
+_SQL_LOAD_VOICE_STATS = "SELECT user_id, total_seconds FROM voice_stats WHERE guild_id = ?"
+_SQL_LOAD_COMPETITORS = "SELECT user_id, channel_id FROM competitors WHERE guild_id = ?"
+_SQL_LOAD_TRACKED_CHANNELS = "SELECT channel_id FROM tracked_voice_channels WHERE guild_id = ? AND enabled = 1"
+_SQL_GET_BALANCE = "SELECT coins FROM economy_accounts WHERE guild_id = ? AND user_id = ?"
+
+# Room for every distinct statement the storage issues, so none get re-prepared.
+_STATEMENT_CACHE_SIZE = 256
+
+# The stdlib builds a fresh JSONEncoder on every json.dumps call that passes
+# options; reuse a single ensure_ascii=False encoder for the JSON columns.
+_json_dumps = json.JSONEncoder(ensure_ascii=False).encode
+
+# Voice session rollups bucket by hour; days and months follow Vietnam time (UTC+7,
+# no DST), which is a whole number of hours so each hour lands in exactly one day.
+_ROLLUP_UTC_OFFSET = 7 * 3600
+_ROLLUP_TZ = timezone(timedelta(seconds=_ROLLUP_UTC_OFFSET))
+_ROLLUP_BATCH_SIZE = 5000
+
+
+def _hour_floor(ts: float) -> int:
+    return int(ts // 3600 * 3600)
+
+
+def _split_by_hour(started_at: float, ended_at: float):
+    """Yield ``(hour_start, seconds)`` for each UTC hour a segment overlaps."""
+    cursor = started_at
+    while cursor < ended_at:
+        hour_start = _hour_floor(cursor)
+        until = min(ended_at, hour_start + 3600)
+        yield hour_start, until - cursor
+        cursor = until
+
+
+# Maintenance cadence: how often the storage loop checks for due jobs, and how long
+# the writer must have been idle before the WAL is truncated.
+_MAINTENANCE_TICK_SECONDS = 60
+_QUIET_SECONDS = 60
+# Online backups copy this many pages per step, sleeping in between so writers
+# get the database back quickly.
+_BACKUP_PAGES_PER_STEP = 256
+_BACKUP_STEP_SLEEP = 0.01
+# PRAGMA auto_vacuum value for INCREMENTAL.
+_AUTO_VACUUM_INCREMENTAL = 2
+
+# Statements worth an EXPLAIN QUERY PLAN when they show up in the slow-query log.
+_EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# How each cached table is copied on the way in and out, so callers that mutate
+# what they loaded can never corrupt the cached value.
+_CACHE_COPIERS = {
+    "competitors": dict,
+    "tracked_channels": list,
+    "entry_settings": copy.deepcopy,
+    "guild_config": copy.deepcopy,
+    "voice_stats": dict,
+}
+
+
+
+def _rollup_triggers(source: str, rollup: str, key: str, value: str) -> list[str]:
+    """Triggers that keep ``rollup`` equal to the per-key SUM of ``source.value``."""
+    new_value = f"COALESCE(NEW.{value}, 0)"
+    old_value = f"COALESCE(OLD.{value}, 0)"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{source}_all_time_insert
+        AFTER INSERT ON {source} BEGIN
+            INSERT INTO {rollup} (guild_id, {key}, total_seconds)
+            VALUES (NEW.guild_id, NEW.{key}, {new_value})
+            ON CONFLICT(guild_id, {key}) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{source}_all_time_update
+        AFTER UPDATE OF {value} ON {source} BEGIN
+            UPDATE {rollup} SET total_seconds = total_seconds + {new_value} - {old_value}
+            WHERE guild_id = NEW.guild_id AND {key} = NEW.{key};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{source}_all_time_delete
+        AFTER DELETE ON {source} BEGIN
+            UPDATE {rollup} SET total_seconds = total_seconds - {old_value}
+            WHERE guild_id = OLD.guild_id AND {key} = OLD.{key};
+        END
+        """,
+    ]
+
+
+# Materialized all-time rollups (voice_stats_all_time, channel_voice_stats_all_time).
+# Writes to the source tables must use DELETE/INSERT or UPSERT, never INSERT OR
+# REPLACE: REPLACE removes the old row without firing the delete trigger.
+_TRIGGER_SQL = (
+    _rollup_triggers("voice_stats", "voice_stats_all_time", "user_id", "total_seconds")
+    + _rollup_triggers("voice_stats_archive", "voice_stats_all_time", "user_id", "total_seconds")
+    + _rollup_triggers("channel_voice_stats", "channel_voice_stats_all_time", "channel_id", "total_user_seconds")
+    + _rollup_triggers("channel_voice_stats_archive", "channel_voice_stats_all_time", "channel_id", "total_user_seconds")
+)
+
+# Indexes from older schemas that duplicate (a prefix of) their table's primary key,
+# or index dd/mm birthday strings nothing ever searches by.
+_REDUNDANT_INDEXES = (
+    "idx_voice_stats_guild_user",
+    "idx_voice_stats_user",
+    "idx_birthdays_guild_user",
+    "idx_birthdays_date",
+    "idx_competitors_guild_user",
+    "idx_voice_stats_archive_guild",
+    "idx_channel_voice_stats_guild",
+    "idx_guild_state_guild",
+    "idx_chat_history_guild_timestamp",
+    "idx_chat_history_speaker",
+)
+
+# Tables that stored Discord user ids as TEXT before they became INTEGER snowflakes.
+_INTEGER_USER_ID_TABLES = (
+    "birthdays",
+    "voice_stats",
+    "competitors",
+    "entry_settings",
+    "voice_stats_archive",
+    "voice_stats_all_time",
+)
+
+# Small rows looked up by a composite primary key: storing them clustered on that key
+# skips the rowid b-tree and its separate PK index.
+_WITHOUT_ROWID_TABLES = (
+    "guild_birthday_channels",
+    "birthdays",
+    "voice_stats",
+    "competitors",
+    "entry_settings",
+    "guild_state",
+    "voice_stats_archive",
+    "voice_stats_all_time",
+    "tracked_voice_channels",
+    "channel_voice_stats",
+    "channel_voice_stats_archive",
+    "channel_voice_stats_all_time",
+    "economy_accounts",
+    "economy_purchases",
+)
+
+
+class GuildTableCache:
+    """Thread-safe per-guild copies of small, hot tables.
+
+    Reads come from the bot's thread while writes invalidate from the storage
+    thread. Every invalidation bumps a generation counter so a load that raced
+    with a write cannot put the stale result back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, table: str, guild_id: int):
+        with self._lock:
+            value = self._entries.get((table, guild_id), _MISS)
+            if value is _MISS:
+                self.misses += 1
+                return _MISS
+            self.hits += 1
+            return _CACHE_COPIERS[table](value)
+
+    def generation(self, table: str, guild_id: int) -> int:
+        with self._lock:
+            return self._generations.get((table, guild_id), 0)
+
+    def put(self, table: str, guild_id: int, value, generation: int):
+        with self._lock:
+            if self._generations.get((table, guild_id), 0) == generation:
+                self._entries[(table, guild_id)] = _CACHE_COPIERS[table](value)
+
+    def invalidate(self, table: str, guild_id: int):
+        with self._lock:
+            key = (table, guild_id)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            if self._entries.pop(key, _MISS) is not _MISS:
+                self.invalidations += 1
+
+    def update(self, table: str, guild_id: int, mutate):
+        """Apply ``mutate`` to a cached value in place, if it is cached."""
+        with self._lock:
+            key = (table, guild_id)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            value = self._entries.get(key, _MISS)
+            if value is not _MISS:
+                mutate(value)
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+
+class _LatencyStats:
+    """Count, total, max and a fixed-bucket histogram of durations in milliseconds."""
+
+    BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+    __slots__ = ("count", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+
+    def snapshot(self) -> dict:
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class StorageProfiler:
+    """Latency counters for the storage thread.
+
+    Calls are split into queue wait (submitted by a caller until the storage loop
+    starts running them) and execution; statements are timed individually and any
+    slower than ``slow_ms`` is kept with its query plan.
+    """
+
+    def __init__(self, enabled: bool = True, slow_ms: float = 100.0, slow_log_size: int = 50):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._statements = {}
+        self._slow = collections.deque(maxlen=slow_log_size)
+
+    def record_call(self, method: str, queue_ms: float, exec_ms: float):
+        with self._lock:
+            stats = self._calls.get(method)
+            if stats is None:
+                stats = self._calls[method] = (_LatencyStats(), _LatencyStats())
+            stats[0].add(queue_ms)
+            stats[1].add(exec_ms)
+
+    def record_statement(self, sql: str, elapsed_ms: float):
+        key = " ".join(sql.split())[:120]
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = _LatencyStats()
+            stats.add(elapsed_ms)
+
+    def is_slow(self, elapsed_ms: float) -> bool:
+        return self.slow_ms > 0 and elapsed_ms >= self.slow_ms
+
+    def record_slow(self, sql: str, elapsed_ms: float, plan: list[str]):
+        with self._lock:
+            self._slow.append({
+                "sql": " ".join(sql.split()),
+                "elapsed_ms": round(elapsed_ms, 3),
+                "plan": plan,
+                "at": datetime.now(timezone.utc).isoformat(),
+            })
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": {
+                    method: {"queue": queue.snapshot(), "exec": execution.snapshot()}
+                    for method, (queue, execution) in self._calls.items()
+                },
+                "statements": {sql: stats.snapshot() for sql, stats in self._statements.items()},
+                "slow_queries": list(self._slow),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._statements.clear()
+            self._slow.clear()
+
+
 class SQLiteStorage:
     """Thread-backed SQLite storage using aiosqlite for serialized access."""
 
-    def __init__(self, base_dir: str):
+    def __init__(
+        self,
+        base_dir: str,
+        group_commit_ms: int | None = None,
+        group_commit_ops: int | None = None,
+        read_pool_size: int | None = None,
+        read_cache_kb: int | None = None,
+        read_mmap_mb: int | None = None,
+    ):
         self.base_dir = resolve_base_dir(base_dir)
         self.data_dir = os.path.join(self.base_dir, "data")
         self.db_path = os.path.join(self.data_dir, "beanie.sqlite3")
         os.makedirs(self.data_dir, exist_ok=True)
 
+        # Group commit is opt-in: 0 ms keeps the commit-per-write behaviour.
+        if group_commit_ms is None:
+            group_commit_ms = int(os.getenv("BEANIE_SQLITE_GROUP_COMMIT_MS", "0"))
+        if group_commit_ops is None:
+            group_commit_ops = int(os.getenv("BEANIE_SQLITE_GROUP_COMMIT_OPS", "100"))
+        self._group_commit_ms = max(0, group_commit_ms)
+        self._group_commit_ops = max(1, group_commit_ops)
+        self._pending_writes = 0
+        self._flush_handle = None
+        self._commit_lock = asyncio.Lock()
+        self._writer_task = None  # Task holding _commit_lock (see _write_lock)
+        self._cache = GuildTableCache()
+
+        # Read-only connections serving load_*/get_* next to the single writer.
+        # 0 sends every read through the writer connection.
+        if read_pool_size is None:
+            read_pool_size = int(os.getenv("BEANIE_SQLITE_READ_POOL", "2"))
+        if read_cache_kb is None:
+            read_cache_kb = int(os.getenv("BEANIE_SQLITE_READ_CACHE_KB", "8192"))
+        if read_mmap_mb is None:
+            read_mmap_mb = int(os.getenv("BEANIE_SQLITE_READ_MMAP_MB", "64"))
+        self._read_pool_size = max(0, read_pool_size)
+        self._read_cache_kb = max(0, read_cache_kb)
+        self._read_mmap_mb = max(0, read_mmap_mb)
+        self._readers = None
+
+        # Background maintenance on the storage loop: backups, optimize/incremental
+        # vacuum and WAL truncation once writes go quiet. Intervals of 0 disable a job.
+        self.backup_dir = os.path.join(self.data_dir, "backups")
+        self._maintenance_enabled = os.getenv("BEANIE_SQLITE_MAINTENANCE", "1") != "0"
+        self._backup_hours = float(os.getenv("BEANIE_SQLITE_BACKUP_HOURS", "24"))
+        self._backup_keep = max(1, int(os.getenv("BEANIE_SQLITE_BACKUP_KEEP", "7")))
+        self._compact_hours = float(os.getenv("BEANIE_SQLITE_COMPACT_HOURS", "6"))
+        # Converting an existing file to incremental auto-vacuum needs a full VACUUM,
+        # which blocks startup for as long as it takes to rewrite the file: opt-in.
+        self._vacuum_on_start = os.getenv("BEANIE_SQLITE_VACUUM_ON_START", "0") == "1"
+        self._maintenance_task = None
+        self._maintenance_stats = {}
+        self._last_write = 0.0
+        self._last_compact = time.time()
+        self._wal_dirty = False
+
+        self._profiler = StorageProfiler(
+            enabled=os.getenv("BEANIE_SQLITE_PROFILE", "1") != "0",
+            slow_ms=float(os.getenv("BEANIE_SQLITE_SLOW_MS", "100")),
+        )
+
         self._loop = asyncio.new_event_loop()
         self._thread = threading.Thread(target=self._run_loop, name="beanie-sqlite", daemon=True)
         self._started = threading.Event()
@@ -52,24 +420,382 @@ class SQLiteStorage:
         self._started.set()
         self._loop.run_forever()
 
-    def _call(self, coro):
-        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+    def _call(self, coro, name: str | None = None):
+        future = asyncio.run_coroutine_threadsafe(self._profiled(coro, name), self._loop)
         return future.result()
 
+    async def _acall(self, coro, name: str | None = None):
+        """Await a storage coroutine from another event loop without blocking it."""
+        future = asyncio.run_coroutine_threadsafe(self._profiled(coro, name), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def _profiled(self, coro, name: str | None = None):
+        """Wrap ``coro`` so its queue wait and execution time land in the profiler."""
+        if not self._profiler.enabled:
+            return coro
+        name = name or getattr(coro, "__name__", type(coro).__name__)
+        return self._run_profiled(coro, name.lstrip("_"), time.perf_counter())
+
+    async def _run_profiled(self, coro, name: str, submitted: float):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self._profiler.record_call(
+                name,
+                (started - submitted) * 1000,
+                (time.perf_counter() - started) * 1000,
+            )
+
     async def _initialize(self):
-        self._conn = await aiosqlite.connect(self.db_path)
+        self._conn = await aiosqlite.connect(self.db_path, cached_statements=_STATEMENT_CACHE_SIZE)
         self._conn.row_factory = aiosqlite.Row
-        await self._conn.execute("PRAGMA journal_mode=WAL")
-        await self._conn.execute("PRAGMA synchronous=NORMAL")
-        await self._conn.execute("PRAGMA foreign_keys=ON")
-        await self._conn.execute("PRAGMA temp_store=MEMORY")
-        await self._conn.execute("PRAGMA cache_size=-8192")
-        await self._conn.execute("PRAGMA wal_autocheckpoint=100")
-        await self._conn.execute("PRAGMA busy_timeout=5000")
+        # Only takes effect on a brand-new file, so it must come before journal_mode
+        # writes the header; existing files convert with BEANIE_SQLITE_VACUUM_ON_START.
+        await self._execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await self._execute("PRAGMA journal_mode=WAL")
+        await self._execute("PRAGMA synchronous=NORMAL")
+        await self._execute("PRAGMA foreign_keys=ON")
+        await self._execute("PRAGMA temp_store=MEMORY")
+        await self._execute("PRAGMA cache_size=-8192")
+        await self._execute("PRAGMA wal_autocheckpoint=100")
+        await self._execute("PRAGMA busy_timeout=5000")
         await self._create_schema()
         await self._run_migrations()
         await self._conn.commit()
+        # Migration 7 converts files upgraded with the flag set; this covers
+        # files that were already past it when the flag was turned on.
+        if self._vacuum_on_start:
+            await self._convert_incremental_auto_vacuum()
+        await self._open_readers()
+        if self._maintenance_enabled:
+            self._maintenance_task = self._loop.create_task(self._maintenance_loop())
         logging.info("SQLite storage ready at %s", self.db_path)
+        if self._group_commit_ms:
+            logging.info(
+                "SQLite group commit enabled: every %d ms or %d writes",
+                self._group_commit_ms,
+                self._group_commit_ops,
+            )
+
+    async def _open_readers(self):
+        self._readers = asyncio.Queue()
+        uri = f"{pathlib.Path(self.db_path).as_uri()}?mode=ro"
+        for _ in range(self._read_pool_size):
+            reader = await aiosqlite.connect(uri, uri=True, cached_statements=_STATEMENT_CACHE_SIZE)
+            reader.row_factory = aiosqlite.Row
+            await reader.execute("PRAGMA query_only=ON")
+            await reader.execute("PRAGMA temp_store=MEMORY")
+            await reader.execute(f"PRAGMA cache_size=-{self._read_cache_kb}")
+            await reader.execute(f"PRAGMA mmap_size={self._read_mmap_mb * 1024 * 1024}")
+            await reader.execute("PRAGMA busy_timeout=5000")
+            self._readers.put_nowait(reader)
+        if self._read_pool_size:
+            logging.info("SQLite read pool: %d connections", self._read_pool_size)
+
+    @contextlib.asynccontextmanager
+    async def _reader(self):
+        """Borrow a read-only connection, or the writer when it has uncommitted writes.
+
+        Readers only see committed data, so while the writer is inside a transaction
+        (an ``_atomic`` block or writes held back by group commit) reads stay on the
+        writer to see their own writes.
+        """
+        if not self._read_pool_size or self._conn.in_transaction:
+            async with self._write_lock():
+                yield self._conn
+            return
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    # --- Read-through Cache ---
+
+    def _cached(self, table: str, guild_id: int, loader):
+        value = self._cache.get(table, guild_id)
+        if value is _MISS:
+            value = self._call(self._load_through_cache(table, guild_id, loader), loader.__name__)
+        return value
+
+    async def _acached(self, table: str, guild_id: int, loader):
+        value = self._cache.get(table, guild_id)
+        if value is _MISS:
+            value = await self._acall(self._load_through_cache(table, guild_id, loader), loader.__name__)
+        return value
+
+    async def _load_through_cache(self, table: str, guild_id: int, loader):
+        generation = self._cache.generation(table, guild_id)
+        value = await loader(guild_id)
+        self._cache.put(table, guild_id, value, generation)
+        return value
+
+    def cache_stats(self) -> dict:
+        """Hit/miss/invalidation counters for the per-guild table cache."""
+        return self._cache.stats()
+
+    # --- Commit / Durability ---
+
+    @contextlib.asynccontextmanager
+    async def _write_lock(self):
+        """Hold the writer connection for the current task.
+
+        Every statement on the writer takes this lock, so an ``_atomic`` block
+        that rolls back only undoes its own statements, never writes from other
+        coroutines. Re-entrant within one task, so locked sections keep using
+        ``_execute``/``_fetchone``.
+        """
+        task = asyncio.current_task()
+        if self._writer_task is task:
+            yield
+            return
+        async with self._commit_lock:
+            self._writer_task = task
+            try:
+                yield
+            finally:
+                self._writer_task = None
+
+    async def _commit(self):
+        """Commit the current write, or defer it to the next group commit."""
+        async with self._write_lock():
+            await self._commit_locked()
+
+    async def _commit_locked(self):
+        self._last_write = time.time()
+        self._wal_dirty = True
+        if not self._group_commit_ms:
+            await self._commit_connection()
+            return
+        self._pending_writes += 1
+        if self._pending_writes >= self._group_commit_ops:
+            await self._flush_locked()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self._group_commit_ms / 1000, self._schedule_flush)
+
+    @contextlib.asynccontextmanager
+    async def _atomic(self):
+        """Run a block of writes all-or-nothing inside a SAVEPOINT, then commit it.
+
+        Holding the writer lock keeps other coroutines on the storage loop from
+        writing or committing until the block is done.
+        """
+        async with self._write_lock():
+            began = not self._conn.in_transaction
+            if began:
+                await self._execute("BEGIN")
+            await self._execute("SAVEPOINT atomic")
+            try:
+                yield
+            except BaseException:
+                await self._execute("ROLLBACK TO atomic")
+                await self._execute("RELEASE atomic")
+                if began:
+                    await self._conn.rollback()
+                raise
+            await self._execute("RELEASE atomic")
+            await self._commit_locked()
+
+    def _schedule_flush(self):
+        self._flush_handle = None
+        self._loop.create_task(self._flush())
+
+    def flush(self):
+        """Durability barrier: commit every write queued by group commit."""
+        self._call(self._flush())
+
+    async def _flush(self):
+        async with self._write_lock():
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending_writes = self._pending_writes, 0
+        if self._conn.in_transaction:
+            await self._commit_connection()
+            logging.debug("SQLite group commit flushed %d writes", pending)
+
+    def close(self):
+        """Flush pending writes and close the database connection."""
+        self._call(self._close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    async def aclose(self):
+        """Like :meth:`close`, but awaits the shutdown instead of blocking the caller's loop."""
+        await self._acall(self._close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        await asyncio.to_thread(self._thread.join, 5)
+
+    async def _close(self):
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._maintenance_task
+        await self._flush()
+        self._cache.clear()
+        while self._readers is not None and not self._readers.empty():
+            await self._readers.get_nowait().close()
+        await self._conn.close()
+
+    # --- Maintenance ---
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(_MAINTENANCE_TICK_SECONDS)
+            try:
+                await self._maintenance_tick()
+            except Exception:
+                logging.exception("SQLite maintenance failed")
+
+    async def _maintenance_tick(self):
+        now = time.time()
+        if self._backup_hours and now - self._latest_backup_time() >= self._backup_hours * 3600:
+            await self._backup()
+        if self._compact_hours and now - self._last_compact >= self._compact_hours * 3600:
+            self._last_compact = now
+            await self._optimize()
+            await self._incremental_vacuum()
+        await self._rollup_voice_sessions()
+        if self._wal_dirty and now - self._last_write >= _QUIET_SECONDS:
+            await self._checkpoint_wal()
+
+    def _record_maintenance(self, job: str, started: float, **details) -> dict:
+        result = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            **details,
+        }
+        self._maintenance_stats[job] = result
+        logging.info("SQLite %s: %s", job, ", ".join(f"{key}={value}" for key, value in result.items()))
+        return result
+
+    def maintenance_stats(self) -> dict:
+        """Result of the most recent run of each maintenance job."""
+        return copy.deepcopy(self._maintenance_stats)
+
+    def _backup_files(self) -> list[str]:
+        if not os.path.isdir(self.backup_dir):
+            return []
+        names = sorted(
+            name for name in os.listdir(self.backup_dir)
+            if name.startswith("beanie-") and name.endswith(".sqlite3")
+        )
+        return [os.path.join(self.backup_dir, name) for name in names]
+
+    def _latest_backup_time(self) -> float:
+        backups = self._backup_files()
+        return os.path.getmtime(backups[-1]) if backups else 0.0
+
+    def backup(self, path: str | None = None) -> dict:
+        """Snapshot the live database with the online backup API and rotate old backups."""
+        return self._call(self._backup(path))
+
+    async def _backup(self, path: str | None = None) -> dict:
+        started = time.perf_counter()
+        if path is None:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+            path = os.path.join(self.backup_dir, f"beanie-{stamp}.sqlite3")
+        partial = f"{path}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        await asyncio.to_thread(self._copy_database, partial)
+        os.replace(partial, path)
+        removed = 0
+        if os.path.dirname(path) == self.backup_dir:
+            for old in self._backup_files()[:-self._backup_keep]:
+                os.remove(old)
+                removed += 1
+        return self._record_maintenance(
+            "backup", started, path=path, bytes=os.path.getsize(path), rotated_out=removed
+        )
+
+    def _copy_database(self, target_path: str):
+        """Copy the database page by page into ``target_path``; runs in a worker thread.
+
+        Each step holds a read lock on its own connection only briefly, so the
+        storage loop keeps writing between steps; a write from the storage
+        connection makes SQLite restart the copy at the next step.
+        """
+        source = sqlite3.connect(f"{pathlib.Path(self.db_path).as_uri()}?mode=ro", uri=True)
+        try:
+            target = sqlite3.connect(target_path)
+            try:
+                source.backup(target, pages=_BACKUP_PAGES_PER_STEP, sleep=_BACKUP_STEP_SLEEP)
+                # Backups are standalone files, not WAL databases.
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+    def optimize(self) -> dict:
+        """Run ``PRAGMA optimize`` so the planner's statistics stay current."""
+        return self._call(self._optimize())
+
+    async def _optimize(self) -> dict:
+        started = time.perf_counter()
+        async with self._write_lock():
+            await self._flush_locked()
+            await self._execute("PRAGMA optimize")
+        return self._record_maintenance("optimize", started)
+
+    def incremental_vacuum(self, pages: int | None = None) -> dict:
+        """Return up to ``pages`` free pages to the filesystem (all of them by default)."""
+        return self._call(self._incremental_vacuum(pages))
+
+    async def _incremental_vacuum(self, pages: int | None = None) -> dict:
+        started = time.perf_counter()
+        async with self._write_lock():
+            await self._flush_locked()
+            size_before = self._file_size()
+            free_pages = (await self._fetchone("PRAGMA freelist_count"))[0]
+            if free_pages:
+                await self._fetchall(f"PRAGMA incremental_vacuum({int(pages or 0)})")
+                await self._checkpoint_locked()
+        return self._record_maintenance(
+            "incremental_vacuum",
+            started,
+            free_pages=free_pages,
+            bytes_reclaimed=max(0, size_before - self._file_size()),
+        )
+
+    def checkpoint_wal(self) -> dict:
+        """Fold the WAL back into the database file and truncate it to zero bytes."""
+        return self._call(self._checkpoint_wal())
+
+    async def _checkpoint_wal(self) -> dict:
+        started = time.perf_counter()
+        async with self._write_lock():
+            if self._conn.in_transaction:
+                # Group commit still holds writes; try again once they are flushed.
+                return self._record_maintenance("wal_checkpoint", started, skipped="pending writes")
+            wal_before = self._wal_size()
+            busy = await self._checkpoint_locked()
+        return self._record_maintenance(
+            "wal_checkpoint",
+            started,
+            busy=busy,
+            bytes_reclaimed=max(0, wal_before - self._wal_size()),
+        )
+
+    async def _checkpoint_locked(self) -> bool:
+        row = await self._fetchone("PRAGMA wal_checkpoint(TRUNCATE)")
+        busy = bool(row[0])
+        if not busy:
+            self._wal_dirty = False
+        return busy
+
+    def _wal_size(self) -> int:
+        wal_path = f"{self.db_path}-wal"
+        return os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+
+    def _file_size(self) -> int:
+        return os.path.getsize(self.db_path) + self._wal_size()
 
     async def _create_schema(self):
         await self._conn.executescript(
@@ -79,9 +805,11 @@ class SQLiteStorage:
                 birthday_channel_id INTEGER,
                 rank_category_id INTEGER,
                 general_channel_id INTEGER,
+                patch_notes_channel_id INTEGER,
                 auto_shutdown_channel_id INTEGER,
                 rank_role_ids_json TEXT NOT NULL,
-                features_json TEXT NOT NULL
+                features_json TEXT NOT NULL,
+                rank_thresholds_json TEXT
             );
 
             CREATE TABLE IF NOT EXISTS guild_birthday_channels (
@@ -89,59 +817,75 @@ class SQLiteStorage:
                 channel_id INTEGER NOT NULL,
                 position INTEGER NOT NULL,
                 PRIMARY KEY (guild_id, channel_id)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS birthdays (
                 guild_id INTEGER NOT NULL,
-                user_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
                 birthday TEXT NOT NULL,
                 PRIMARY KEY (guild_id, user_id)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS voice_stats (
                 guild_id INTEGER NOT NULL,
-                user_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
                 total_seconds REAL NOT NULL,
                 PRIMARY KEY (guild_id, user_id)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS competitors (
                 guild_id INTEGER NOT NULL,
-                user_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
                 channel_id INTEGER,
                 PRIMARY KEY (guild_id, user_id)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS entry_settings (
                 guild_id INTEGER NOT NULL,
-                user_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
                 settings_json TEXT NOT NULL,
                 PRIMARY KEY (guild_id, user_id)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS guild_state (
                 guild_id INTEGER NOT NULL,
                 state_key TEXT NOT NULL,
                 value_json TEXT NOT NULL,
                 PRIMARY KEY (guild_id, state_key)
-            );
+            ) WITHOUT ROWID;
 
-            CREATE TABLE IF NOT EXISTS chat_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS chat_history_ring (
                 guild_id INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
                 created_at TEXT NOT NULL,
                 speaker TEXT NOT NULL,
-                content TEXT NOT NULL
+                content TEXT NOT NULL,
+                PRIMARY KEY (guild_id, slot)
+            );
+
+            CREATE TABLE IF NOT EXISTS chat_history_seq (
+                guild_id INTEGER PRIMARY KEY,
+                next_seq INTEGER NOT NULL,
+                ring_size INTEGER
             );
 
             CREATE TABLE IF NOT EXISTS voice_stats_archive (
                 guild_id INTEGER NOT NULL,
                 archive_year INTEGER NOT NULL,
                 archive_month INTEGER NOT NULL,
-                user_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
                 total_seconds REAL NOT NULL,
                 PRIMARY KEY (guild_id, archive_year, archive_month, user_id)
-            );
+            ) WITHOUT ROWID;
+
+            -- Materialized voice_stats + voice_stats_archive, kept in sync by triggers.
+            CREATE TABLE IF NOT EXISTS voice_stats_all_time (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                total_seconds REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS tracked_voice_channels (
                 guild_id INTEGER NOT NULL,
@@ -149,7 +893,7 @@ class SQLiteStorage:
                 enabled BOOLEAN DEFAULT 1,
                 created_at INTEGER,
                 PRIMARY KEY (guild_id, channel_id)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS channel_voice_stats (
                 guild_id INTEGER NOT NULL,
@@ -157,7 +901,7 @@ class SQLiteStorage:
                 period TEXT NOT NULL,
                 total_user_seconds REAL DEFAULT 0,
                 PRIMARY KEY (guild_id, channel_id, period)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS channel_voice_stats_archive (
                 guild_id INTEGER NOT NULL,
@@ -166,14 +910,22 @@ class SQLiteStorage:
                 archive_month INTEGER NOT NULL,
                 total_user_seconds REAL,
                 PRIMARY KEY (guild_id, channel_id, archive_year, archive_month)
-            );
+            ) WITHOUT ROWID;
+
+            -- Materialized channel_voice_stats + channel_voice_stats_archive, kept in sync by triggers.
+            CREATE TABLE IF NOT EXISTS channel_voice_stats_all_time (
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                total_seconds REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, channel_id)
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS economy_accounts (
                 guild_id INTEGER NOT NULL,
                 user_id INTEGER NOT NULL,
                 coins REAL NOT NULL DEFAULT 0,
                 PRIMARY KEY (guild_id, user_id)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS economy_purchases (
                 guild_id INTEGER NOT NULL,
@@ -182,7 +934,7 @@ class SQLiteStorage:
                 purchase_type TEXT NOT NULL,
                 purchase_value REAL NOT NULL,
                 PRIMARY KEY (guild_id, user_id, month, purchase_type)
-            );
+            ) WITHOUT ROWID;
 
             CREATE TABLE IF NOT EXISTS economy_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -196,38 +948,67 @@ class SQLiteStorage:
                 active INTEGER DEFAULT 1
             );
 
-            -- Performance Indexes
-            CREATE INDEX IF NOT EXISTS idx_voice_stats_guild_user 
-                ON voice_stats(guild_id, user_id);
-            
-            CREATE INDEX IF NOT EXISTS idx_voice_stats_user 
-                ON voice_stats(user_id);
-            
-            CREATE INDEX IF NOT EXISTS idx_birthdays_guild_user 
-                ON birthdays(guild_id, user_id);
-            
-            CREATE INDEX IF NOT EXISTS idx_birthdays_date 
-                ON birthdays(birthday);
-            
-            CREATE INDEX IF NOT EXISTS idx_chat_history_guild_timestamp 
-                ON chat_history(guild_id, created_at DESC);
-            
-            CREATE INDEX IF NOT EXISTS idx_chat_history_speaker 
-                ON chat_history(speaker);
-            
-            CREATE INDEX IF NOT EXISTS idx_competitors_guild_user 
-                ON competitors(guild_id, user_id);
-            
-            CREATE INDEX IF NOT EXISTS idx_voice_stats_archive_guild 
-                ON voice_stats_archive(guild_id, archive_year, archive_month);
-            
-            CREATE INDEX IF NOT EXISTS idx_channel_voice_stats_guild 
-                ON channel_voice_stats(guild_id, channel_id);
-            
-            CREATE INDEX IF NOT EXISTS idx_guild_state_guild 
-                ON guild_state(guild_id, state_key);
+            -- Append-only voice presence log. Checkpoints close a segment per user, so a
+            -- long session is several rows; the rollups below are derived from it.
+            CREATE TABLE IF NOT EXISTS voice_sessions (
+                id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                channel_id INTEGER,
+                started_at REAL NOT NULL,
+                ended_at REAL NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS voice_rollup_hourly (
+                guild_id INTEGER NOT NULL,
+                hour_start INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                total_seconds REAL NOT NULL,
+                PRIMARY KEY (guild_id, hour_start, user_id)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS voice_rollup_daily (
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                total_seconds REAL NOT NULL,
+                PRIMARY KEY (guild_id, day, user_id)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS voice_rollup_monthly (
+                guild_id INTEGER NOT NULL,
+                month TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                total_seconds REAL NOT NULL,
+                PRIMARY KEY (guild_id, month, user_id)
+            ) WITHOUT ROWID;
+
+            -- Users currently in voice. checkpoint_at is the point up to which their
+            -- time has been credited, so tracking can resume from it after a restart.
+            CREATE TABLE IF NOT EXISTS voice_open_sessions (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                channel_id INTEGER,
+                started_at REAL NOT NULL,
+                checkpoint_at REAL NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID;
+
+            -- Highest voice_sessions.id already folded into the rollups.
+            CREATE TABLE IF NOT EXISTS voice_rollup_watermark (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                last_session_id INTEGER NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_economy_accounts_leaderboard
+                ON economy_accounts(guild_id, coins DESC);
+
+            CREATE INDEX IF NOT EXISTS idx_economy_events_guild_active
+                ON economy_events(guild_id, active);
             """
         )
+        for statement in _TRIGGER_SQL:
+            await self._execute(statement)
 
     def ensure_guild_initialized(self, guild_id: int, guild_dir: str, default_config: dict):
         self._call(self._ensure_guild_initialized(guild_id, guild_dir, default_config))
@@ -241,20 +1022,23 @@ class SQLiteStorage:
         )
         if config_row is None:
             await self._save_guild_config(guild_id, default_config)
-        await self._conn.commit()
+        await self._commit()
 
     def load_guild_config(self, guild_id: int) -> dict:
-        return self._call(self._load_guild_config(guild_id))
+        return self._cached("guild_config", guild_id, self._load_guild_config)
+
+    async def aload_guild_config(self, guild_id: int) -> dict:
+        return await self._acached("guild_config", guild_id, self._load_guild_config)
 
     async def _load_guild_config(self, guild_id: int) -> dict:
-        row = await self._fetchone(
+        row = await self._read_fetchone(
             "SELECT * FROM guild_config WHERE guild_id = ?",
             (guild_id,),
         )
         if row is None:
             return {}
 
-        channel_rows = await self._fetchall(
+        channel_rows = await self._read_fetchall(
             "SELECT channel_id FROM guild_birthday_channels WHERE guild_id = ? ORDER BY position ASC",
             (guild_id,),
         )
@@ -269,6 +1053,7 @@ class SQLiteStorage:
             "auto_shutdown_channel_id": row["auto_shutdown_channel_id"],
             "rank_role_ids": json.loads(row["rank_role_ids_json"]),
             "features": json.loads(row["features_json"]),
+            "rank_thresholds": json.loads(row["rank_thresholds_json"]) if row["rank_thresholds_json"] else None,
         }
 
     def save_guild_config(self, guild_id: int, config: dict):
@@ -277,58 +1062,63 @@ class SQLiteStorage:
     async def _save_guild_config(self, guild_id: int, config: dict):
         birthday_channel_ids = list(config.get("birthday_channel_ids") or [])
         primary_birthday_channel_id = birthday_channel_ids[0] if birthday_channel_ids else config.get("birthday_channel_id")
+        rank_thresholds = config.get("rank_thresholds")
 
-        await self._conn.execute(
-            """
-            INSERT INTO guild_config (
-                guild_id,
-                birthday_channel_id,
-                rank_category_id,
-                general_channel_id,
-                patch_notes_channel_id,
-                auto_shutdown_channel_id,
-                rank_role_ids_json,
-                features_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(guild_id) DO UPDATE SET
-                birthday_channel_id = excluded.birthday_channel_id,
-                rank_category_id = excluded.rank_category_id,
-                general_channel_id = excluded.general_channel_id,
-                patch_notes_channel_id = excluded.patch_notes_channel_id,
-                auto_shutdown_channel_id = excluded.auto_shutdown_channel_id,
-                rank_role_ids_json = excluded.rank_role_ids_json,
-                features_json = excluded.features_json
-            """,
-            (
-                guild_id,
-                primary_birthday_channel_id,
-                config.get("rank_category_id"),
-                config.get("general_channel_id"),
-                config.get("patch_notes_channel_id"),
-                config.get("auto_shutdown_channel_id"),
-                json.dumps(config.get("rank_role_ids", []), ensure_ascii=False),
-                json.dumps(config.get("features", {}), ensure_ascii=False),
-            ),
-        )
-        await self._conn.execute(
-            "DELETE FROM guild_birthday_channels WHERE guild_id = ?",
-            (guild_id,),
-        )
-        if birthday_channel_ids:
-            await self._conn.executemany(
-                "INSERT INTO guild_birthday_channels (guild_id, channel_id, position) VALUES (?, ?, ?)",
-                [
-                    (guild_id, channel_id, position)
-                    for position, channel_id in enumerate(birthday_channel_ids)
-                ],
+        async with self._atomic():
+            await self._execute(
+                """
+                INSERT INTO guild_config (
+                    guild_id,
+                    birthday_channel_id,
+                    rank_category_id,
+                    general_channel_id,
+                    patch_notes_channel_id,
+                    auto_shutdown_channel_id,
+                    rank_role_ids_json,
+                    features_json,
+                    rank_thresholds_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET
+                    birthday_channel_id = excluded.birthday_channel_id,
+                    rank_category_id = excluded.rank_category_id,
+                    general_channel_id = excluded.general_channel_id,
+                    patch_notes_channel_id = excluded.patch_notes_channel_id,
+                    auto_shutdown_channel_id = excluded.auto_shutdown_channel_id,
+                    rank_role_ids_json = excluded.rank_role_ids_json,
+                    features_json = excluded.features_json,
+                    rank_thresholds_json = excluded.rank_thresholds_json
+                """,
+                (
+                    guild_id,
+                    primary_birthday_channel_id,
+                    config.get("rank_category_id"),
+                    config.get("general_channel_id"),
+                    config.get("patch_notes_channel_id"),
+                    config.get("auto_shutdown_channel_id"),
+                    _json_dumps(config.get("rank_role_ids", [])),
+                    _json_dumps(config.get("features", {})),
+                    _json_dumps(rank_thresholds) if rank_thresholds is not None else None,
+                ),
             )
-        await self._conn.commit()
+            await self._execute(
+                "DELETE FROM guild_birthday_channels WHERE guild_id = ?",
+                (guild_id,),
+            )
+            if birthday_channel_ids:
+                await self._executemany(
+                    "INSERT INTO guild_birthday_channels (guild_id, channel_id, position) VALUES (?, ?, ?)",
+                    [
+                        (guild_id, channel_id, position)
+                        for position, channel_id in enumerate(birthday_channel_ids)
+                    ],
+                )
+        self._cache.invalidate("guild_config", guild_id)
 
     def load_birthdays(self, guild_id: int) -> dict:
         return self._call(self._load_birthdays(guild_id))
 
     async def _load_birthdays(self, guild_id: int) -> dict:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             "SELECT user_id, birthday FROM birthdays WHERE guild_id = ?",
             (guild_id,),
         )
@@ -338,67 +1128,170 @@ class SQLiteStorage:
         self._call(self._save_birthdays(guild_id, data))
 
     async def _save_birthdays(self, guild_id: int, data: dict):
-        await self._conn.execute("DELETE FROM birthdays WHERE guild_id = ?", (guild_id,))
-        if data:
-            await self._conn.executemany(
-                "INSERT INTO birthdays (guild_id, user_id, birthday) VALUES (?, ?, ?)",
-                [(guild_id, str(user_id), value) for user_id, value in data.items()],
-            )
-        await self._conn.commit()
+        async with self._atomic():
+            await self._execute("DELETE FROM birthdays WHERE guild_id = ?", (guild_id,))
+            if data:
+                await self._executemany(
+                    "INSERT INTO birthdays (guild_id, user_id, birthday) VALUES (?, ?, ?)",
+                    [(guild_id, int(user_id), value) for user_id, value in data.items()],
+                )
+
+    def set_birthday(self, guild_id: int, user_id, birthday: str):
+        self._call(self._set_birthday(guild_id, user_id, birthday))
+
+    async def _set_birthday(self, guild_id: int, user_id, birthday: str):
+        await self._execute(
+            """INSERT INTO birthdays (guild_id, user_id, birthday) VALUES (?, ?, ?)
+               ON CONFLICT(guild_id, user_id) DO UPDATE SET birthday = excluded.birthday""",
+            (guild_id, int(user_id), birthday),
+        )
+        await self._commit()
 
     def load_voice_stats(self, guild_id: int) -> dict:
-        return self._call(self._load_voice_stats(guild_id))
+        return self._cached("voice_stats", guild_id, self._load_voice_stats)
+
+    async def aload_voice_stats(self, guild_id: int) -> dict:
+        return await self._acached("voice_stats", guild_id, self._load_voice_stats)
 
     async def _load_voice_stats(self, guild_id: int) -> dict:
-        rows = await self._fetchall(
-            "SELECT user_id, total_seconds FROM voice_stats WHERE guild_id = ?",
-            (guild_id,),
-        )
-        return {row["user_id"]: row["total_seconds"] for row in rows}
+        return dict(await self._read_tuples(_SQL_LOAD_VOICE_STATS, (guild_id,)))
 
     def save_voice_stats(self, guild_id: int, data: dict):
         self._call(self._save_voice_stats(guild_id, data))
 
+    async def asave_voice_stats(self, guild_id: int, data: dict):
+        await self._acall(self._save_voice_stats(guild_id, data))
+
     async def _save_voice_stats(self, guild_id: int, data: dict):
-        await self._conn.execute("DELETE FROM voice_stats WHERE guild_id = ?", (guild_id,))
-        if data:
-            await self._conn.executemany(
-                "INSERT INTO voice_stats (guild_id, user_id, total_seconds) VALUES (?, ?, ?)",
-                [
-                    (guild_id, str(user_id), self._normalize_voice_total(value))
-                    for user_id, value in data.items()
-                ],
+        async with self._atomic():
+            await self._execute("DELETE FROM voice_stats WHERE guild_id = ?", (guild_id,))
+            if data:
+                await self._executemany(
+                    "INSERT INTO voice_stats (guild_id, user_id, total_seconds) VALUES (?, ?, ?)",
+                    [
+                        (guild_id, int(user_id), self._normalize_voice_total(value))
+                        for user_id, value in data.items()
+                    ],
+                )
+        self._cache.invalidate("voice_stats", guild_id)
+
+    def add_voice_seconds(self, guild_id: int, user_id, delta: float) -> float:
+        """Add seconds to one user's current-month total and return the new total."""
+        return self._call(self._add_voice_seconds(guild_id, user_id, delta))
+
+    async def _add_voice_seconds(self, guild_id: int, user_id, delta: float) -> float:
+        total_seconds = await self._increment_voice_seconds(guild_id, user_id, delta)
+        await self._commit()
+        return total_seconds
+
+    async def _increment_voice_seconds(self, guild_id: int, user_id, delta: float) -> float:
+        rows = await self._fetchall(
+            """INSERT INTO voice_stats (guild_id, user_id, total_seconds) VALUES (?, ?, ?)
+               ON CONFLICT(guild_id, user_id) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds
+               RETURNING total_seconds""",
+            (guild_id, int(user_id), float(delta)),
+        )
+        total_seconds = rows[0]["total_seconds"]
+        self._cache.update("voice_stats", guild_id, lambda stats: stats.__setitem__(int(user_id), total_seconds))
+        return total_seconds
+
+    def apply_voice_checkpoint(self, guild_id: int, seconds_items: list, coin_items: list, sessions: list = ()):
+        """Add voice seconds and coins for many users in a single transaction.
+
+        ``seconds_items`` and ``coin_items`` are ``(user_id, amount)`` pairs;
+        ``sessions`` are voice segments appended to the session log alongside them.
+        """
+        self._call(self._apply_voice_checkpoint(guild_id, seconds_items, coin_items, sessions))
+
+    async def _apply_voice_checkpoint(self, guild_id: int, seconds_items: list, coin_items: list, sessions: list = ()):
+        async with self._atomic():
+            await self._insert_voice_sessions(guild_id, sessions)
+            await self._upsert_open_voice_sessions(
+                (guild_id, user_id, channel_id, started_at, ended_at)
+                for user_id, channel_id, started_at, ended_at in sessions
             )
-        await self._conn.commit()
+            if seconds_items:
+                await self._executemany(
+                    """INSERT INTO voice_stats (guild_id, user_id, total_seconds) VALUES (?, ?, ?)
+                       ON CONFLICT(guild_id, user_id) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds""",
+                    [(guild_id, int(user_id), float(delta)) for user_id, delta in seconds_items],
+                )
+            await self._credit_many(guild_id, coin_items)
+        if seconds_items:
+            self._cache.update("voice_stats", guild_id, lambda stats: self._apply_deltas(stats, seconds_items))
+
+    @staticmethod
+    def _apply_deltas(stats: dict, items: list):
+        for user_id, delta in items:
+            stats[int(user_id)] = stats.get(int(user_id), 0.0) + float(delta)
+
+    def set_voice_seconds(self, guild_id: int, user_id, seconds: float):
+        """Overwrite one user's current-month total."""
+        self._call(self._set_voice_seconds(guild_id, user_id, seconds))
+
+    async def _set_voice_seconds(self, guild_id: int, user_id, seconds: float):
+        await self._execute(
+            """INSERT INTO voice_stats (guild_id, user_id, total_seconds) VALUES (?, ?, ?)
+               ON CONFLICT(guild_id, user_id) DO UPDATE SET total_seconds = excluded.total_seconds""",
+            (guild_id, int(user_id), float(seconds)),
+        )
+        self._cache.update("voice_stats", guild_id, lambda stats: stats.__setitem__(int(user_id), float(seconds)))
+        await self._commit()
 
     def load_competitors(self, guild_id: int) -> dict:
-        return self._call(self._load_competitors(guild_id))
+        return self._cached("competitors", guild_id, self._load_competitors)
+
+    async def aload_competitors(self, guild_id: int) -> dict:
+        return await self._acached("competitors", guild_id, self._load_competitors)
 
     async def _load_competitors(self, guild_id: int) -> dict:
-        rows = await self._fetchall(
-            "SELECT user_id, channel_id FROM competitors WHERE guild_id = ?",
-            (guild_id,),
-        )
-        return {row["user_id"]: row["channel_id"] for row in rows}
+        return dict(await self._read_tuples(_SQL_LOAD_COMPETITORS, (guild_id,)))
 
     def save_competitors(self, guild_id: int, data: dict):
         self._call(self._save_competitors(guild_id, data))
 
     async def _save_competitors(self, guild_id: int, data: dict):
-        await self._conn.execute("DELETE FROM competitors WHERE guild_id = ?", (guild_id,))
         rows = self._normalize_competitors(guild_id, data)
-        if rows:
-            await self._conn.executemany(
-                "INSERT INTO competitors (guild_id, user_id, channel_id) VALUES (?, ?, ?)",
-                rows,
-            )
-        await self._conn.commit()
+        async with self._atomic():
+            await self._execute("DELETE FROM competitors WHERE guild_id = ?", (guild_id,))
+            if rows:
+                await self._executemany(
+                    "INSERT INTO competitors (guild_id, user_id, channel_id) VALUES (?, ?, ?)",
+                    rows,
+                )
+        self._cache.invalidate("competitors", guild_id)
+
+    def set_competitor(self, guild_id: int, user_id, channel_id):
+        self._call(self._set_competitor(guild_id, user_id, channel_id))
+
+    async def _set_competitor(self, guild_id: int, user_id, channel_id):
+        await self._execute(
+            """INSERT INTO competitors (guild_id, user_id, channel_id) VALUES (?, ?, ?)
+               ON CONFLICT(guild_id, user_id) DO UPDATE SET channel_id = excluded.channel_id""",
+            (guild_id, int(user_id), channel_id),
+        )
+        self._cache.invalidate("competitors", guild_id)
+        await self._commit()
+
+    def delete_competitor(self, guild_id: int, user_id):
+        self._call(self._delete_competitor(guild_id, user_id))
+
+    async def _delete_competitor(self, guild_id: int, user_id):
+        await self._execute(
+            "DELETE FROM competitors WHERE guild_id = ? AND user_id = ?",
+            (guild_id, int(user_id)),
+        )
+        self._cache.invalidate("competitors", guild_id)
+        await self._commit()
 
     def load_entry_settings(self, guild_id: int) -> dict:
-        return self._call(self._load_entry_settings(guild_id))
+        return self._cached("entry_settings", guild_id, self._load_entry_settings)
+
+    async def aload_entry_settings(self, guild_id: int) -> dict:
+        return await self._acached("entry_settings", guild_id, self._load_entry_settings)
 
     async def _load_entry_settings(self, guild_id: int) -> dict:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             "SELECT user_id, settings_json FROM entry_settings WHERE guild_id = ?",
             (guild_id,),
         )
@@ -408,22 +1301,35 @@ class SQLiteStorage:
         self._call(self._save_entry_settings(guild_id, data))
 
     async def _save_entry_settings(self, guild_id: int, data: dict):
-        await self._conn.execute("DELETE FROM entry_settings WHERE guild_id = ?", (guild_id,))
-        if data:
-            await self._conn.executemany(
-                "INSERT INTO entry_settings (guild_id, user_id, settings_json) VALUES (?, ?, ?)",
-                [
-                    (guild_id, str(user_id), json.dumps(value, ensure_ascii=False))
-                    for user_id, value in data.items()
-                ],
-            )
-        await self._conn.commit()
+        async with self._atomic():
+            await self._execute("DELETE FROM entry_settings WHERE guild_id = ?", (guild_id,))
+            if data:
+                await self._executemany(
+                    "INSERT INTO entry_settings (guild_id, user_id, settings_json) VALUES (?, ?, ?)",
+                    [
+                        (guild_id, int(user_id), _json_dumps(value))
+                        for user_id, value in data.items()
+                    ],
+                )
+        self._cache.invalidate("entry_settings", guild_id)
+
+    def set_entry_setting(self, guild_id: int, user_id, settings: dict):
+        self._call(self._set_entry_setting(guild_id, user_id, settings))
+
+    async def _set_entry_setting(self, guild_id: int, user_id, settings: dict):
+        await self._execute(
+            """INSERT INTO entry_settings (guild_id, user_id, settings_json) VALUES (?, ?, ?)
+               ON CONFLICT(guild_id, user_id) DO UPDATE SET settings_json = excluded.settings_json""",
+            (guild_id, int(user_id), _json_dumps(settings)),
+        )
+        self._cache.invalidate("entry_settings", guild_id)
+        await self._commit()
 
     def load_state(self, guild_id: int) -> dict:
         return self._call(self._load_state(guild_id))
 
     async def _load_state(self, guild_id: int) -> dict:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             "SELECT state_key, value_json FROM guild_state WHERE guild_id = ?",
             (guild_id,),
         )
@@ -433,22 +1339,22 @@ class SQLiteStorage:
         self._call(self._save_state(guild_id, data))
 
     async def _save_state(self, guild_id: int, data: dict):
-        await self._conn.execute("DELETE FROM guild_state WHERE guild_id = ?", (guild_id,))
-        if data:
-            await self._conn.executemany(
-                "INSERT INTO guild_state (guild_id, state_key, value_json) VALUES (?, ?, ?)",
-                [
-                    (guild_id, str(key), json.dumps(value, ensure_ascii=False))
-                    for key, value in data.items()
-                ],
-            )
-        await self._conn.commit()
+        async with self._atomic():
+            await self._execute("DELETE FROM guild_state WHERE guild_id = ?", (guild_id,))
+            if data:
+                await self._executemany(
+                    "INSERT INTO guild_state (guild_id, state_key, value_json) VALUES (?, ?, ?)",
+                    [
+                        (guild_id, str(key), _json_dumps(value))
+                        for key, value in data.items()
+                    ],
+                )
 
     def get_guild_state(self, guild_id: int, key: str):
         return self._call(self._get_guild_state(guild_id, key))
 
     async def _get_guild_state(self, guild_id: int, key: str):
-        row = await self._fetchone(
+        row = await self._read_fetchone(
             "SELECT value_json FROM guild_state WHERE guild_id = ? AND state_key = ?",
             (guild_id, key),
         )
@@ -458,55 +1364,82 @@ class SQLiteStorage:
         self._call(self._set_guild_state(guild_id, key, value))
 
     async def _set_guild_state(self, guild_id: int, key: str, value):
-        await self._conn.execute(
-            "INSERT OR REPLACE INTO guild_state (guild_id, state_key, value_json) VALUES (?, ?, ?)",
-            (guild_id, key, json.dumps(value, ensure_ascii=False)),
+        await self._execute(
+            """INSERT INTO guild_state (guild_id, state_key, value_json) VALUES (?, ?, ?)
+               ON CONFLICT(guild_id, state_key) DO UPDATE SET value_json = excluded.value_json""",
+            (guild_id, key, _json_dumps(value)),
         )
-        await self._conn.commit()
+        await self._commit()
 
     def append_chat_history(self, guild_id: int, speaker: str, content: str, limit: int):
         self._call(self._append_chat_history(guild_id, speaker, content, limit))
 
     async def _append_chat_history(self, guild_id: int, speaker: str, content: str, limit: int):
-        await self._conn.execute(
-            "INSERT INTO chat_history (guild_id, created_at, speaker, content) VALUES (?, ?, ?, ?)",
-            (guild_id, datetime.now(timezone.utc).isoformat(), speaker, content),
+        # Ring buffer: message number ``seq`` overwrites slot ``seq % limit``, so an
+        # append is two primary-key upserts no matter how large the limit is.
+        limit = max(1, int(limit))
+        rows = await self._fetchall(
+            """INSERT INTO chat_history_seq (guild_id, next_seq, ring_size) VALUES (?, 1, ?)
+               ON CONFLICT(guild_id) DO UPDATE SET next_seq = next_seq + 1
+               RETURNING next_seq - 1 AS seq, ring_size""",
+            (guild_id, limit),
         )
-        await self._conn.execute(
-            """
-            DELETE FROM chat_history
-            WHERE guild_id = ?
-              AND id NOT IN (
-                  SELECT id FROM chat_history
-                  WHERE guild_id = ?
-                  ORDER BY id DESC
-                  LIMIT ?
-              )
-            """,
-            (guild_id, guild_id, limit),
+        seq, ring_size = rows[0]["seq"], rows[0]["ring_size"]
+        if ring_size != limit:
+            await self._resize_chat_ring(guild_id, seq, limit)
+        await self._execute(
+            """INSERT INTO chat_history_ring (guild_id, slot, seq, created_at, speaker, content)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(guild_id, slot) DO UPDATE SET
+                   seq = excluded.seq,
+                   created_at = excluded.created_at,
+                   speaker = excluded.speaker,
+                   content = excluded.content""",
+            (guild_id, seq % limit, seq, datetime.now(timezone.utc).isoformat(), speaker, content),
+        )
+        await self._commit()
+
+    async def _resize_chat_ring(self, guild_id: int, seq: int, limit: int):
+        """Keep the newest ``limit - 1`` messages before ``seq`` and re-slot them for ``limit``."""
+        await self._execute(
+            "DELETE FROM chat_history_ring WHERE guild_id = ? AND seq <= ?",
+            (guild_id, seq - limit),
+        )
+        # Go through negative slots so the re-numbering never collides with itself.
+        await self._execute(
+            "UPDATE chat_history_ring SET slot = -1 - (seq % ?) WHERE guild_id = ?",
+            (limit, guild_id),
+        )
+        await self._execute(
+            "UPDATE chat_history_ring SET slot = -1 - slot WHERE guild_id = ?",
+            (guild_id,),
+        )
+        await self._execute(
+            "UPDATE chat_history_seq SET ring_size = ? WHERE guild_id = ?",
+            (limit, guild_id),
         )
-        await self._conn.commit()
 
-    def load_chat_history(self, guild_id: int, limit: int | None = None) -> list[str]:
+    def load_chat_history(self, guild_id: int, limit: int | None = None) -> list[dict]:
+        """Load chat history oldest first as ``{created_at, speaker, content}`` dicts."""
         return self._call(self._load_chat_history(guild_id, limit))
 
-    async def _load_chat_history(self, guild_id: int, limit: int | None = None) -> list[str]:
+    async def _load_chat_history(self, guild_id: int, limit: int | None = None) -> list[dict]:
         sql = (
-            "SELECT created_at, speaker, content FROM chat_history WHERE guild_id = ? ORDER BY id ASC"
+            "SELECT created_at, speaker, content FROM chat_history_ring WHERE guild_id = ? ORDER BY seq ASC"
             if limit is None
-            else "SELECT created_at, speaker, content FROM chat_history WHERE guild_id = ? ORDER BY id DESC LIMIT ?"
+            else "SELECT created_at, speaker, content FROM chat_history_ring WHERE guild_id = ? ORDER BY seq DESC LIMIT ?"
         )
         params = (guild_id,) if limit is None else (guild_id, limit)
-        rows = await self._fetchall(sql, params)
+        rows = await self._read_fetchall(sql, params)
         if limit is not None:
             rows = list(reversed(rows))
-        return [f"[{row['created_at']}] {row['speaker']}: {row['content']}" for row in rows]
+        return [dict(row) for row in rows]
 
     def load_voice_stats_archive(self, guild_id: int, archive_year: int, archive_month: int) -> dict:
         return self._call(self._load_voice_stats_archive(guild_id, archive_year, archive_month))
 
     async def _load_voice_stats_archive(self, guild_id: int, archive_year: int, archive_month: int) -> dict:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             "SELECT user_id, total_seconds FROM voice_stats_archive WHERE guild_id = ? AND archive_year = ? AND archive_month = ?",
             (guild_id, archive_year, archive_month),
         )
@@ -516,83 +1449,365 @@ class SQLiteStorage:
         self._call(self._archive_voice_stats(guild_id, archive_year, archive_month, data))
 
     async def _archive_voice_stats(self, guild_id: int, archive_year: int, archive_month: int, data: dict):
-        await self._conn.execute(
+        await self._execute(
             "DELETE FROM voice_stats_archive WHERE guild_id = ? AND archive_year = ? AND archive_month = ?",
             (guild_id, archive_year, archive_month),
         )
         if data:
-            await self._conn.executemany(
+            await self._executemany(
                 """
                 INSERT INTO voice_stats_archive
                 (guild_id, archive_year, archive_month, user_id, total_seconds)
                 VALUES (?, ?, ?, ?, ?)
                 """,
                 [
-                    (guild_id, archive_year, archive_month, str(user_id), self._normalize_voice_total(value))
+                    (guild_id, archive_year, archive_month, int(user_id), self._normalize_voice_total(value))
                     for user_id, value in data.items()
                 ],
             )
-        await self._conn.commit()
+        await self._commit()
+
+    def reset_voice_month(self, guild_id: int, archive_year: int, archive_month: int):
+        """Close a month: archive every user's current total and zero it, in one transaction.
+
+        voice_stats stays the live current-month counter, so the reset is an
+        archive insert plus a zeroing UPDATE rather than a rewrite of the table.
+        Resetting the same month again adds the time counted since to its archive.
+        """
+        self._call(self._reset_voice_month(guild_id, archive_year, archive_month))
+
+    async def _reset_voice_month(self, guild_id: int, archive_year: int, archive_month: int):
+        try:
+            async with self._atomic():
+                await self._execute(
+                    """INSERT INTO voice_stats_archive (guild_id, archive_year, archive_month, user_id, total_seconds)
+                       SELECT guild_id, ?, ?, user_id, total_seconds FROM voice_stats
+                       WHERE guild_id = ? AND total_seconds > 0
+                       ON CONFLICT(guild_id, archive_year, archive_month, user_id)
+                       DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds""",
+                    (archive_year, archive_month, guild_id),
+                )
+                await self._execute(
+                    "UPDATE voice_stats SET total_seconds = 0 WHERE guild_id = ? AND total_seconds != 0",
+                    (guild_id,),
+                )
+        finally:
+            self._cache.invalidate("voice_stats", guild_id)
 
     def load_all_time_voice_stats(self, guild_id: int) -> dict:
         return self._call(self._load_all_time_voice_stats(guild_id))
 
     async def _load_all_time_voice_stats(self, guild_id: int) -> dict:
-        rows = await self._fetchall(
-            """
-            SELECT user_id, SUM(total_seconds) AS total_seconds
+        rows = await self._read_fetchall(
+            "SELECT user_id, total_seconds FROM voice_stats_all_time WHERE guild_id = ?",
+            (guild_id,),
+        )
+        return {row["user_id"]: row["total_seconds"] for row in rows}
+
+    def get_all_time_voice_seconds(self, guild_id: int, user_id) -> float:
+        """All-time seconds (current month + archives) for one user."""
+        return self._call(self._get_all_time_voice_seconds(guild_id, user_id))
+
+    async def _get_all_time_voice_seconds(self, guild_id: int, user_id) -> float:
+        row = await self._read_fetchone(
+            "SELECT total_seconds FROM voice_stats_all_time WHERE guild_id = ? AND user_id = ?",
+            (guild_id, int(user_id)),
+        )
+        return row["total_seconds"] if row else 0.0
+
+    def rebuild_voice_stats_all_time(self, guild_id: int | None = None) -> int:
+        """Recompute voice_stats_all_time from scratch; returns the number of rows written."""
+        return self._call(self._rebuild_voice_stats_all_time(guild_id))
+
+    async def _rebuild_voice_stats_all_time(self, guild_id: int | None = None) -> int:
+        rebuilt = await self._recompute_voice_stats_all_time(guild_id)
+        await self._commit()
+        return rebuilt
+
+    async def _recompute_voice_stats_all_time(self, guild_id: int | None = None) -> int:
+        where, params = ("WHERE guild_id = ?", (guild_id,)) if guild_id is not None else ("", ())
+        await self._execute(f"DELETE FROM voice_stats_all_time {where}", params)
+        cursor = await self._execute(
+            f"""
+            INSERT INTO voice_stats_all_time (guild_id, user_id, total_seconds)
+            SELECT guild_id, user_id, SUM(total_seconds)
             FROM (
-                SELECT user_id, total_seconds FROM voice_stats WHERE guild_id = ?
+                SELECT guild_id, user_id, total_seconds FROM voice_stats {where}
                 UNION ALL
-                SELECT user_id, total_seconds FROM voice_stats_archive WHERE guild_id = ?
+                SELECT guild_id, user_id, total_seconds FROM voice_stats_archive {where}
             )
-            GROUP BY user_id
+            GROUP BY guild_id, user_id
             """,
-            (guild_id, guild_id),
+            params * 2,
         )
-        return {row["user_id"]: row["total_seconds"] for row in rows}
+        return cursor.rowcount
+
+    # --- Voice Sessions ---
+
+    async def _insert_voice_sessions(self, guild_id: int, sessions: list):
+        rows = [
+            (guild_id, int(user_id), channel_id, float(started_at), float(ended_at))
+            for user_id, channel_id, started_at, ended_at in sessions
+            if ended_at > started_at
+        ]
+        if rows:
+            await self._executemany(
+                "INSERT INTO voice_sessions (guild_id, user_id, channel_id, started_at, ended_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def open_voice_session(self, guild_id: int, user_id, channel_id, started_at: float):
+        """Record that a user joined voice, so the session survives a restart."""
+        self._call(self._open_voice_session(guild_id, user_id, channel_id, started_at))
+
+    async def aopen_voice_session(self, guild_id: int, user_id, channel_id, started_at: float):
+        await self._acall(self._open_voice_session(guild_id, user_id, channel_id, started_at))
+
+    async def _open_voice_session(self, guild_id: int, user_id, channel_id, started_at: float):
+        await self._execute(
+            """INSERT OR REPLACE INTO voice_open_sessions (guild_id, user_id, channel_id, started_at, checkpoint_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            (guild_id, int(user_id), channel_id, started_at, started_at),
+        )
+        await self._commit()
+
+    def record_voice_leave(self, guild_id: int, user_id, seconds: float, coins: float, session: tuple,
+                           next_channel_id=None) -> float:
+        """Credit a finished voice segment in one transaction and return the user's new total.
+
+        Adds ``seconds`` to the month's total, appends the final
+        ``(channel_id, started_at, ended_at)`` segment and credits ``coins``.
+        The open session is forgotten, or, when the user moved to
+        ``next_channel_id``, reopened there from ``ended_at``.
+        """
+        return self._call(self._record_voice_leave(guild_id, user_id, seconds, coins, session, next_channel_id))
+
+    async def arecord_voice_leave(self, guild_id: int, user_id, seconds: float, coins: float, session: tuple,
+                                 next_channel_id=None) -> float:
+        return await self._acall(self._record_voice_leave(guild_id, user_id, seconds, coins, session, next_channel_id))
+
+    async def _record_voice_leave(self, guild_id: int, user_id, seconds: float, coins: float, session: tuple,
+                                  next_channel_id=None) -> float:
+        channel_id, started_at, ended_at = session
+        try:
+            async with self._atomic():
+                total_seconds = await self._increment_voice_seconds(guild_id, user_id, seconds)
+                await self._insert_voice_sessions(guild_id, [(user_id, channel_id, started_at, ended_at)])
+                if next_channel_id is None:
+                    await self._execute(
+                        "DELETE FROM voice_open_sessions WHERE guild_id = ? AND user_id = ?",
+                        (guild_id, int(user_id)),
+                    )
+                else:
+                    await self._execute(
+                        """INSERT OR REPLACE INTO voice_open_sessions (guild_id, user_id, channel_id, started_at, checkpoint_at)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        (guild_id, int(user_id), next_channel_id, float(ended_at), float(ended_at)),
+                    )
+                await self._credit_many(guild_id, [(user_id, coins)])
+        except BaseException:
+            # The cached total was bumped before the rollback
+            self._cache.invalidate("voice_stats", guild_id)
+            raise
+        return total_seconds
+
+    async def _upsert_open_voice_sessions(self, rows):
+        """Upsert ``(guild_id, user_id, channel_id, started_at, checkpoint_at)`` rows, keeping the original start."""
+        await self._executemany(
+            """INSERT INTO voice_open_sessions (guild_id, user_id, channel_id, started_at, checkpoint_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(guild_id, user_id) DO UPDATE SET
+                   channel_id = excluded.channel_id, checkpoint_at = excluded.checkpoint_at""",
+            [
+                (guild_id, int(user_id), channel_id, float(started_at), float(checkpoint_at))
+                for guild_id, user_id, channel_id, started_at, checkpoint_at in rows
+            ],
+        )
+
+    def load_open_voice_sessions(self) -> dict:
+        """All persisted open sessions as ``{guild_id: {user_id: (channel_id, started_at, checkpoint_at)}}``."""
+        return self._call(self._load_open_voice_sessions())
+
+    async def aload_open_voice_sessions(self) -> dict:
+        return await self._acall(self._load_open_voice_sessions())
+
+    async def _load_open_voice_sessions(self) -> dict:
+        rows = await self._read_tuples(
+            "SELECT guild_id, user_id, channel_id, started_at, checkpoint_at FROM voice_open_sessions"
+        )
+        sessions = {}
+        for guild_id, user_id, channel_id, started_at, checkpoint_at in rows:
+            sessions.setdefault(guild_id, {})[user_id] = (channel_id, started_at, checkpoint_at)
+        return sessions
+
+    def reconcile_open_voice_sessions(self, resumed: list, closed: list):
+        """Replace the open-session set in one transaction after a restart.
+
+        ``resumed`` holds ``(guild_id, user_id, channel_id, started_at, checkpoint_at)``
+        for users found in voice; ``closed`` holds ``(guild_id, user_id)`` for
+        sessions that ended while the bot was down.
+        """
+        self._call(self._reconcile_open_voice_sessions(resumed, closed))
+
+    async def areconcile_open_voice_sessions(self, resumed: list, closed: list):
+        await self._acall(self._reconcile_open_voice_sessions(resumed, closed))
+
+    async def _reconcile_open_voice_sessions(self, resumed: list, closed: list):
+        async with self._atomic():
+            if closed:
+                await self._executemany(
+                    "DELETE FROM voice_open_sessions WHERE guild_id = ? AND user_id = ?",
+                    [(guild_id, int(user_id)) for guild_id, user_id in closed],
+                )
+            if resumed:
+                await self._upsert_open_voice_sessions(resumed)
+
+    def rollup_voice_sessions(self) -> int:
+        """Fold new session segments into the hourly/daily/monthly rollups; returns rows folded."""
+        return self._call(self._rollup_voice_sessions())
+
+    async def _rollup_voice_sessions(self) -> int:
+        folded = 0
+        while True:
+            batch = await self._rollup_voice_session_batch()
+            folded += batch
+            if batch < _ROLLUP_BATCH_SIZE:
+                return folded
+
+    async def _rollup_voice_session_batch(self) -> int:
+        async with self._atomic():
+            row = await self._fetchone("SELECT last_session_id FROM voice_rollup_watermark WHERE id = 0")
+            watermark = row[0] if row else 0
+            sessions = await self._fetchall(
+                """SELECT id, guild_id, user_id, started_at, ended_at FROM voice_sessions
+                   WHERE id > ? ORDER BY id LIMIT ?""",
+                (watermark, _ROLLUP_BATCH_SIZE),
+            )
+            if not sessions:
+                return 0
+            hourly, daily, monthly = {}, {}, {}
+            for _, guild_id, user_id, started_at, ended_at in sessions:
+                for hour_start, seconds in _split_by_hour(started_at, ended_at):
+                    local = datetime.fromtimestamp(hour_start, _ROLLUP_TZ)
+                    for buckets, key in (
+                        (hourly, (guild_id, hour_start, user_id)),
+                        (daily, (guild_id, local.strftime("%Y-%m-%d"), user_id)),
+                        (monthly, (guild_id, local.strftime("%Y-%m"), user_id)),
+                    ):
+                        buckets[key] = buckets.get(key, 0.0) + seconds
+            for table, column, buckets in (
+                ("voice_rollup_hourly", "hour_start", hourly),
+                ("voice_rollup_daily", "day", daily),
+                ("voice_rollup_monthly", "month", monthly),
+            ):
+                await self._executemany(
+                    f"""INSERT INTO {table} (guild_id, {column}, user_id, total_seconds) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(guild_id, {column}, user_id)
+                        DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds""",
+                    [(*key, seconds) for key, seconds in buckets.items()],
+                )
+            await self._execute(
+                """INSERT INTO voice_rollup_watermark (id, last_session_id) VALUES (0, ?)
+                   ON CONFLICT(id) DO UPDATE SET last_session_id = excluded.last_session_id""",
+                (sessions[-1][0],),
+            )
+        return len(sessions)
+
+    def voice_seconds_between(self, guild_id: int, start_ts: float, end_ts: float) -> dict:
+        """Per-user voice seconds in ``[start_ts, end_ts)``, at whole-hour granularity.
+
+        Reads the hourly roll-up only, so segments logged since the last maintenance tick are not counted yet.
+        """
+        return self._call(self._voice_seconds_between(guild_id, start_ts, end_ts))
+
+    async def avoice_seconds_between(self, guild_id: int, start_ts: float, end_ts: float) -> dict:
+        return await self._acall(self._voice_seconds_between(guild_id, start_ts, end_ts))
+
+    async def _voice_seconds_between(self, guild_id: int, start_ts: float, end_ts: float) -> dict:
+        rows = await self._read_tuples(
+            """SELECT user_id, SUM(total_seconds) FROM voice_rollup_hourly
+               WHERE guild_id = ? AND hour_start >= ? AND hour_start < ?
+               GROUP BY user_id""",
+            (guild_id, _hour_floor(start_ts), end_ts),
+        )
+        return dict(rows)
+
+    def voice_peak_hours(self, guild_id: int, start_ts: float, end_ts: float) -> list[tuple[int, float]]:
+        """Guild voice seconds per local (UTC+7) hour of day, busiest first."""
+        return self._call(self._voice_peak_hours(guild_id, start_ts, end_ts))
+
+    async def avoice_peak_hours(self, guild_id: int, start_ts: float, end_ts: float) -> list[tuple[int, float]]:
+        return await self._acall(self._voice_peak_hours(guild_id, start_ts, end_ts))
+
+    async def _voice_peak_hours(self, guild_id: int, start_ts: float, end_ts: float) -> list[tuple[int, float]]:
+        rows = await self._read_tuples(
+            """SELECT ((hour_start + ?) / 3600) % 24 AS local_hour, SUM(total_seconds) AS seconds
+               FROM voice_rollup_hourly
+               WHERE guild_id = ? AND hour_start >= ? AND hour_start < ?
+               GROUP BY local_hour ORDER BY seconds DESC""",
+            (_ROLLUP_UTC_OFFSET, guild_id, _hour_floor(start_ts), end_ts),
+        )
+        return [(int(hour), seconds) for hour, seconds in rows]
+
+    def voice_daily_totals(self, guild_id: int, first_day: str, last_day: str) -> dict:
+        """Guild voice seconds per local day (``YYYY-MM-DD``, inclusive range)."""
+        return self._call(self._voice_daily_totals(guild_id, first_day, last_day))
+
+    async def avoice_daily_totals(self, guild_id: int, first_day: str, last_day: str) -> dict:
+        return await self._acall(self._voice_daily_totals(guild_id, first_day, last_day))
+
+    async def _voice_daily_totals(self, guild_id: int, first_day: str, last_day: str) -> dict:
+        rows = await self._read_tuples(
+            """SELECT day, SUM(total_seconds) FROM voice_rollup_daily
+               WHERE guild_id = ? AND day BETWEEN ? AND ?
+               GROUP BY day ORDER BY day""",
+            (guild_id, first_day, last_day),
+        )
+        return dict(rows)
 
     # --- Channel Tracking Methods ---
 
     def load_tracked_channels(self, guild_id: int) -> list[int]:
         """Load list of tracked channel IDs."""
-        return self._call(self._load_tracked_channels(guild_id))
+        return self._cached("tracked_channels", guild_id, self._load_tracked_channels)
+
+    async def aload_tracked_channels(self, guild_id: int) -> list[int]:
+        return await self._acached("tracked_channels", guild_id, self._load_tracked_channels)
 
     async def _load_tracked_channels(self, guild_id: int) -> list[int]:
-        rows = await self._fetchall(
-            "SELECT channel_id FROM tracked_voice_channels WHERE guild_id = ? AND enabled = 1",
-            (guild_id,),
-        )
-        return [row["channel_id"] for row in rows]
+        rows = await self._read_tuples(_SQL_LOAD_TRACKED_CHANNELS, (guild_id,))
+        return [channel_id for (channel_id,) in rows]
 
     def add_tracked_channel(self, guild_id: int, channel_id: int):
         """Add a channel to tracking."""
         return self._call(self._add_tracked_channel(guild_id, channel_id))
 
     async def _add_tracked_channel(self, guild_id: int, channel_id: int):
-        await self._conn.execute(
+        await self._execute(
             "INSERT OR REPLACE INTO tracked_voice_channels (guild_id, channel_id, enabled, created_at) VALUES (?, ?, 1, ?)",
             (guild_id, channel_id, int(time.time())),
         )
-        await self._conn.commit()
+        self._cache.invalidate("tracked_channels", guild_id)
+        await self._commit()
 
     def remove_tracked_channel(self, guild_id: int, channel_id: int):
         """Remove a channel from tracking."""
         return self._call(self._remove_tracked_channel(guild_id, channel_id))
 
     async def _remove_tracked_channel(self, guild_id: int, channel_id: int):
-        await self._conn.execute(
+        await self._execute(
             "DELETE FROM tracked_voice_channels WHERE guild_id = ? AND channel_id = ?",
             (guild_id, channel_id),
         )
-        await self._conn.commit()
+        self._cache.invalidate("tracked_channels", guild_id)
+        await self._commit()
 
     def load_channel_voice_stats(self, guild_id: int, channel_id: int, period: str) -> float:
         """Load total seconds for a channel in a period."""
         return self._call(self._load_channel_voice_stats(guild_id, channel_id, period))
 
     async def _load_channel_voice_stats(self, guild_id: int, channel_id: int, period: str) -> float:
-        row = await self._fetchone(
+        row = await self._read_fetchone(
             "SELECT total_user_seconds FROM channel_voice_stats WHERE guild_id = ? AND channel_id = ? AND period = ?",
             (guild_id, channel_id, period),
         )
@@ -603,63 +1818,125 @@ class SQLiteStorage:
         return self._call(self._save_channel_voice_stats(guild_id, channel_id, period, total_seconds))
 
     async def _save_channel_voice_stats(self, guild_id: int, channel_id: int, period: str, total_seconds: float):
-        await self._conn.execute(
-            "INSERT OR REPLACE INTO channel_voice_stats (guild_id, channel_id, period, total_user_seconds) VALUES (?, ?, ?, ?)",
+        await self._execute(
+            """INSERT INTO channel_voice_stats (guild_id, channel_id, period, total_user_seconds) VALUES (?, ?, ?, ?)
+               ON CONFLICT(guild_id, channel_id, period) DO UPDATE SET total_user_seconds = excluded.total_user_seconds""",
             (guild_id, channel_id, period, total_seconds),
         )
-        await self._conn.commit()
+        await self._commit()
+
+    def load_channel_voice_stats_bulk(self, guild_id: int, period: str) -> dict:
+        """Load ``{channel_id: seconds}`` for every tracked channel in a period."""
+        return self._call(self._load_channel_voice_stats_bulk(guild_id, period))
+
+    async def _load_channel_voice_stats_bulk(self, guild_id: int, period: str) -> dict:
+        rows = await self._read_fetchall(
+            """
+            SELECT t.channel_id, COALESCE(s.total_user_seconds, 0) AS total_seconds
+            FROM tracked_voice_channels t
+            LEFT JOIN channel_voice_stats s
+              ON s.guild_id = t.guild_id AND s.channel_id = t.channel_id AND s.period = ?
+            WHERE t.guild_id = ? AND t.enabled = 1
+            """,
+            (period, guild_id),
+        )
+        return {row["channel_id"]: row["total_seconds"] for row in rows}
 
     def add_to_channel_stats(self, guild_id: int, channel_id: int, period: str, seconds: float):
         """Add seconds to channel stats."""
         return self._call(self._add_to_channel_stats(guild_id, channel_id, period, seconds))
 
     async def _add_to_channel_stats(self, guild_id: int, channel_id: int, period: str, seconds: float):
-        current = await self._load_channel_voice_stats(guild_id, channel_id, period)
-        await self._save_channel_voice_stats(guild_id, channel_id, period, current + seconds)
+        await self._execute(
+            """INSERT INTO channel_voice_stats (guild_id, channel_id, period, total_user_seconds) VALUES (?, ?, ?, ?)
+               ON CONFLICT(guild_id, channel_id, period)
+               DO UPDATE SET total_user_seconds = COALESCE(total_user_seconds, 0) + excluded.total_user_seconds""",
+            (guild_id, channel_id, period, seconds),
+        )
+        await self._commit()
 
     def reset_channel_stats_for_period(self, guild_id: int, period: str):
         """Reset all channel stats for a period to 0."""
         return self._call(self._reset_channel_stats_for_period(guild_id, period))
 
     async def _reset_channel_stats_for_period(self, guild_id: int, period: str):
-        await self._conn.execute(
+        await self._execute(
             "DELETE FROM channel_voice_stats WHERE guild_id = ? AND period = ?",
             (guild_id, period),
         )
-        await self._conn.commit()
+        await self._commit()
 
     def archive_channel_stats(self, guild_id: int, archive_year: int, archive_month: int, channel_id: int, total_seconds: float):
         """Archive channel stats for a month."""
         return self._call(self._archive_channel_stats(guild_id, archive_year, archive_month, channel_id, total_seconds))
 
     async def _archive_channel_stats(self, guild_id: int, archive_year: int, archive_month: int, channel_id: int, total_seconds: float):
-        await self._conn.execute(
+        await self._execute(
             """
-            INSERT OR REPLACE INTO channel_voice_stats_archive
+            INSERT INTO channel_voice_stats_archive
             (guild_id, channel_id, archive_year, archive_month, total_user_seconds)
             VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(guild_id, channel_id, archive_year, archive_month)
+            DO UPDATE SET total_user_seconds = excluded.total_user_seconds
             """,
             (guild_id, channel_id, archive_year, archive_month, total_seconds),
         )
-        await self._conn.commit()
+        await self._commit()
 
     def load_all_time_channel_stats(self, guild_id: int, channel_id: int) -> float:
         """Load all-time total seconds for a channel."""
         return self._call(self._load_all_time_channel_stats(guild_id, channel_id))
 
     async def _load_all_time_channel_stats(self, guild_id: int, channel_id: int) -> float:
-        row = await self._fetchone(
+        row = await self._read_fetchone(
+            "SELECT total_seconds FROM channel_voice_stats_all_time WHERE guild_id = ? AND channel_id = ?",
+            (guild_id, channel_id),
+        )
+        return row["total_seconds"] if row else 0.0
+
+    def load_all_time_channel_stats_bulk(self, guild_id: int) -> dict:
+        """Load ``{channel_id: all-time seconds}`` for every tracked channel in one query."""
+        return self._call(self._load_all_time_channel_stats_bulk(guild_id))
+
+    async def _load_all_time_channel_stats_bulk(self, guild_id: int) -> dict:
+        rows = await self._read_fetchall(
             """
-            SELECT SUM(total_user_seconds) AS total_seconds
+            SELECT t.channel_id, COALESCE(a.total_seconds, 0) AS total_seconds
+            FROM tracked_voice_channels t
+            LEFT JOIN channel_voice_stats_all_time a
+              ON a.guild_id = t.guild_id AND a.channel_id = t.channel_id
+            WHERE t.guild_id = ? AND t.enabled = 1
+            """,
+            (guild_id,),
+        )
+        return {row["channel_id"]: row["total_seconds"] for row in rows}
+
+    def rebuild_channel_stats_all_time(self, guild_id: int | None = None) -> int:
+        """Recompute channel_voice_stats_all_time from scratch; returns the number of rows written."""
+        return self._call(self._rebuild_channel_stats_all_time(guild_id))
+
+    async def _rebuild_channel_stats_all_time(self, guild_id: int | None = None) -> int:
+        rebuilt = await self._recompute_channel_stats_all_time(guild_id)
+        await self._commit()
+        return rebuilt
+
+    async def _recompute_channel_stats_all_time(self, guild_id: int | None = None) -> int:
+        where, params = ("WHERE guild_id = ?", (guild_id,)) if guild_id is not None else ("", ())
+        await self._execute(f"DELETE FROM channel_voice_stats_all_time {where}", params)
+        cursor = await self._execute(
+            f"""
+            INSERT INTO channel_voice_stats_all_time (guild_id, channel_id, total_seconds)
+            SELECT guild_id, channel_id, SUM(COALESCE(total_user_seconds, 0))
             FROM (
-                SELECT total_user_seconds FROM channel_voice_stats WHERE guild_id = ? AND channel_id = ?
+                SELECT guild_id, channel_id, total_user_seconds FROM channel_voice_stats {where}
                 UNION ALL
-                SELECT total_user_seconds FROM channel_voice_stats_archive WHERE guild_id = ? AND channel_id = ?
+                SELECT guild_id, channel_id, total_user_seconds FROM channel_voice_stats_archive {where}
             )
+            GROUP BY guild_id, channel_id
             """,
-            (guild_id, channel_id, guild_id, channel_id),
+            params * 2,
         )
-        return row["total_seconds"] if row and row["total_seconds"] else 0.0
+        return cursor.rowcount
 
     # --- Economy Methods ---
 
@@ -667,60 +1944,127 @@ class SQLiteStorage:
         return self._call(self._get_balance(guild_id, user_id))
 
     async def _get_balance(self, guild_id: int, user_id: int) -> float:
-        row = await self._fetchone(
-            "SELECT coins FROM economy_accounts WHERE guild_id = ? AND user_id = ?",
-            (guild_id, user_id),
-        )
-        return row["coins"] if row else 0.0
+        row = await self._read_tuple(_SQL_GET_BALANCE, (guild_id, user_id))
+        return row[0] if row else 0.0
 
     def add_coins(self, guild_id: int, user_id: int, amount: float) -> float:
         return self._call(self._add_coins(guild_id, user_id, amount))
 
+    async def aadd_coins(self, guild_id: int, user_id: int, amount: float) -> float:
+        return await self._acall(self._add_coins(guild_id, user_id, amount))
+
     async def _add_coins(self, guild_id: int, user_id: int, amount: float) -> float:
-        await self._conn.execute(
+        balance = await self._credit(guild_id, user_id, amount)
+        await self._commit()
+        return balance
+
+    async def _credit(self, guild_id: int, user_id: int, amount: float) -> float:
+        rows = await self._fetchall(
             """INSERT INTO economy_accounts (guild_id, user_id, coins) VALUES (?, ?, ?)
-               ON CONFLICT(guild_id, user_id) DO UPDATE SET coins = coins + ?""",
-            (guild_id, user_id, amount, amount),
+               ON CONFLICT(guild_id, user_id) DO UPDATE SET coins = coins + excluded.coins
+               RETURNING coins""",
+            (guild_id, user_id, amount),
         )
-        await self._conn.commit()
-        row = await self._fetchone(
-            "SELECT coins FROM economy_accounts WHERE guild_id = ? AND user_id = ?",
-            (guild_id, user_id),
+        return rows[0]["coins"]
+
+    def add_coins_many(self, guild_id: int, items: list):
+        """Credit many ``(user_id, amount)`` pairs in one statement batch and commit."""
+        self._call(self._add_coins_many(guild_id, items))
+
+    async def _add_coins_many(self, guild_id: int, items: list):
+        async with self._atomic():
+            await self._credit_many(guild_id, items)
+
+    async def _credit_many(self, guild_id: int, items: list):
+        if items:
+            await self._executemany(
+                """INSERT INTO economy_accounts (guild_id, user_id, coins) VALUES (?, ?, ?)
+                   ON CONFLICT(guild_id, user_id) DO UPDATE SET coins = coins + excluded.coins""",
+                [(guild_id, int(user_id), float(amount)) for user_id, amount in items],
+            )
+
+    async def _debit(self, guild_id: int, user_id: int, amount: float) -> float | None:
+        """Take ``amount`` only if the balance covers it; returns the new balance or None."""
+        rows = await self._fetchall(
+            """UPDATE economy_accounts SET coins = coins - ?
+               WHERE guild_id = ? AND user_id = ? AND coins >= ?
+               RETURNING coins""",
+            (amount, guild_id, user_id, amount),
         )
-        return row["coins"] if row else amount
+        return rows[0]["coins"] if rows else None
 
     def spend_coins(self, guild_id: int, user_id: int, amount: float) -> bool:
         return self._call(self._spend_coins(guild_id, user_id, amount))
 
     async def _spend_coins(self, guild_id: int, user_id: int, amount: float) -> bool:
-        balance = await self._get_balance(guild_id, user_id)
-        if balance < amount:
+        balance = await self._debit(guild_id, user_id, amount)
+        if balance is None:
             return False
-        await self._conn.execute(
-            "UPDATE economy_accounts SET coins = coins - ? WHERE guild_id = ? AND user_id = ?",
-            (amount, guild_id, user_id),
-        )
-        await self._conn.commit()
+        await self._commit()
         return True
 
+    def transfer(self, guild_id: int, from_user_id: int, to_user_id: int, amount: float, tax: float = 0) -> float | None:
+        """Move ``amount`` coins between users, burning ``tax`` from the sender.
+
+        Returns the sender's new balance, or None if they cannot cover amount + tax.
+        """
+        return self._call(self._transfer(guild_id, from_user_id, to_user_id, amount, tax))
+
+    async def _transfer(self, guild_id: int, from_user_id: int, to_user_id: int, amount: float, tax: float = 0) -> float | None:
+        async with self._atomic():
+            balance = await self._debit(guild_id, from_user_id, amount + tax)
+            if balance is not None:
+                await self._credit(guild_id, to_user_id, amount)
+        return balance
+
+    def purchase(self, guild_id: int, user_id: int, price: float, month: str, ptype: str, value: float,
+                 voice_seconds: float = 0) -> float | None:
+        """Debit ``price``, record the purchase and credit any voice hours in one transaction.
+
+        Returns the new balance, or None if the user cannot afford it.
+        """
+        return self._call(self._purchase(guild_id, user_id, price, month, ptype, value, voice_seconds))
+
+    async def apurchase(self, guild_id: int, user_id: int, price: float, month: str, ptype: str, value: float,
+                       voice_seconds: float = 0) -> float | None:
+        return await self._acall(self._purchase(guild_id, user_id, price, month, ptype, value, voice_seconds))
+
+    async def _purchase(self, guild_id: int, user_id: int, price: float, month: str, ptype: str, value: float,
+                        voice_seconds: float = 0) -> float | None:
+        try:
+            async with self._atomic():
+                balance = await self._debit(guild_id, user_id, price)
+                if balance is not None:
+                    await self._record_purchase(guild_id, user_id, month, ptype, value)
+                    if voice_seconds:
+                        await self._increment_voice_seconds(guild_id, user_id, voice_seconds)
+        except BaseException:
+            # The cached total was bumped before the rollback
+            self._cache.invalidate("voice_stats", guild_id)
+            raise
+        return balance
+
     def add_purchase(self, guild_id: int, user_id: int, month: str, ptype: str, value: float):
         self._call(self._add_purchase(guild_id, user_id, month, ptype, value))
 
     async def _add_purchase(self, guild_id: int, user_id: int, month: str, ptype: str, value: float):
-        await self._conn.execute(
+        await self._record_purchase(guild_id, user_id, month, ptype, value)
+        await self._commit()
+
+    async def _record_purchase(self, guild_id: int, user_id: int, month: str, ptype: str, value: float):
+        await self._execute(
             """INSERT INTO economy_purchases (guild_id, user_id, month, purchase_type, purchase_value)
                VALUES (?, ?, ?, ?, ?)
                ON CONFLICT(guild_id, user_id, month, purchase_type)
-               DO UPDATE SET purchase_value = purchase_value + ?""",
-            (guild_id, user_id, month, ptype, value, value),
+               DO UPDATE SET purchase_value = purchase_value + excluded.purchase_value""",
+            (guild_id, user_id, month, ptype, value),
         )
-        await self._conn.commit()
 
     def get_purchase(self, guild_id: int, user_id: int, month: str, ptype: str) -> float:
         return self._call(self._get_purchase(guild_id, user_id, month, ptype))
 
     async def _get_purchase(self, guild_id: int, user_id: int, month: str, ptype: str) -> float:
-        row = await self._fetchone(
+        row = await self._read_fetchone(
             "SELECT purchase_value FROM economy_purchases WHERE guild_id = ? AND user_id = ? AND month = ? AND purchase_type = ?",
             (guild_id, user_id, month, ptype),
         )
@@ -730,7 +2074,7 @@ class SQLiteStorage:
         return self._call(self._get_all_purchases(guild_id, user_id, month))
 
     async def _get_all_purchases(self, guild_id: int, user_id: int, month: str) -> dict:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             "SELECT purchase_type, purchase_value FROM economy_purchases WHERE guild_id = ? AND user_id = ? AND month = ?",
             (guild_id, user_id, month),
         )
@@ -740,28 +2084,226 @@ class SQLiteStorage:
         self._call(self._clear_purchases(guild_id))
 
     async def _clear_purchases(self, guild_id: int):
-        await self._conn.execute(
+        await self._execute(
             "DELETE FROM economy_purchases WHERE guild_id = ?",
             (guild_id,),
         )
-        await self._conn.commit()
+        await self._commit()
 
     def get_coin_leaderboard(self, guild_id: int, limit: int = 10) -> list:
         return self._call(self._get_coin_leaderboard(guild_id, limit))
 
     async def _get_coin_leaderboard(self, guild_id: int, limit: int = 10) -> list:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             "SELECT user_id, coins FROM economy_accounts WHERE guild_id = ? ORDER BY coins DESC LIMIT ?",
             (guild_id, limit),
         )
         return [(int(row["user_id"]), round(row["coins"], 1)) for row in rows]
 
+    # --- Schema Migrations ---
+
+    # Ordered (user_version, description, method) steps. Every step must be idempotent:
+    # fresh databases already have the latest schema from _create_schema and run each
+    # step once as a no-op.
+    _MIGRATIONS = (
+        (1, "add guild_config.patch_notes_channel_id", "_migrate_patch_notes_column"),
+        (2, "move chat_history into chat_history_ring", "_migrate_chat_history_to_ring"),
+        (3, "backfill all-time rollups", "_migrate_backfill_rollups"),
+        (4, "drop redundant indexes", "_migrate_drop_redundant_indexes"),
+        (5, "rebuild keyed tables WITHOUT ROWID", "_migrate_without_rowid"),
+        (6, "store user ids as INTEGER", "_migrate_integer_user_ids"),
+        (7, "enable incremental auto-vacuum", "_migrate_incremental_auto_vacuum"),
+        (8, "add guild_config.rank_thresholds_json", "_migrate_rank_thresholds_column"),
+    )
+    # Steps that must commit on their own (e.g. anything running VACUUM).
+    _NON_TRANSACTIONAL_MIGRATIONS = frozenset({7})
+
+    def schema_version(self) -> int:
+        """Current ``PRAGMA user_version`` of the database."""
+        return self._call(self._schema_version())
+
+    async def _schema_version(self) -> int:
+        row = await self._fetchone("PRAGMA user_version")
+        return row[0]
+
     async def _run_migrations(self):
-        """Apply schema migrations for tables that may already exist."""
-        try:
-            await self._conn.execute("ALTER TABLE guild_config ADD COLUMN patch_notes_channel_id INTEGER")
-        except Exception:
-            pass
+        """Apply every migration step newer than the database's user_version."""
+        version = await self._schema_version()
+        for step_version, description, method in self._MIGRATIONS:
+            if step_version <= version:
+                continue
+            started = time.perf_counter()
+            transactional = step_version not in self._NON_TRANSACTIONAL_MIGRATIONS
+            # The step and its version bump commit together, or not at all. Steps that
+            # cannot run inside a transaction must be safe to rerun instead.
+            if transactional:
+                await self._execute("BEGIN")
+            try:
+                await getattr(self, method)()
+                await self._execute(f"PRAGMA user_version = {step_version}")
+                await self._conn.commit()
+            except Exception:
+                await self._conn.rollback()
+                logging.exception("SQLite migration %d (%s) failed", step_version, description)
+                raise
+            logging.info(
+                "SQLite migration %d (%s) applied in %.1f ms",
+                step_version,
+                description,
+                (time.perf_counter() - started) * 1000,
+            )
+
+    async def _table_columns(self, table: str) -> list[str]:
+        rows = await self._fetchall(f"PRAGMA table_info({table})")
+        return [row["name"] for row in rows]
+
+    async def _rebuild_table(self, table: str, create_sql: str, select_sql: str | None = None):
+        """Recreate ``table`` from ``create_sql`` and copy its rows across.
+
+        ``create_sql`` uses ``{name}`` for the table name; ``select_sql`` defaults to a
+        straight column-for-column copy. Indexes are recreated; callers are responsible
+        for triggers (see :meth:`_suspend_triggers`).
+        """
+        staging = f"{table}__rebuild"
+        index_rows = await self._fetchall(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,),
+        )
+        columns = ", ".join(await self._table_columns(table))
+        await self._execute(f"DROP TABLE IF EXISTS {staging}")
+        await self._execute(create_sql.replace("{name}", staging))
+        await self._execute(
+            f"INSERT INTO {staging} ({columns}) {select_sql or f'SELECT {columns} FROM {table}'}"
+        )
+        await self._execute(f"DROP TABLE {table}")
+        await self._execute(f"ALTER TABLE {staging} RENAME TO {table}")
+        for index_row in index_rows:
+            await self._execute(index_row["sql"])
+
+    @contextlib.asynccontextmanager
+    async def _suspend_triggers(self):
+        """Drop the rollup triggers for the duration of a table rebuild, then restore them."""
+        rows = await self._fetchall("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        for row in rows:
+            await self._execute(f"DROP TRIGGER IF EXISTS {row['name']}")
+        yield
+        for statement in _TRIGGER_SQL:
+            await self._execute(statement)
+
+    async def _migrate_patch_notes_column(self):
+        if "patch_notes_channel_id" not in await self._table_columns("guild_config"):
+            await self._execute("ALTER TABLE guild_config ADD COLUMN patch_notes_channel_id INTEGER")
+
+    async def _migrate_rank_thresholds_column(self):
+        if "rank_thresholds_json" not in await self._table_columns("guild_config"):
+            await self._execute("ALTER TABLE guild_config ADD COLUMN rank_thresholds_json TEXT")
+
+    async def _migrate_backfill_rollups(self):
+        await self._backfill_all_time_rollup("voice_stats_all_time", self._recompute_voice_stats_all_time)
+        await self._backfill_all_time_rollup("channel_voice_stats_all_time", self._recompute_channel_stats_all_time)
+
+    async def _migrate_drop_redundant_indexes(self):
+        for index in _REDUNDANT_INDEXES:
+            await self._execute(f"DROP INDEX IF EXISTS {index}")
+
+    async def _create_template(self, table: str) -> str | None:
+        """The table's current CREATE TABLE statement with its name swapped for ``{name}``."""
+        row = await self._fetchone(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        )
+        if row is None:
+            return None
+        return re.sub(
+            r"^CREATE TABLE\s+(?:IF NOT EXISTS\s+)?[\"\w]+",
+            "CREATE TABLE {name}",
+            row["sql"].rstrip(),
+        )
+
+    async def _migrate_without_rowid(self):
+        async with self._suspend_triggers():
+            for table in _WITHOUT_ROWID_TABLES:
+                create_sql = await self._create_template(table)
+                if create_sql is None or create_sql.upper().endswith("WITHOUT ROWID"):
+                    continue
+                await self._rebuild_table(table, create_sql + " WITHOUT ROWID")
+
+    async def _migrate_integer_user_ids(self):
+        async with self._suspend_triggers():
+            for table in _INTEGER_USER_ID_TABLES:
+                create_sql = await self._create_template(table)
+                if create_sql is None:
+                    continue
+                columns = await self._fetchall(f"PRAGMA table_info({table})")
+                if any(col["name"] == "user_id" and col["type"].upper() == "INTEGER" for col in columns):
+                    continue
+                names = [col["name"] for col in columns]
+                select = ", ".join("CAST(user_id AS INTEGER)" if name == "user_id" else name for name in names)
+                # Rows whose id is not a snowflake can never match a member again.
+                await self._rebuild_table(
+                    table,
+                    re.sub(r"\buser_id\s+TEXT\b", "user_id INTEGER", create_sql, flags=re.IGNORECASE),
+                    f"SELECT {select} FROM {table} WHERE user_id NOT GLOB '*[^0-9]*' AND user_id <> ''",
+                )
+
+    async def _migrate_incremental_auto_vacuum(self):
+        if self._vacuum_on_start:
+            await self._convert_incremental_auto_vacuum()
+            return
+        row = await self._fetchone("PRAGMA auto_vacuum")
+        if row[0] != _AUTO_VACUUM_INCREMENTAL:
+            logging.info(
+                "SQLite file is not in incremental auto-vacuum mode; start once with "
+                "BEANIE_SQLITE_VACUUM_ON_START=1 to convert it (runs a full VACUUM)"
+            )
+
+    async def _convert_incremental_auto_vacuum(self):
+        """Switch an existing file to incremental auto-vacuum with a one-off full VACUUM."""
+        row = await self._fetchone("PRAGMA auto_vacuum")
+        if row[0] == _AUTO_VACUUM_INCREMENTAL:
+            return
+        started = time.perf_counter()
+        # Switching an existing file's auto_vacuum mode only takes effect through VACUUM.
+        await self._execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await self._execute("VACUUM")
+        logging.info("SQLite converted to incremental auto-vacuum in %.1f ms", (time.perf_counter() - started) * 1000)
+
+    async def _backfill_all_time_rollup(self, table: str, recompute):
+        """Populate an all-time rollup the first time it appears next to existing stats."""
+        populated = await self._fetchone(f"SELECT 1 FROM {table} LIMIT 1")
+        if populated is not None:
+            return
+        rebuilt = await recompute()
+        if rebuilt:
+            logging.info("Backfilled %s with %d rows", table, rebuilt)
+
+    async def _migrate_chat_history_to_ring(self):
+        """Move rows from the old append-and-trim chat_history table into the ring."""
+        legacy = await self._fetchone(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'chat_history'"
+        )
+        if legacy is None:
+            return
+        # The ring size is unknown here; leaving it NULL makes the first append
+        # trim each guild down to the configured limit.
+        await self._execute(
+            """
+            INSERT OR IGNORE INTO chat_history_ring (guild_id, slot, seq, created_at, speaker, content)
+            SELECT guild_id, rn, rn, created_at, speaker, content FROM (
+                SELECT guild_id, created_at, speaker, content,
+                       ROW_NUMBER() OVER (PARTITION BY guild_id ORDER BY id) - 1 AS rn
+                FROM chat_history
+            )
+            """
+        )
+        await self._execute(
+            """
+            INSERT OR IGNORE INTO chat_history_seq (guild_id, next_seq, ring_size)
+            SELECT guild_id, COUNT(*), NULL FROM chat_history GROUP BY guild_id
+            """
+        )
+        await self._execute("DROP TABLE chat_history")
+        logging.info("Migrated chat_history into chat_history_ring")
 
     # ── Event CRUD ──────────────────────────────────────────────────────
 
@@ -771,19 +2313,19 @@ class SQLiteStorage:
 
     async def _add_event(self, guild_id: int, event_type: str, scope: str, value: float,
                          starts_at: str, ends_at: str, reason: str = "") -> int:
-        cursor = await self._conn.execute(
+        cursor = await self._execute(
             """INSERT INTO economy_events (guild_id, event_type, scope, value, starts_at, ends_at, reason)
                VALUES (?, ?, ?, ?, ?, ?, ?)""",
             (guild_id, event_type, scope, value, starts_at, ends_at, reason),
         )
-        await self._conn.commit()
+        await self._commit()
         return cursor.lastrowid
 
     def get_active_custom_events(self, guild_id: int, now_iso: str) -> list:
         return self._call(self._get_active_custom_events(guild_id, now_iso))
 
     async def _get_active_custom_events(self, guild_id: int, now_iso: str) -> list:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             """SELECT id, guild_id, event_type, scope, value, starts_at, ends_at, reason
                FROM economy_events
                WHERE guild_id IN (0, ?) AND active = 1 AND starts_at <= ? AND ends_at >= ?""",
@@ -795,27 +2337,27 @@ class SQLiteStorage:
         self._call(self._deactivate_event(event_id))
 
     async def _deactivate_event(self, event_id: int):
-        await self._conn.execute(
+        await self._execute(
             "UPDATE economy_events SET active = 0 WHERE id = ?",
             (event_id,),
         )
-        await self._conn.commit()
+        await self._commit()
 
     def deactivate_guild_events(self, guild_id: int):
         self._call(self._deactivate_guild_events(guild_id))
 
     async def _deactivate_guild_events(self, guild_id: int):
-        await self._conn.execute(
+        await self._execute(
             "UPDATE economy_events SET active = 0 WHERE guild_id = ? AND active = 1",
             (guild_id,),
         )
-        await self._conn.commit()
+        await self._commit()
 
     def get_all_events_for_guild(self, guild_id: int) -> list:
         return self._call(self._get_all_events_for_guild(guild_id))
 
     async def _get_all_events_for_guild(self, guild_id: int) -> list:
-        rows = await self._fetchall(
+        rows = await self._read_fetchall(
             """SELECT id, guild_id, event_type, scope, value, starts_at, ends_at, reason, active
                FROM economy_events
                WHERE guild_id IN (0, ?)
@@ -824,13 +2366,93 @@ class SQLiteStorage:
         )
         return [dict(row) for row in rows]
 
+    async def _execute(self, sql: str, params=()):
+        async with self._write_lock():
+            started = time.perf_counter()
+            cursor = await self._conn.execute(sql, params)
+            await self._record_statement(self._conn, sql, params, started)
+            return cursor
+
+    async def _executemany(self, sql: str, rows):
+        async with self._write_lock():
+            started = time.perf_counter()
+            cursor = await self._conn.executemany(sql, rows)
+            await self._record_statement(self._conn, sql, None, started)
+            return cursor
+
+    async def _commit_connection(self):
+        started = time.perf_counter()
+        await self._conn.commit()
+        await self._record_statement(self._conn, "COMMIT", None, started)
+
+    async def _query(self, conn, sql: str, params, many: bool, tuples: bool = False):
+        started = time.perf_counter()
+        async with conn.execute(sql, params) as cursor:
+            if tuples:
+                cursor.row_factory = None
+            result = await (cursor.fetchall() if many else cursor.fetchone())
+        await self._record_statement(conn, sql, params, started)
+        return result
+
     async def _fetchone(self, sql: str, params=()):
-        async with self._conn.execute(sql, params) as cursor:
-            return await cursor.fetchone()
+        async with self._write_lock():
+            return await self._query(self._conn, sql, params, many=False)
 
     async def _fetchall(self, sql: str, params=()):
-        async with self._conn.execute(sql, params) as cursor:
-            return await cursor.fetchall()
+        async with self._write_lock():
+            return await self._query(self._conn, sql, params, many=True)
+
+    async def _read_fetchone(self, sql: str, params=()):
+        async with self._reader() as conn:
+            return await self._query(conn, sql, params, many=False)
+
+    async def _read_fetchall(self, sql: str, params=()):
+        async with self._reader() as conn:
+            return await self._query(conn, sql, params, many=True)
+
+    async def _read_tuple(self, sql: str, params=()):
+        """Like :meth:`_read_fetchone` but returns a plain tuple, for hot paths."""
+        async with self._reader() as conn:
+            return await self._query(conn, sql, params, many=False, tuples=True)
+
+    async def _read_tuples(self, sql: str, params=()):
+        """Like :meth:`_read_fetchall` but returns plain tuples, for hot paths."""
+        async with self._reader() as conn:
+            return await self._query(conn, sql, params, many=True, tuples=True)
+
+    async def _record_statement(self, conn, sql: str, params, started: float):
+        if not self._profiler.enabled:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._profiler.record_statement(sql, elapsed_ms)
+        if not self._profiler.is_slow(elapsed_ms):
+            return
+        plan = await self._explain(conn, sql, params)
+        self._profiler.record_slow(sql, elapsed_ms, plan)
+        logging.warning(
+            "Slow SQLite statement (%.1f ms): %s | plan: %s",
+            elapsed_ms,
+            " ".join(sql.split()),
+            "; ".join(plan) or "n/a",
+        )
+
+    @staticmethod
+    async def _explain(conn, sql: str, params) -> list[str]:
+        """``EXPLAIN QUERY PLAN`` details for a data statement; empty for anything else."""
+        if params is None or not sql.lstrip().upper().startswith(_EXPLAINABLE_PREFIXES):
+            return []
+        try:
+            async with conn.execute(f"EXPLAIN QUERY PLAN {sql}", params) as cursor:
+                return [row[3] for row in await cursor.fetchall()]
+        except sqlite3.Error:
+            return []
+
+    def profile_snapshot(self) -> dict:
+        """Per-method queue/exec latency, per-statement latency and the slow-query log."""
+        return self._profiler.snapshot()
+
+    def reset_profile(self):
+        self._profiler.reset()
 
 
     @staticmethod
@@ -844,7 +2466,7 @@ class SQLiteStorage:
     @staticmethod
     def _normalize_competitors(guild_id: int, data) -> list[tuple[int, str, int | None]]:
         if isinstance(data, list):
-            return [(guild_id, str(user_id), None) for user_id in data]
+            return [(guild_id, int(user_id), None) for user_id in data]
         if isinstance(data, dict):
-            return [(guild_id, str(user_id), channel_id) for user_id, channel_id in data.items()]
-        return []
\ No newline at end of file
+            return [(guild_id, int(user_id), channel_id) for user_id, channel_id in data.items()]
+        return []
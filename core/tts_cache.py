@@ -0,0 +1,173 @@
+"""
+TTS audio cache for Beanie Bot.
+Content-addressed gTTS clips on disk with LRU eviction.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from gtts import gTTS
+
+from core.opus_audio import PACKET_SUFFIX, opus_path_for, remove_opus
+
+DEFAULT_CACHE_DIR = os.path.join("data", "sfx", "tts_cache")
+
+
+def _gtts_synthesize(text: str, lang: str, path: str):
+    gTTS(text=text, lang=lang, slow=False).save(path)
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC with whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, lang: str) -> str:
+    """Content address of a (text, lang) clip."""
+    return hashlib.sha256(f"{lang}\0{normalize_text(text)}".encode("utf-8")).hexdigest()[:32]
+
+
+class TTSCache:
+    """
+    Size-bounded cache of synthesized speech.
+
+    Clips are stored as ``<key>.mp3`` under ``cache_dir`` and evicted least
+    recently used once the directory exceeds ``max_bytes``. A clip's Opus
+    packet file (``<key>.mp3.opuspk``) counts against the budget and is
+    evicted with it. Concurrent requests for the same clip share a single
+    synthesis.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: Optional[int] = None,
+                 synthesize: Callable[[str, str, str], None] = _gtts_synthesize):
+        """
+        Initialize the cache and index clips already on disk.
+
+        Args:
+            cache_dir: Directory holding cached clips
+            max_bytes: Disk budget (default ``BEANIE_TTS_CACHE_MB``, 50 MB)
+            synthesize: ``(text, lang, path)`` writer, gTTS by default
+        """
+        self.cache_dir = cache_dir
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("BEANIE_TTS_CACHE_MB", "50")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.synthesize = synthesize
+        self.hits = 0
+        self.misses = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._disk_total = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                # Left behind by an interrupted synthesis
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif name.endswith(PACKET_SUFFIX) and not os.path.exists(path[:-len(PACKET_SUFFIX)]):
+                os.remove(path)  # Transcode of a clip that is gone
+            elif name.endswith(".mp3"):
+                entries.append((os.path.getmtime(path), name[:-4]))
+        for _, key in sorted(entries):
+            self._set_size(key)
+        self._evict_disk()
+        logging.info(f"TTS cache: {len(self._disk)} clips, {self._disk_total / 1024:.0f} KB in {self.cache_dir}")
+
+    def _entry_size(self, key: str) -> int:
+        """Bytes a clip takes on disk, including its Opus packet file."""
+        size = 0
+        for path in (self._path(key), opus_path_for(self._path(key))):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def _set_size(self, key: str):
+        """(Re)count a clip's size and mark it most recently used."""
+        if key in self._disk:
+            self._disk_total -= self._disk.pop(key)
+        size = self._disk[key] = self._entry_size(key)
+        self._disk_total += size
+
+    def _touch(self, key: str):
+        self._disk.move_to_end(key)
+        try:
+            os.utime(self._path(key))  # Recency survives restarts via mtime
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        while self._disk_total > self.max_bytes and len(self._disk) > 1:
+            key, size = self._disk.popitem(last=False)
+            self._disk_total -= size
+            try:
+                os.remove(self._path(key))
+                remove_opus(self._path(key))
+            except OSError as e:
+                logging.warning(f"TTS cache: failed to evict {key}: {e}")
+
+    async def _ensure(self, text: str, lang: str) -> str:
+        key = cache_key(text, lang)
+        if key in self._disk and os.path.exists(self._path(key)):
+            self.hits += 1
+            self._touch(key)
+            return key
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            await asyncio.shield(inflight)
+            return key
+        self.misses += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            await asyncio.to_thread(self.synthesize, normalize_text(text), lang, tmp_path)
+            os.replace(tmp_path, path)
+            self._set_size(key)
+            self._evict_disk()
+            future.set_result(None)
+            return key
+        except BaseException as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            future.set_exception(e)
+            future.exception()  # Mark retrieved; waiters re-raise it themselves
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def get_path(self, text: str, lang: str = "vi") -> str:
+        """Path of the clip for ``text``, synthesizing it on a miss."""
+        return self._path(await self._ensure(text, lang))
+
+    def refresh(self, path: str):
+        """Recount a clip after its Opus packet file was written, evicting if over budget."""
+        key = os.path.basename(path)[:-len(".mp3")]
+        if key in self._disk:
+            self._set_size(key)
+            self._evict_disk()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current disk usage."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "clips": len(self._disk),
+            "disk_bytes": self._disk_total,
+        }
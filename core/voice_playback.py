@@ -0,0 +1,310 @@
+"""
+Voice playback for Beanie Bot.
+Keeps one voice connection per guild alive and schedules sounds per guild by priority.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+import discord
+
+# Lower plays first: a greeting is only useful right after the join
+PRIORITY_ENTRANCE = 0
+PRIORITY_SAY = 1
+
+# Pending sounds allowed per guild, by priority
+QUEUE_LIMITS: Dict[int, int] = {
+    PRIORITY_ENTRANCE: 5,
+    PRIORITY_SAY: 10,
+}
+
+
+class VoiceConnectionManager:
+    """
+    One persistent voice client per guild.
+
+    Sounds reuse the guild's connection, moving it between channels with
+    ``move_to`` instead of reconnecting, and the client disconnects only after
+    ``idle_timeout`` seconds without playback. Plays in a guild run one at a
+    time in arrival order; different guilds play concurrently.
+    """
+
+    def __init__(self, idle_timeout: Optional[float] = None, play_timeout: float = 300.0):
+        """
+        Initialize the manager.
+
+        Args:
+            idle_timeout: Seconds to stay connected after the last sound
+                (default ``BEANIE_VOICE_IDLE_SECONDS``, 300); 0 disconnects right away
+            play_timeout: Longest a single sound may play before it is stopped
+        """
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv("BEANIE_VOICE_IDLE_SECONDS", "300"))
+        self.idle_timeout = idle_timeout
+        self.play_timeout = play_timeout
+        self.locks: Dict[int, asyncio.Lock] = {}
+        self.idle_tasks: Dict[int, asyncio.Task] = {}
+
+    @staticmethod
+    def _connected_client(guild) -> Optional[discord.VoiceClient]:
+        voice_client = guild.voice_client
+        if voice_client is not None and voice_client.is_connected():
+            return voice_client
+        return None
+
+    def _cancel_idle(self, guild_id: int):
+        task = self.idle_tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+    def _schedule_idle(self, guild):
+        self._cancel_idle(guild.id)
+        self.idle_tasks[guild.id] = asyncio.create_task(self._disconnect_when_idle(guild))
+
+    async def _disconnect_when_idle(self, guild):
+        try:
+            await asyncio.sleep(self.idle_timeout)
+        except asyncio.CancelledError:
+            return
+        if self.idle_tasks.get(guild.id) is asyncio.current_task():
+            del self.idle_tasks[guild.id]
+        lock = self.locks.get(guild.id)
+        if lock is not None and lock.locked():
+            return  # A play started meanwhile and reschedules when it ends
+        await self.disconnect(guild)
+
+    @staticmethod
+    def _finish(finished: asyncio.Future, error: Optional[Exception]):
+        if finished.done():
+            return
+        if error is None:
+            finished.set_result(None)
+        else:
+            finished.set_exception(error)
+
+    async def connect(self, guild, channel) -> discord.VoiceClient:
+        """
+        Get the guild's voice client in ``channel``, connecting or moving as needed.
+
+        Args:
+            guild: Guild to play in
+            channel: Voice channel the client should be in
+
+        Returns:
+            Connected voice client
+        """
+        voice_client = self._connected_client(guild)
+        if voice_client is None:
+            return await channel.connect()
+        if voice_client.channel.id != channel.id:
+            await voice_client.move_to(channel)
+        return voice_client
+
+    async def play(self, guild, channel, source: discord.AudioSource):
+        """
+        Play ``source`` in ``channel`` once earlier plays in the guild finish.
+
+        Args:
+            guild: Guild to play in
+            channel: Voice channel to play in
+            source: Audio source; cleaned up by discord.py once played
+
+        Raises:
+            asyncio.TimeoutError: If the sound played longer than ``play_timeout`` (it is stopped)
+            Exception: Connection or playback errors, after the idle timer is re-armed
+        """
+        lock = self.locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            self._cancel_idle(guild.id)
+            voice_client = None
+            try:
+                voice_client = await self.connect(guild, channel)
+                # discord.py calls ``after`` from its player thread when the source ends
+                loop = asyncio.get_running_loop()
+                finished = loop.create_future()
+                voice_client.play(source, after=lambda error: loop.call_soon_threadsafe(self._finish, finished, error))
+                try:
+                    await asyncio.wait_for(finished, self.play_timeout)
+                except asyncio.TimeoutError:
+                    logging.warning(f"Playback in guild {guild.id} ran past {self.play_timeout:.0f}s, stopping it")
+                    raise
+            except BaseException:
+                if voice_client is not None and voice_client.is_playing():
+                    voice_client.stop()  # The player thread cleans up the source
+                else:
+                    source.cleanup()
+                raise
+            finally:
+                self._schedule_idle(guild)
+
+    async def disconnect(self, guild):
+        """Disconnect the guild's voice client, if any."""
+        self._cancel_idle(guild.id)
+        voice_client = self._connected_client(guild)
+        if voice_client is None:
+            return
+        try:
+            await voice_client.disconnect()
+            logging.info(f"Disconnected idle voice client in guild {guild.id}")
+        except Exception as e:
+            logging.warning(f"Failed to disconnect voice in guild {guild.id}: {e}")
+
+    async def close(self, guilds):
+        """Disconnect every guild's voice client (e.g. on cog unload)."""
+        for guild in guilds:
+            await self.disconnect(guild)
+
+
+class _Request:
+    """A queued sound; ordered by priority, then arrival."""
+
+    __slots__ = ("priority", "seq", "channel", "load", "key", "enqueued_at", "future")
+
+    def __init__(self, priority: int, seq: int, channel, load, key, enqueued_at: float, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.channel = channel
+        self.load = load
+        self.key = key
+        self.enqueued_at = enqueued_at
+        self.future = future
+
+    def __lt__(self, other: "_Request") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AudioScheduler:
+    """
+    Per-guild playback queues in front of a VoiceConnectionManager.
+
+    Each guild has a bounded priority queue drained by its own worker, so
+    guilds play concurrently and a busy guild never silences another. Sounds
+    are loaded only when their turn comes, dropped if they waited longer than
+    their priority's max wait, and a request with the same ``key`` as one
+    still pending replaces it instead of queueing again.
+    """
+
+    def __init__(self, connections: VoiceConnectionManager, max_wait: Optional[Dict[int, float]] = None,
+                 queue_limits: Optional[Dict[int, int]] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the scheduler.
+
+        Args:
+            connections: Voice connections to play through
+            max_wait: Seconds a sound may wait per priority (defaults from
+                ``BEANIE_ENTRANCE_MAX_WAIT``, 20, and ``BEANIE_SAY_MAX_WAIT``, 120)
+            queue_limits: Pending sounds allowed per guild and priority
+            clock: Monotonic clock (injectable for tests)
+        """
+        if max_wait is None:
+            max_wait = {
+                PRIORITY_ENTRANCE: float(os.getenv("BEANIE_ENTRANCE_MAX_WAIT", "20")),
+                PRIORITY_SAY: float(os.getenv("BEANIE_SAY_MAX_WAIT", "120")),
+            }
+        self.connections = connections
+        self.max_wait = max_wait
+        self.queue_limits = QUEUE_LIMITS if queue_limits is None else queue_limits
+        self.clock = clock
+        self.queues: Dict[int, List[_Request]] = {}
+        self.pending: Dict[int, Dict[Hashable, _Request]] = {}
+        self.workers: Dict[int, asyncio.Task] = {}
+        self._seq = 0
+
+    def submit(self, guild, channel, load: Callable[[], Awaitable[Optional[discord.AudioSource]]],
+               priority: int = PRIORITY_SAY, key: Optional[Hashable] = None) -> asyncio.Future:
+        """
+        Queue a sound for ``channel``.
+
+        Args:
+            guild: Guild to play in
+            channel: Voice channel to play in
+            load: Coroutine function returning the source when the sound's turn
+                comes, or None to skip it
+            priority: ``PRIORITY_ENTRANCE`` or ``PRIORITY_SAY``
+            key: Coalescing key; a pending request with the same key is updated
+                in place instead
+
+        Returns:
+            Future resolving to True once played, False if skipped, dropped or
+            cancelled, or raising the load/playback error
+
+        Raises:
+            asyncio.QueueFull: If the guild already has the maximum pending sounds at this priority
+        """
+        pending = self.pending.setdefault(guild.id, {})
+        if key is not None and key in pending:
+            request = pending[key]
+            request.channel = channel
+            request.load = load
+            return request.future
+
+        queue = self.queues.setdefault(guild.id, [])
+        limit = self.queue_limits.get(priority)
+        if limit is not None and sum(1 for request in queue if request.priority == priority) >= limit:
+            raise asyncio.QueueFull()
+
+        self._seq += 1
+        request = _Request(priority, self._seq, channel, load, key, self.clock(),
+                           asyncio.get_running_loop().create_future())
+        heapq.heappush(queue, request)
+        if key is not None:
+            pending[key] = request
+        if guild.id not in self.workers:
+            self.workers[guild.id] = asyncio.create_task(self._drain(guild))
+        return request.future
+
+    @staticmethod
+    def _resolve(request: _Request, result: bool = False, error: Optional[BaseException] = None):
+        if request.future.done():
+            return
+        if error is None:
+            request.future.set_result(result)
+        else:
+            request.future.set_exception(error)
+            request.future.exception()  # Mark retrieved; awaiting callers still get the error
+
+    async def _drain(self, guild):
+        queue = self.queues[guild.id]
+        pending = self.pending[guild.id]
+        try:
+            while queue:
+                request = heapq.heappop(queue)
+                if request.key is not None:
+                    pending.pop(request.key, None)
+                waited = self.clock() - request.enqueued_at
+                if waited > self.max_wait.get(request.priority, float("inf")):
+                    logging.info(f"Dropped sound in guild {guild.id} after waiting {waited:.0f}s (priority {request.priority})")
+                    self._resolve(request)
+                    continue
+                try:
+                    source = await request.load()
+                    if source is None:
+                        self._resolve(request)
+                        continue
+                    await self.connections.play(guild, request.channel, source)
+                    self._resolve(request, True)
+                except asyncio.CancelledError:
+                    self._resolve(request)
+                    raise
+                except Exception as e:
+                    logging.error(f"Playback error in guild {guild.id}: {e}")
+                    self._resolve(request, error=e)
+        finally:
+            self.workers.pop(guild.id, None)
+
+    async def close(self, guilds: Iterable):
+        """Cancel queued sounds and disconnect every guild."""
+        guilds = list(guilds)
+        for task in list(self.workers.values()):
+            task.cancel()
+        for queue in self.queues.values():
+            for request in queue:
+                self._resolve(request)
+            queue.clear()
+        for pending in self.pending.values():
+            pending.clear()
+        await self.connections.close(guilds)
@@ -6,6 +6,8 @@ import re
 import asyncio
 from datetime import datetime
 
+from core.ranks import DEFAULT_THRESHOLDS, RANK_NAMES
+
 TOOL_DEFINITIONS = [
     {
         "type": "function",
@@ -383,7 +385,9 @@ async def dispatch_tool(tool_name, tool_args, ctx):
                 return f"Không tìm thấy item '{item_name}'. Dùng shop_list để xem danh sách."
             item = SHOP_ITEMS[matched_key]
             discounts = compute_item_discounts(storage, guild_id)
-            success, msg, _ = process_purchase(storage, guild_id, user_id, matched_key, item, discounts, voice_feature=voice_feature)
+            success, msg, _ = process_purchase(storage, guild_id, user_id, matched_key, item, discounts, voice_feature)
+            if success and voice_feature and channel is not None and channel.guild:
+                voice_feature.schedule_rank_flush(channel.guild)
             return msg
 
         elif tool_name == "my_purchases":
@@ -416,16 +420,12 @@ async def dispatch_tool(tool_name, tool_args, ctx):
                 return f"Không tìm thấy người dùng '{recipient_str}'."
             if recipient_member.id == user_id:
                 return "Không thể tặng coin cho chính mình!"
-            balance = storage.get_balance(guild_id, user_id)
             tax = int(amount * 0.1)
             total_deduct = amount + tax
-            if balance < total_deduct:
+            sender_new = storage.transfer(guild_id, user_id, recipient_member.id, float(amount), tax=tax)
+            if sender_new is None:
+                balance = storage.get_balance(guild_id, user_id)
                 return f"Bạn chỉ có {balance:.1f}🪙, cần {total_deduct}🪙 (gồm {tax}🪙 thuế)."
-            success = storage.spend_coins(guild_id, user_id, total_deduct)
-            if not success:
-                return "Giao dịch thất bại."
-            storage.add_coins(guild_id, recipient_member.id, float(amount))
-            sender_new = storage.get_balance(guild_id, user_id)
             return (
                 f"Đã gửi **{amount}🪙** cho **{recipient_member.display_name}**! "
                 f"(Thuế: {tax}🪙)\nSố dư mới: {sender_new:.1f}🪙"
@@ -437,11 +437,11 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             if storage is None:
                 return "Hệ thống chưa sẵn sàng."
             stats = storage.load_voice_stats(guild_id)
-            total_seconds = stats.get(str(user_id), 0)
+            total_seconds = stats.get(user_id, 0)
             hours = total_seconds / 3600
             rank_name = "Unranked"
             if voice_feature:
-                rank_name = voice_feature.get_user_rank(hours)[0]
+                rank_name = voice_feature.get_user_rank(hours, guild_id)[0]
             return f"Bạn đang **{rank_name}** với **{hours:.1f} giờ** voice chat."
 
         elif tool_name == "check_user_rank":
@@ -455,11 +455,11 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             if storage is None:
                 return "Hệ thống chưa sẵn sàng."
             stats = storage.load_voice_stats(guild_id)
-            total_seconds = stats.get(str(target_member.id), 0)
+            total_seconds = stats.get(target_member.id, 0)
             hours = total_seconds / 3600
             rank_name = "Unranked"
             if voice_feature:
-                rank_name = voice_feature.get_user_rank(hours)[0]
+                rank_name = voice_feature.get_user_rank(hours, guild_id)[0]
             return f"**{target_member.display_name}** đang **{rank_name}** với **{hours:.1f} giờ** voice chat."
 
         elif tool_name == "leaderboard":
@@ -470,8 +470,7 @@ async def dispatch_tool(tool_name, tool_args, ctx):
                 return "Chưa có ai trong bảng xếp hạng voice."
             sorted_users = sorted(all_time.items(), key=lambda x: x[1], reverse=True)[:10]
             lines = ["**Bảng xếp hạng voice:**"]
-            for i, (uid_str, seconds) in enumerate(sorted_users, 1):
-                uid = int(uid_str)
+            for i, (uid, seconds) in enumerate(sorted_users, 1):
                 member = channel.guild.get_member(uid) if channel else None
                 name = member.display_name if member else f"<@{uid}>"
                 hours = seconds / 3600
@@ -482,14 +481,13 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             if storage is None:
                 return "Hệ thống chưa sẵn sàng."
             stats = storage.load_voice_stats(guild_id)
-            current_seconds = stats.get(str(user_id), 0)
-            all_time = storage.load_all_time_voice_stats(guild_id)
-            all_seconds = all_time.get(str(user_id), 0)
+            current_seconds = stats.get(user_id, 0)
+            all_seconds = storage.get_all_time_voice_seconds(guild_id, user_id)
             current_hours = current_seconds / 3600
             all_hours = all_seconds / 3600
             rank_name = "Unranked"
             if voice_feature:
-                rank_name = voice_feature.get_user_rank(all_hours)[0]
+                rank_name = voice_feature.get_user_rank(all_hours, guild_id)[0]
             return (
                 f"**Thông tin voice của bạn:**\n"
                 f"• Cấp bậc: **{rank_name}**\n"
@@ -498,19 +496,15 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             )
 
         elif tool_name == "rank_help":
-            return (
-                "**Các cấp bậc voice:**\n"
-                "1. 🥉 **Iron** — 0h (mặc định)\n"
-                "2. 🥉 **Bronze** — 20h\n"
-                "3. 🥉 **Silver** — 40h\n"
-                "4. 🥈 **Gold** — 60h + `/say`\n"
-                "5. 🥈 **Platinum** — 80h\n"
-                "6. 💎 **Diamond** — 100h + entrance sound\n"
-                "7. 💎 **Elite** — 120h\n"
-                "8. 👑 **Immortal** — 140h + custom sound\n"
-                "9. 👑 **Legendary** — 160h + custom sound\n\n"
-                "Dùng `/beanie tham gia` để join voice tracking!"
-            )
+            thresholds = DEFAULT_THRESHOLDS
+            if voice_feature:
+                thresholds = voice_feature.get_rank_table(guild_id).thresholds
+            badges = ["🥉", "🥉", "🥉", "🥈", "🥈", "💎", "💎", "👑", "👑"]
+            extras = {0: " (mặc định)", 3: " + `/say`", 5: " + entrance sound", 7: " + custom sound", 8: " + custom sound"}
+            lines = ["**Các cấp bậc voice:**"]
+            for i, (name, hours) in enumerate(zip(RANK_NAMES, thresholds)):
+                lines.append(f"{i + 1}. {badges[i]} **{name}** — {hours:g}h{extras.get(i, '')}")
+            return "\n".join(lines) + "\n\nDùng `/beanie tham gia` để join voice tracking!"
 
         elif tool_name == "join_competition":
             if voice_feature is None:
@@ -547,8 +541,7 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             if not birthdays:
                 return "Chưa có ai đăng ký sinh nhật."
             lines = ["**Danh sách sinh nhật:**"]
-            for uid_str, date_str in birthdays.items():
-                uid = int(uid_str)
+            for uid, date_str in birthdays.items():
                 member = channel.guild.get_member(uid) if channel else None
                 name = member.display_name if member else f"<@{uid}>"
                 lines.append(f"- **{name}** — {date_str}")
@@ -563,23 +556,23 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             now = datetime.now()
             today = (now.month, now.day)
             upcoming = []
-            for uid_str, date_str in birthdays.items():
+            for uid, date_str in birthdays.items():
                 try:
                     parts = date_str.split("/")
                     bday = (int(parts[1]), int(parts[0]))  # (month, day)
                 except (IndexError, ValueError):
                     continue
-                    diff = (bday[0] - now.month) * 30 + (bday[1] - now.day)
+                diff = (bday[0] - now.month) * 30 + (bday[1] - now.day)
                 if diff < 0:
                     diff += 365
-                upcoming.append((diff, bday, uid_str, date_str))
+                upcoming.append((diff, bday, uid, date_str))
             upcoming.sort()
             if not upcoming:
                 return "Không có sinh nhật nào."
-            uid = int(upcoming[0][3])
+            diff, _, uid, date_str = upcoming[0]
             member = channel.guild.get_member(uid) if channel else None
             name = member.display_name if member else f"<@{uid}>"
-            return f"Sinh nhật sắp tới: **{name}** vào **{upcoming[0][4]}** ({upcoming[0][0]} ngày nữa)"
+            return f"Sinh nhật sắp tới: **{name}** vào **{date_str}** ({diff} ngày nữa)"
 
         elif tool_name == "add_birthday":
             if storage is None:
@@ -591,9 +584,7 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             is_valid, normalized_date = Validator.validate_date_ddmm(date_str)
             if not is_valid:
                 return "Ngày không hợp lệ! Dùng định dạng dd/mm (vd: 25/12)."
-            birthdays = storage.load_birthdays(guild_id)
-            birthdays[str(user_id)] = normalized_date
-            storage.save_birthdays(guild_id, birthdays)
+            storage.set_birthday(guild_id, user_id, normalized_date)
             return f"Đã đăng ký sinh nhật **{normalized_date}** thành công! 🎂"
 
         # ── Events ───────────────────────────────────────────────
@@ -644,16 +635,15 @@ async def dispatch_tool(tool_name, tool_args, ctx):
             if storage is None:
                 return "Hệ thống chưa sẵn sàng."
             try:
-                tracked = storage.load_tracked_channels(guild_id)
-                if not tracked:
-                    return "Chưa có kênh voice nào được theo dõi."
                 now = datetime.now()
                 period = now.strftime("%Y-%m")
+                period_stats = storage.load_channel_voice_stats_bulk(guild_id, period)
+                if not period_stats:
+                    return "Chưa có kênh voice nào được theo dõi."
                 lines = ["**Giờ hoạt động kênh voice:**"]
-                for ch_id in tracked:
+                for ch_id, total in period_stats.items():
                     ch = channel.guild.get_channel(ch_id) if channel else None
                     ch_name = ch.name if ch else f"<#{ch_id}>"
-                    total = storage.load_channel_voice_stats(guild_id, ch_id, period)
                     if total > 0:
                         lines.append(f"- **{ch_name}**: {total:.1f}h tháng này")
                 if len(lines) == 1:
@@ -755,11 +745,11 @@ async def dispatch_tool(tool_name, tool_args, ctx):
                 return "Hệ thống chưa sẵn sàng."
             balance = storage.get_balance(guild_id, user_id)
             stats = storage.load_voice_stats(guild_id)
-            total_seconds = stats.get(str(user_id), 0)
+            total_seconds = stats.get(user_id, 0)
             hours = total_seconds / 3600
             rank_name = "Unranked"
             if voice_feature:
-                rank_name = voice_feature.get_user_rank(hours)[0]
+                rank_name = voice_feature.get_user_rank(hours, guild_id)[0]
             return (
                 f"**Thông tin của bạn:**\n"
                 f"• 💰 Coin: **{balance:.1f} 🪙**\n"
@@ -49,6 +49,11 @@ class BirthdayFeature(commands.Cog):
         storage = self._get_storage()
         storage.save_birthdays(guild_id, data)
     
+    def set_birthday(self, guild_id: int, user_id, birthday: str):
+        """Set a single user's birthday for specific guild."""
+        storage = self._get_storage()
+        storage.set_birthday(guild_id, user_id, birthday)
+    
     # ===========================
     # Background Tasks
     # ===========================
@@ -86,7 +91,7 @@ class BirthdayFeature(commands.Cog):
             for user_id, date_str in birthdays.items():
                 if date_str == today_str:
                     try:
-                        member = await self.bot.fetch_user(int(user_id))
+                        member = await self.bot.fetch_user(user_id)
                         name = member.display_name if member else f"<@{user_id}>"
                         wish = random.choice(self.config.BIRTHDAY_WISHES).format(name=name)
                     except Exception as e:
@@ -151,9 +156,7 @@ class BirthdayFeature(commands.Cog):
                 await interaction.response.send_message("❌ Invalid user.", ephemeral=True)
                 return
             
-            birthdays = self.load_birthdays(guild_id)
-            birthdays[str(user_id)] = normalized_date
-            self.save_birthdays(guild_id, birthdays)
+            self.set_birthday(guild_id, user_id, normalized_date)
             
             await interaction.response.send_message(f"✅ Birthday for {user.display_name} set to {normalized_date}!", ephemeral=True)
             gc.collect()
@@ -167,7 +170,7 @@ class BirthdayFeature(commands.Cog):
             msg = "📅 **Registered Birthdays:**\n"
             for user_id, date_str in birthdays.items():
                 try:
-                    member = await interaction.client.fetch_user(int(user_id))
+                    member = await interaction.client.fetch_user(user_id)
                     name = member.display_name if member else f"<@{user_id}>"
                 except (discord.NotFound, discord.HTTPException):
                     logging.debug(f"User {user_id} not found when listing birthdays")
@@ -3,7 +3,6 @@ Channel Voice Tracking Feature
 Tracks total monthly voice time per tracked channel
 """
 
-import asyncio
 import logging
 import re
 import time
@@ -12,6 +11,8 @@ from discord.ext import commands, tasks
 from discord import app_commands
 import discord
 
+from core.edit_scheduler import get_edit_scheduler
+
 
 class ChannelTrackingFeature(commands.Cog):
     def __init__(self, bot, config):
@@ -21,6 +22,7 @@ class ChannelTrackingFeature(commands.Cog):
         
         # In-memory tracking: {channel_id: {"is_occupied": bool, "occupy_start_time": timestamp}}
         self.channel_occupancy = {}
+        self.edit_scheduler = get_edit_scheduler()
         
         # Background tasks
         self.update_channel_names.start()
@@ -131,17 +133,16 @@ class ChannelTrackingFeature(commands.Cog):
                 if storage is None:
                     continue
                 
-                tracked = storage.load_tracked_channels(guild_id)
                 period = self._get_period_key()
+                period_stats = storage.load_channel_voice_stats_bulk(guild_id, period)
                 
-                for channel_id in tracked:
+                for channel_id, total_seconds in period_stats.items():
                     try:
                         channel = self.bot.get_channel(channel_id)
                         if not channel or not isinstance(channel, discord.VoiceChannel):
                             continue
                         
                         # Get stats
-                        total_seconds = storage.load_channel_voice_stats(guild_id, channel_id, period)
                         total_hours = int(total_seconds / 3600)
                         
                         # Get current name and strip old suffix
@@ -151,13 +152,16 @@ class ChannelTrackingFeature(commands.Cog):
                         # Build new name
                         new_name = f"{clean_name}・{total_hours}h"
                         
-                        # Update if changed
+                        # Update if changed; the scheduler paces edits per guild and channel
                         if new_name != current_name:
-                            await channel.edit(name=new_name)
-                            logging.info(f"Updated channel {channel_id} name to: {new_name}")
-                        
-                        # Rate limit: 1 edit per 5.5 seconds
-                        await asyncio.sleep(5.5)
+                            applied = await self.edit_scheduler.run(
+                                guild_id,
+                                lambda channel=channel, new_name=new_name: channel.edit(name=new_name),
+                                route="channel_rename",
+                                route_key=channel_id,
+                            )
+                            if applied:
+                                logging.info(f"Updated channel {channel_id} name to: {new_name}")
                     
                     except Exception as e:
                         logging.error(f"Failed to update channel {channel_id}: {e}")
@@ -233,11 +237,10 @@ class ChannelTrackingFeature(commands.Cog):
                 await self.checkpoint_channel_stats()
                 
                 # 2. Get tracked channels and archive their stats
-                tracked = storage.load_tracked_channels(guild_id)
                 prev_period = f"{now.year}-{str(now.month - 1).zfill(2)}" if now.month > 1 else f"{now.year - 1}-12"
+                prev_stats = storage.load_channel_voice_stats_bulk(guild_id, prev_period)
                 
-                for channel_id in tracked:
-                    total_seconds = storage.load_channel_voice_stats(guild_id, channel_id, prev_period)
+                for channel_id, total_seconds in prev_stats.items():
                     if total_seconds > 0:
                         storage.archive_channel_stats(
                             guild_id, now.year if now.month > 1 else now.year - 1,
@@ -251,6 +254,7 @@ class ChannelTrackingFeature(commands.Cog):
                 # 4. Update state
                 state["last_channel_reset_month"] = current_month
                 storage.save_state(guild_id, state)
+                storage.flush()
                 
                 logging.info(f"Channel stats reset for guild {guild_id}")
             
@@ -344,9 +348,9 @@ class ChannelTrackingFeature(commands.Cog):
             await interaction.response.send_message("❌ Storage unavailable", ephemeral=True)
             return
         
-        tracked = storage.load_tracked_channels(guild_id)
+        all_time = storage.load_all_time_channel_stats_bulk(guild_id)
         
-        if not tracked:
+        if not all_time:
             await interaction.response.send_message("📭 No channels are being tracked yet", ephemeral=True)
             return
         
@@ -355,11 +359,10 @@ class ChannelTrackingFeature(commands.Cog):
             color=discord.Color.blue()
         )
         
-        for ch_id in tracked:
+        for ch_id, total_seconds in all_time.items():
             channel = self.bot.get_channel(ch_id)
             ch_name = channel.name if channel else f"Channel {ch_id}"
             
-            total_seconds = storage.load_all_time_channel_stats(guild_id, ch_id)
             hours = int(total_seconds / 3600)
             minutes = int((total_seconds % 3600) / 60)
             
@@ -199,6 +199,9 @@ def process_purchase(
     discounts: dict | None = None, voice_feature=None
 ) -> tuple[bool, str, float]:
     """Process a shop item purchase.
+    Debit, purchase record and any voice hours are applied in one transaction.
+    Purchased hours that cross a rank boundary are queued on ``voice_feature``
+    for a role sync (see ``VoiceTrackingFeature.schedule_rank_flush``).
     Returns (success, message, new_balance).
     """
     sale_price = item_info["cost"]
@@ -206,23 +209,18 @@ def process_purchase(
         d = discounts.get(item_info.get("category", ""), 0)
         if d > 0:
             sale_price = round(item_info["cost"] * (1 - d))
-    balance = storage.get_balance(guild_id, user_id)
-    if balance < sale_price:
-        return False, f"Cần **{sale_price}🪙** nhưng chỉ có {balance:.1f}🪙.", balance
-    success = storage.spend_coins(guild_id, user_id, sale_price)
-    if not success:
-        return False, "Giao dịch thất bại.", balance
     month = datetime.now().strftime("%Y-%m")
-    storage.add_purchase(guild_id, user_id, month, item_info["type"], item_info["value"])
-    new_balance = storage.get_balance(guild_id, user_id)
-    if item_info["type"] == "hours" and voice_feature:
-        try:
-            stats = voice_feature.load_voice_stats(guild_id)
-            uid_str = str(user_id)
-            stats[uid_str] = stats.get(uid_str, 0) + item_info["value"] * 3600
-            voice_feature.save_voice_stats(guild_id, stats)
-        except Exception:
-            pass
+    voice_seconds = item_info["value"] * 3600 if item_info["type"] == "hours" else 0
+    old_seconds = voice_feature.load_voice_stats(guild_id).get(user_id, 0) if voice_feature and voice_seconds else 0
+    new_balance = storage.purchase(
+        guild_id, user_id, sale_price, month, item_info["type"], item_info["value"],
+        voice_seconds=voice_seconds,
+    )
+    if new_balance is None:
+        balance = storage.get_balance(guild_id, user_id)
+        return False, f"Cần **{sale_price}🪙** nhưng chỉ có {balance:.1f}🪙.", balance
+    if voice_feature and voice_seconds:
+        voice_feature.note_rank_transition(guild_id, user_id, old_seconds, old_seconds + voice_seconds)
     return True, f"Đã mua **{item_info['emoji']} {item_info['name']}** thành công! (Giá: {sale_price}🪙)", new_balance
 
 
@@ -350,10 +348,12 @@ class ShopView(discord.ui.View):
                 view=None,
             )
             return
+        voice_feature = self.cog.voice_feature
         success, msg, new_balance = process_purchase(
-            storage, self.guild_id, self.user_id, key, info, self.discounts,
-            voice_feature=self.cog.voice_feature,
+            storage, self.guild_id, self.user_id, key, info, self.discounts, voice_feature,
         )
+        if success and voice_feature and interaction.guild:
+            voice_feature.schedule_rank_flush(interaction.guild)
         if not success:
             await interaction.response.edit_message(
                 embed=discord.Embed(title="\u274c Purchase Failed", description=msg, color=discord.Color.red()),
@@ -545,9 +545,9 @@ class EconomyFeature(commands.Cog):
         # Current earning rate
         voice_feature = self.voice_feature
         stats = voice_feature.load_voice_stats(guild_id) if voice_feature else {}
-        total_seconds = stats.get(str(user_id), 0) + purchased_hours * 3600
+        total_seconds = stats.get(user_id, 0) + purchased_hours * 3600
         total_hours = total_seconds / 3600
-        _, _, _, mult = voice_feature.get_user_rank(total_hours) if voice_feature else (None, None, [], 1.0)
+        _, _, _, mult = voice_feature.get_user_rank(total_hours, guild_id) if voice_feature else (None, None, [], 1.0)
         earn_rate = 6 * mult  # 6 coins/hour base
 
         embed = discord.Embed(
@@ -611,22 +611,15 @@ class EconomyFeature(commands.Cog):
         tax = int(amount * 0.1)
         total_deduct = amount + tax
 
-        balance = storage.get_balance(guild_id, sender_id)
-        if balance < total_deduct:
+        sender_new = storage.transfer(guild_id, sender_id, user.id, float(amount), tax=tax)
+        if sender_new is None:
+            balance = storage.get_balance(guild_id, sender_id)
             await interaction.followup.send(
                 f"\u274c You need **{total_deduct}\U0001fa99** (including {tax}\U0001fa99 tax) but only have **{balance}\U0001fa99**.",
                 ephemeral=True,
             )
             return
 
-        success = storage.spend_coins(guild_id, sender_id, total_deduct)
-        if not success:
-            await interaction.followup.send("\u274c Transaction failed.", ephemeral=True)
-            return
-
-        storage.add_coins(guild_id, user.id, float(amount))
-
-        sender_new = storage.get_balance(guild_id, sender_id)
         await interaction.followup.send(
             f"\u2705 Gifted **{amount}\U0001fa99** to {user.display_name}! (Tax: {tax}\U0001fa99)\n"
             f"Your new balance: {sender_new}\U0001fa99",
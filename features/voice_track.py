@@ -7,44 +7,53 @@ import asyncio
 import logging
 import gc
 import os
+import shutil
 import time
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 from discord.ext import commands, tasks
 from discord import app_commands
 import discord
-from gtts import gTTS
 
 # Import permission utilities
 from core.permissions import admin_only
+from core.edit_scheduler import get_edit_scheduler, plan_channel_edits
+from core.ranks import Rank, RankTable, compile_rank_table
+from core.opus_audio import OpusPacketSource, ensure_opus, remove_opus
+from core.tts_cache import TTSCache
+from core.voice_playback import PRIORITY_ENTRANCE, PRIORITY_SAY, AudioScheduler, VoiceConnectionManager
 
 from features.economy import get_coin_multiplier
 
+# Ranks that get a spoken entrance greeting
+ENTRANCE_RANKS = ("Diamond", "Elite", "Immortal", "Legendary")
+
+# After a restart, time since the last checkpoint is only credited if the bot was
+# down for less than this; after a longer outage tracking restarts from now.
+RESUME_MAX_GAP_SECONDS = 30 * 60
+
 
 async def add_competitor(voice_feature, guild, target_user, config) -> tuple[bool, str]:
     """Add a user to voice competition. Returns (success, message)."""
     guild_id = guild.id
-    user_id = str(target_user.id)
+    user_id = target_user.id
     competitors = voice_feature.load_competitors(guild_id)
     if user_id in competitors:
         return False, f"{target_user.display_name} đã tham gia rồi!"
-    stats = voice_feature.load_voice_stats(guild_id)
-    if user_id not in stats:
-        stats[user_id] = 0
-        voice_feature.save_voice_stats(guild_id, stats)
+    # Adding 0 creates the stats row if missing and returns the current total
+    total_seconds = voice_feature.add_voice_seconds(guild_id, user_id, 0)
     guild_config = config.get_guild_config(guild_id)
     rank_category_id = guild_config.get_rank_category_id()
     category = guild.get_channel(rank_category_id) if rank_category_id else None
     if not category:
         return False, "Danh mục rank chưa được cấu hình."
     try:
-        total_hours = stats.get(user_id, 0) / 3600
+        total_hours = total_seconds / 3600
         new_channel = await category.create_voice_channel(
             name=f"🏅 {target_user.display_name}: {int(total_hours)}h",
             reason=f"Rank channel for {target_user.display_name}"
         )
-        competitors[user_id] = str(new_channel.id)
-        voice_feature.save_competitors(guild_id, competitors)
+        voice_feature.set_competitor(guild_id, user_id, new_channel.id)
         return True, f"Đã tham gia voice tracking! Kênh: {new_channel.mention}"
     except Exception as e:
         return False, f"Lỗi tạo kênh: {e}"
@@ -53,14 +62,14 @@ async def add_competitor(voice_feature, guild, target_user, config) -> tuple[boo
 async def remove_competitor(voice_feature, guild, target_user) -> tuple[bool, str]:
     """Remove a user from voice competition. Returns (success, message)."""
     guild_id = guild.id
-    user_id = str(target_user.id)
+    user_id = target_user.id
     competitors = voice_feature.load_competitors(guild_id)
     if user_id not in competitors:
         return False, f"{target_user.display_name} chưa tham gia!"
-    channel_id_str = competitors.pop(user_id)
-    voice_feature.save_competitors(guild_id, competitors)
-    if channel_id_str:
-        ch = guild.get_channel(int(channel_id_str))
+    channel_id = competitors.pop(user_id)
+    voice_feature.delete_competitor(guild_id, user_id)
+    if channel_id:
+        ch = guild.get_channel(channel_id)
         if ch:
             try:
                 await ch.delete(reason=f"Removed {target_user.display_name} from competition")
@@ -77,28 +86,102 @@ class VoiceTrackingFeature(commands.Cog):
         self.config = config
         
         # Voice tracking state
-        self.voice_join_times = {}  # {guild_id: {user_id: start_timestamp}} - only in RAM
+        self.voice_join_times = {}  # {guild_id: {user_id: start_timestamp}} - mirrored in voice_open_sessions
+        self.voice_join_channels = {}  # {guild_id: {user_id: channel_id}} - for the session log
         self.leaderboard_updating = set()  # {guild_id} - track which guilds are currently updating leaderboards
         self.leaderboard_update_times = {}  # {guild_id: start_time} - for timeout detection
+        self.leaderboard_rendered = {}  # {guild_id: {channel_id: (name, position)}} - last applied edits
+        self.pending_rank_transitions = {}  # {guild_id: {user_id}} - rank changed, roles not yet synced
+        self.rank_flush_tasks = {}  # {guild_id: Task} - background role syncs (see schedule_rank_flush)
+        self.rank_sweep_tasks = {}  # {guild_id: Task} - full role sweeps after a threshold change
+        self._rank_tables = {}  # {guild_id: (guild_config, version, RankTable)}
+        self._default_rank_table = None
+        self.edit_scheduler = get_edit_scheduler()  # Shared pacing for Discord edits
         
         # Audio infrastructure
-        self.audio_lock = asyncio.Lock()
-        self.say_queue = asyncio.Queue(maxsize=10)
         self.say_cooldowns = {}  # {user_id: timestamp}
+        self.tts_cache = None  # Created on first use (see get_tts_cache)
+        self.voice_manager = VoiceConnectionManager()
+        self.audio_scheduler = AudioScheduler(self.voice_manager)  # Per-guild queues: entrances before /say
         
         # Start background tasks
         self.update_leaderboard.start()
         self.monthly_reset_check.start()
         self.periodic_role_sync.start()
         self.voice_checkpoint.start()
-        
-        # Start say queue processor
-        asyncio.create_task(self.process_say_queue())
+        self.startup_tasks = []  # One-off startup work (see cog_load), cancelled on unload
     
     # --- Data Management Functions ---
 
     def _get_storage(self):
         return self.config.get_storage()
+
+    def get_tts_cache(self) -> TTSCache:
+        """Shared TTS clip cache for entrances, /say and custom entrances."""
+        if self.tts_cache is None:
+            self.tts_cache = TTSCache()
+        return self.tts_cache
+
+    async def open_audio_source(self, path: str) -> discord.AudioSource:
+        """
+        Playback source for a sound file.
+
+        Streams the file's pre-transcoded Opus packets (transcoding once on first
+        use), falling back to decoding through FFmpeg if the transcode fails.
+        """
+        try:
+            packet_path = await asyncio.to_thread(ensure_opus, path, self.ffmpeg_exec)
+            return OpusPacketSource(packet_path)
+        except Exception as e:
+            logging.warning(f"Opus transcode failed for {path}, falling back to FFmpeg: {e}")
+            return discord.FFmpegPCMAudio(path, executable=self.ffmpeg_exec)
+
+    async def open_tts_source(self, text: str, lang: str = "vi") -> discord.AudioSource:
+        """Playback source for a cached TTS clip; its Opus transcode counts against the cache budget."""
+        tts_cache = self.get_tts_cache()
+        clip_path = await tts_cache.get_path(text, lang)
+        source = await self.open_audio_source(clip_path)
+        tts_cache.refresh(clip_path)
+        return source
+
+    async def prepare_audio(self, path: str) -> bool:
+        """Transcode a sound file to Opus packets ahead of playback; False if that failed."""
+        try:
+            await asyncio.to_thread(ensure_opus, path, self.ffmpeg_exec)
+            return True
+        except Exception as e:
+            logging.warning(f"Opus transcode failed for {path}: {e}")
+            return False
+
+    async def prewarm_entrance_tts(self):
+        """Pre-synthesize the default greeting for every member who gets one on join."""
+        await self.bot.wait_until_ready()
+        try:
+            phrases = []
+            for guild in self.bot.guilds:
+                stats = await self.aload_voice_stats(guild.id)
+                entry_settings = await self.aload_entry_settings(guild.id)
+                for user_id in await self.aload_competitors(guild.id):
+                    if self.get_user_rank(stats.get(user_id, 0) / 3600, guild.id).name not in ENTRANCE_RANKS:
+                        continue
+                    if not entry_settings.get(user_id, {}).get("enabled", True):
+                        continue
+                    member = guild.get_member(user_id)
+                    if member:
+                        phrases.append((f"Xin chào {member.display_name}", "vi"))
+            tts_cache = self.get_tts_cache()
+            warmed = 0
+            for text, lang in phrases:
+                try:
+                    clip_path = await tts_cache.get_path(text, lang)
+                    if await self.prepare_audio(clip_path):
+                        warmed += 1
+                    tts_cache.refresh(clip_path)
+                except Exception as e:
+                    logging.warning(f"Failed to pre-warm entrance '{text}': {e}")
+            logging.info(f"Pre-warmed {warmed}/{len(phrases)} entrance greetings")
+        except Exception as e:
+            logging.error(f"Entrance TTS pre-warm error: {e}")
     
     def load_voice_stats(self, guild_id: int):
         """Load voice stats from storage for specific guild."""
@@ -139,6 +222,16 @@ class VoiceTrackingFeature(commands.Cog):
         storage = self._get_storage()
         storage.save_voice_stats(guild_id, data)
     
+    def add_voice_seconds(self, guild_id: int, user_id, delta: float) -> float:
+        """Add seconds to one user's current-month total; returns the new total."""
+        storage = self._get_storage()
+        return storage.add_voice_seconds(guild_id, user_id, delta)
+    
+    def set_voice_seconds(self, guild_id: int, user_id, seconds: float):
+        """Overwrite one user's current-month total."""
+        storage = self._get_storage()
+        storage.set_voice_seconds(guild_id, user_id, seconds)
+    
     def load_all_time_stats(self, guild_id: int):
         """Load cumulative voice stats across current and all archived data."""
         storage = self._get_storage()
@@ -173,6 +266,31 @@ class VoiceTrackingFeature(commands.Cog):
         storage = self._get_storage()
         storage.save_competitors(guild_id, data)
     
+    def set_competitor(self, guild_id: int, user_id, channel_id):
+        """Insert or update a single competitor row."""
+        storage = self._get_storage()
+        storage.set_competitor(guild_id, user_id, channel_id)
+    
+    def delete_competitor(self, guild_id: int, user_id):
+        """Remove a single competitor row."""
+        storage = self._get_storage()
+        storage.delete_competitor(guild_id, user_id)
+    
+    async def aload_competitors(self, guild_id: int):
+        """Load competitors without blocking the event loop."""
+        storage = self._get_storage()
+        return await storage.aload_competitors(guild_id)
+    
+    async def aload_voice_stats(self, guild_id: int):
+        """Load voice stats without blocking the event loop."""
+        storage = self._get_storage()
+        return await storage.aload_voice_stats(guild_id)
+    
+    async def aload_entry_settings(self, guild_id: int):
+        """Load entry settings without blocking the event loop."""
+        storage = self._get_storage()
+        return await storage.aload_entry_settings(guild_id)
+    
     def load_entry_settings(self, guild_id: int):
         """Load entry settings from storage for specific guild."""
         storage = self._get_storage()
@@ -183,6 +301,11 @@ class VoiceTrackingFeature(commands.Cog):
         storage = self._get_storage()
         storage.save_entry_settings(guild_id, data)
     
+    def set_entry_setting(self, guild_id: int, user_id, settings: dict):
+        """Insert or update a single user's entry settings."""
+        storage = self._get_storage()
+        storage.set_entry_setting(guild_id, user_id, settings)
+    
     def load_state(self, guild_id: int):
         """Load state from storage for specific guild."""
         storage = self._get_storage()
@@ -193,52 +316,41 @@ class VoiceTrackingFeature(commands.Cog):
         storage = self._get_storage()
         storage.save_state(guild_id, data)
     
-    def get_user_rank(self, total_hours):
-        """Get rank name, perks, role ID, and coin multiplier based on total hours."""
-        if total_hours >= 160:
-            return ("Legendary", 1475814299120435301, ["/say", "/entry on/off", "/entry add - Custom TTS/File"], 4.0)
-        elif total_hours >= 140:
-            return ("Immortal", 1475813978201653330, ["/say", "/entry on/off", "/entry add - Custom TTS/File"], 3.5)
-        elif total_hours >= 120:
-            return ("Elite", 1475813832411709461, ["/say", "/entry on/off", 'Default Entrance: "Xin chào {name}"'], 3.0)
-        elif total_hours >= 100:
-            return ("Diamond", 1475808953681051738, ["/say", "/entry on/off", 'Default Entrance: "Xin chào {name}"'], 2.6)
-        elif total_hours >= 80:
-            return ("Platinum", 1475809119049875528, ["/say"], 2.2)
-        elif total_hours >= 60:
-            return ("Gold", 1475808898370769018, ["/say"], 1.8)
-        elif total_hours >= 40:
-            return ("Silver", 1475808847649181778, [], 1.5)
-        elif total_hours >= 20:
-            return ("Bronze", 1475808729705353290, [], 1.2)
-        else:
-            return ("Iron", 1475819335514849391, [], 1.0)
-
-    def get_rank_role_id_for_guild(self, guild_id: int, rank_name: str):
-        """Get role ID for a rank name using guild-specific configured role IDs."""
-        rank_order = [
-            "Iron",
-            "Bronze",
-            "Silver",
-            "Gold",
-            "Platinum",
-            "Diamond",
-            "Elite",
-            "Immortal",
-            "Legendary",
-        ]
+    def set_state_key(self, guild_id: int, key: str, value):
+        """Set a single state key for specific guild."""
+        storage = self._get_storage()
+        storage.set_guild_state(guild_id, key, value)
+    
+    def get_rank_table(self, guild_id: int = None) -> RankTable:
+        """Compiled rank table for a guild (thresholds and role IDs from its config).
 
+        Cached per guild and recompiled only when the guild config is saved.
+        Without a guild, returns the default table with the global role IDs.
+        """
+        if guild_id is None:
+            if self._default_rank_table is None:
+                self._default_rank_table = compile_rank_table(role_ids=self.config.RANK_ROLE_IDS)
+            return self._default_rank_table
         guild_config = self.config.get_guild_config(guild_id)
-        role_ids = guild_config.get_rank_role_ids() or []
-
-        if rank_name not in rank_order:
-            return None
+        version = getattr(guild_config, "version", None)
+        cached = self._rank_tables.get(guild_id)
+        if cached and cached[0] is guild_config and cached[1] == version:
+            return cached[2]
+        try:
+            table = compile_rank_table(guild_config.get_rank_thresholds(), guild_config.get_rank_role_ids())
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Invalid rank thresholds for guild {guild_id}, using defaults: {e}")
+            table = compile_rank_table(role_ids=guild_config.get_rank_role_ids())
+        self._rank_tables[guild_id] = (guild_config, version, table)
+        return table
 
-        idx = rank_order.index(rank_name)
-        if idx >= len(role_ids):
-            return None
+    def get_user_rank(self, total_hours, guild_id: int = None) -> Rank:
+        """Get rank name, role ID, perks and coin multiplier for a number of hours."""
+        return self.get_rank_table(guild_id).lookup(total_hours)
 
-        return role_ids[idx]
+    def get_rank_role_id_for_guild(self, guild_id: int, rank_name: str):
+        """Get role ID for a rank name using guild-specific configured role IDs."""
+        return self.get_rank_table(guild_id).role_id(rank_name)
     
     def checkpoint_voice_stats(self, guild_id: int):
         """Checkpoint voice stats for users currently in voice channels for a specific guild."""
@@ -247,108 +359,180 @@ class VoiceTrackingFeature(commands.Cog):
         if not guild_times:
             return
         
+        storage = self._get_storage()
         stats = self.load_voice_stats(guild_id)
+        event_mult = get_coin_multiplier(storage, guild_id)
+        seconds_items = []
+        coin_items = []
+        sessions = []
+        guild_channels = self.voice_join_channels.get(guild_id, {})
+        rank_table = self.get_rank_table(guild_id)
         for user_id, join_time in list(guild_times.items()):
             duration = now - join_time
-            if user_id not in stats:
-                stats[user_id] = 0
-            stats[user_id] += duration
             guild_times[user_id] = now  # Reset to current time
+            seconds_items.append((user_id, duration))
+            sessions.append((user_id, guild_channels.get(user_id), join_time, now))
+            self.note_rank_transition(guild_id, user_id, stats.get(user_id, 0), stats.get(user_id, 0) + duration)
 
             # Economy: earn coins for time spent in voice
-            total_hours = stats[user_id] / 3600
-            _, _, _, mult = self.get_user_rank(total_hours)
-            coins_earned = (duration / 600) * mult  # 1 base coin per 10 min
-            storage = self._get_storage()
-            if storage:
-                event_mult = get_coin_multiplier(storage, guild_id)
-                coins_earned *= event_mult
-                storage.add_coins(guild_id, int(user_id), coins_earned)
+            total_hours = (stats.get(user_id, 0) + duration) / 3600
+            mult = rank_table.lookup(total_hours).multiplier
+            coins_earned = (duration / 600) * mult * event_mult  # 1 base coin per 10 min
+            coin_items.append((user_id, coins_earned))
         
-        self.save_voice_stats(guild_id, stats)
+        # Stats and coins for the whole guild land in one transaction
+        storage.apply_voice_checkpoint(guild_id, seconds_items, coin_items, sessions)
         gc.collect()
     
+    async def reconcile_voice_sessions(self):
+        """Resume tracking for everyone in voice at startup in one bulk pass.
+
+        Persisted open sessions whose member is still in voice resume from their
+        last checkpoint (recovering the time lost to a crash); members in voice
+        without one start from now, and sessions whose member has left are dropped.
+        """
+        await self.bot.wait_until_ready()
+        storage = self._get_storage()
+        if not storage:
+            return
+        try:
+            now = time.time()
+            persisted = await storage.aload_open_voice_sessions()
+            resumed, closed = [], []
+            for guild in self.bot.guilds:
+                guild_id = guild.id
+                open_sessions = persisted.pop(guild_id, {})
+                competitors = await self.aload_competitors(guild_id)
+                guild_times = self.voice_join_times.setdefault(guild_id, {})
+                guild_channels = self.voice_join_channels.setdefault(guild_id, {})
+                for user_id, voice_state in guild.voice_states.items():
+                    if user_id not in competitors or voice_state.channel is None or user_id in guild_times:
+                        continue
+                    channel_id = voice_state.channel.id
+                    started_at, resume_at = now, now
+                    if user_id in open_sessions:
+                        _, started_at, checkpoint_at = open_sessions[user_id]
+                        if now - checkpoint_at <= RESUME_MAX_GAP_SECONDS:
+                            resume_at = checkpoint_at
+                    guild_times[user_id] = resume_at
+                    guild_channels[user_id] = channel_id
+                    resumed.append((guild_id, user_id, channel_id, started_at, resume_at))
+                closed.extend((guild_id, user_id) for user_id in open_sessions if user_id not in guild_times)
+            # Guilds the bot is no longer in
+            closed.extend((guild_id, user_id) for guild_id, users in persisted.items() for user_id in users)
+            await storage.areconcile_open_voice_sessions(resumed, closed)
+            logging.info(f"Voice reconcile: resumed {len(resumed)} sessions, closed {len(closed)} stale sessions")
+        except Exception as e:
+            logging.error(f"Voice session reconcile error: {e}")
+
+    def note_rank_transition(self, guild_id: int, user_id, old_seconds: float, new_seconds: float) -> bool:
+        """Queue a role sync if crediting seconds moved the user into another rank."""
+        rank_table = self.get_rank_table(guild_id)
+        if rank_table.index(old_seconds / 3600) == rank_table.index(new_seconds / 3600):
+            return False
+        self.pending_rank_transitions.setdefault(guild_id, set()).add(int(user_id))
+        return True
+
+    def schedule_rank_flush(self, guild: discord.Guild):
+        """Sync a guild's pending rank roles in the background, unless a sync is already running."""
+        task = self.rank_flush_tasks.get(guild.id)
+        if task is None or task.done():
+            self.rank_flush_tasks[guild.id] = asyncio.create_task(self.flush_rank_transitions(guild))
+
+    async def flush_rank_transitions(self, guild: discord.Guild):
+        """Sync rank roles for members whose rank changed since the last flush.
+
+        Transitions noted while the flush runs are picked up before it returns;
+        edits the scheduler deferred stay queued for the next flush.
+        """
+        retry = set()
+        remaining = set()
+        try:
+            while True:
+                pending = self.pending_rank_transitions.pop(guild.id, None)
+                if not pending:
+                    break
+                remaining = set(pending)
+                stats = await self.aload_voice_stats(guild.id)
+                competitors = await self.aload_competitors(guild.id)
+                rank_table = self.get_rank_table(guild.id)
+                rank_role_ids = {rank.role_id for rank in rank_table.ranks if rank.role_id}
+                for user_id in pending:
+                    remaining.discard(user_id)
+                    member = guild.get_member(user_id)
+                    if member is None:
+                        continue
+                    target_role_id = None
+                    if user_id in competitors:
+                        target_role_id = rank_table.lookup(stats.get(user_id, 0) / 3600).role_id
+                    try:
+                        if not await self.sync_member_rank_roles(member, target_role_id, rank_role_ids, "Rank sync: rank changed"):
+                            retry.add(user_id)
+                    except Exception as e:
+                        logging.error(f"Error applying rank for member {member.id}: {e}")
+        finally:
+            requeue = retry | remaining
+            if requeue:
+                self.pending_rank_transitions.setdefault(guild.id, set()).update(requeue)
+
+    async def sync_member_rank_roles(self, member, target_role_id, rank_role_ids: set, reason: str) -> bool:
+        """Give a member exactly the target rank role (or none) with a single ``member.edit``.
+
+        Role edits spend the guild's member-edit budget, not the channel one.
+        Returns False only if an edit was needed but deferred or failed.
+        """
+        current_ids = {r.id for r in member.roles if r.id in rank_role_ids}
+        target_ids = {target_role_id} if target_role_id else set()
+        if current_ids == target_ids:
+            return True
+        roles = [r for r in member.roles if r.id not in rank_role_ids and not r.is_default()]
+        if target_role_id:
+            target_role = member.guild.get_role(target_role_id)
+            if target_role is None:
+                logging.warning(f"Role id {target_role_id} not found in guild {member.guild.id}")
+                return True  # Retrying cannot help until the role is configured
+            roles.append(target_role)
+        applied = await self.edit_scheduler.run(
+            member.guild.id, lambda: member.edit(roles=roles, reason=reason), members=True
+        )
+        if applied:
+            logging.info(f"Rank roles for {member.display_name} ({member.id}): {sorted(current_ids)} -> {sorted(target_ids)}")
+        return applied
+
     async def apply_rank_roles_to_guild(self, guild: discord.Guild):
-        """Apply rank roles to all members in a guild based on voice_stats.json."""
+        """Repair sweep: reconcile rank roles for every member of a guild with voice_stats.
+
+        Rank changes are normally synced as they happen (see ``note_rank_transition``);
+        this catches roles edited by hand or transitions lost to a restart.
+        """
         guild_id = guild.id
-        guild_config = self.config.get_guild_config(guild_id)
-        
         stats = self.load_voice_stats(guild_id)
         competitors = self.load_competitors(guild_id)
-        competitors_set = set(competitors.keys())
+        rank_table = self.get_rank_table(guild_id)
+        rank_role_ids = {rank.role_id for rank in rank_table.ranks if rank.role_id}
+        missing = [rank.name for rank in rank_table.ranks if rank.role_id is None]
+        if missing:
+            logging.warning(f"No configured role ID for ranks {missing} in guild {guild.id}")
         
-        # Get rank role IDs for this guild
-        rank_role_ids = guild_config.get_rank_role_ids()
-        role_map = {rid: guild.get_role(rid) for rid in rank_role_ids}
-        
-        for member in guild.members:
+        for index, member in enumerate(guild.members):
             try:
-                user_id = str(member.id)
-                current_rank_roles = [r for r in member.roles if r.id in rank_role_ids]
-                
-                # If not a competitor, remove any rank roles
-                if user_id not in competitors_set:
-                    if current_rank_roles:
-                        try:
-                            await member.remove_roles(*current_rank_roles, reason="Rank sync: not a competitor")
-                            logging.info(f"Removed rank roles from non-competitor {member.display_name} ({member.id})")
-                        except Exception as e:
-                            logging.warning(f"Failed to remove roles for {member.id}: {e}")
-                    continue
-                
-                # Member is a competitor -> compute target rank
-                total_seconds = stats.get(user_id, 0)
-                total_hours = total_seconds / 3600
-                rank_name, _, _, _ = self.get_user_rank(total_hours)
-                role_id = self.get_rank_role_id_for_guild(guild_id, rank_name)
-                if role_id is None:
-                    logging.warning(
-                        f"No configured role ID for rank {rank_name} in guild {guild.id}"
-                    )
-                    continue
-                
-                target_role = role_map.get(role_id)
-                if target_role is None:
-                    logging.warning(f"Role id {role_id} not found in guild {guild.id}")
-                    continue
-                
-                # If member already has target role, ensure no other rank roles
-                if any(r.id == role_id for r in current_rank_roles):
-                    to_remove = [r for r in current_rank_roles if r.id != role_id]
-                    if to_remove:
-                        try:
-                            await member.remove_roles(*to_remove, reason="Rank sync: remove extras")
-                            logging.info(f"Removed extra rank roles from {member.display_name} ({member.id})")
-                        except Exception as e:
-                            logging.warning(f"Failed to remove roles for {member.id}: {e}")
-                    continue
-                
-                # Add target role
-                try:
-                    await member.add_roles(target_role, reason="Rank sync: assigned role")
-                    logging.info(f"Assigned role {target_role.id} to {member.display_name} ({member.id})")
-                except Exception as e:
-                    logging.warning(f"Failed to add role {role_id} to {member.id}: {e}")
-                
-                # Remove any other rank roles
-                to_remove = [r for r in current_rank_roles if r.id != role_id]
-                if to_remove:
-                    try:
-                        await member.remove_roles(*to_remove, reason="Rank sync: remove old roles")
-                    except Exception as e:
-                        logging.warning(f"Failed to remove old rank roles for {member.id}: {e}")
-                
-                # Small sleep to avoid rate limits
-                await asyncio.sleep(0.15)
-            
+                target_role_id = None
+                if member.id in competitors:
+                    target_role_id = rank_table.lookup(stats.get(member.id, 0) / 3600).role_id
+                    if target_role_id is None:
+                        continue
+                await self.sync_member_rank_roles(member, target_role_id, rank_role_ids, "Rank sync: repair sweep")
             except Exception as e:
                 logging.error(f"Error applying rank for member {member.id}: {e}")
+            # Let other tasks run while walking large member lists
+            if index % 500 == 499:
+                await asyncio.sleep(0)
     
     # --- Background Tasks ---
     
-    @tasks.loop(hours=1)
+    @tasks.loop(hours=6)
     async def periodic_role_sync(self):
-        """Periodically sync rank roles across all guilds."""
+        """Low-priority repair sweep of rank roles across all guilds."""
         await self.bot.wait_until_ready()
         try:
             for guild in self.bot.guilds:
@@ -360,127 +544,104 @@ class VoiceTrackingFeature(commands.Cog):
     async def update_leaderboard(self):
         """Update voice channel names hourly using current-month stats."""
         await self.bot.wait_until_ready()
-        
-        guild_list = list(self.bot.guilds)
-        # Process guilds sequentially to avoid global rate limits
-        for guild_idx, guild in enumerate(guild_list):
-            try:
-                guild_id = guild.id
-                
-                # Skip if already updating this guild's leaderboard (prevents concurrent updates)
-                if guild_id in self.leaderboard_updating:
-                    start_time = self.leaderboard_update_times.get(guild_id, 0)
-                    if time.time() - start_time < 600:  # 10 minute timeout
-                        logging.info(f"Leaderboard update already in progress for guild {guild_id}, skipping...")
-                        continue
-                    else:
-                        logging.warning(f"Leaderboard update for guild {guild_id} stale (>10min), resetting...")
-                        self.leaderboard_updating.discard(guild_id)
-                
-                self.leaderboard_updating.add(guild_id)
-                self.leaderboard_update_times[guild_id] = time.time()
-                logging.info(f"Starting leaderboard update for guild {guild_id}")
-                
-                # Validate and clean voice stats (remove non-competitors to prevent contamination)
-                if self.validate_and_clean_voice_stats(guild_id):
-                    logging.info(f"Cleaned contaminated voice stats for guild {guild_id}")
-                
-                # Checkpoint: Save current voice stats for people in voice channels
-                self.checkpoint_voice_stats(guild_id)
-                
-                competitors = self.load_competitors(guild_id)
-                if not competitors:
-                    self.leaderboard_updating.discard(guild_id)
-                    continue
-                
-                # Use current-month totals for leaderboard channel names.
-                stats = self.load_voice_stats(guild_id)
-                logging.info(f"Leaderboard update for guild {guild_id} - loaded current-month stats sample: {dict(list(stats.items())[:10])}")
-                
-                # Get all-time totals for competitors
-                rankings = []
-                for user_id_str, channel_id in competitors.items():
-                    user_id = str(user_id_str)
-                    total_seconds = stats.get(user_id, 0)
-                    total_hours = total_seconds / 3600
-                    rankings.append((int(user_id), total_hours, channel_id))
-                
-                # Sort by hours descending
-                rankings.sort(key=lambda x: x[1], reverse=True)
-                
-                # Update channels with name AND position for proper sorting
-                medals = ["🥇", "🥈", "🥉"]
-                for i, (user_id, hours, channel_id) in enumerate(rankings):
-                    if not channel_id:
-                        continue
-                    try:
-                        logging.info(f"Updating channel {channel_id} for user {user_id} -> {hours:.2f}h")
-                        channel = self.bot.get_channel(int(channel_id))
-                        if not channel:
-                            continue
-                        
-                        try:
-                            # Use guild member for guild-specific display name (not global user)
-                            guild_member = guild.get_member(int(user_id))
-                            name = guild_member.display_name if guild_member else f"User{user_id}"
-                        except (discord.NotFound, discord.HTTPException) as e:
-                            logging.warning(f"Failed to fetch user {user_id} for leaderboard: {e}")
-                            name = f"User{user_id}"
-                        except Exception as e:
-                            logging.error(f"Unexpected error fetching user {user_id}: {e}")
-                            name = f"User{user_id}"
-                        
-                        if i < len(medals):
-                            medal = medals[i]
-                        else:
-                            medal = f"#{i+1}"
-                        new_name = f"{medal} {name}: {int(hours)}h"
-                        
-                        # Update channel with rate limit handling (Discord allows ~5 channel updates per 10 sec)
-                        # Use exponential backoff on rate limit errors
-                        max_retries = 3
-                        retry_count = 0
-                        retry_wait = 6  # Start with 6 seconds for retry backoff
-                        
-                        while retry_count < max_retries:
-                            try:
-                                await channel.edit(name=new_name, position=i)
-                                break  # Success, exit retry loop
-                            except discord.HTTPException as e:
-                                if e.status == 429:  # Rate limited
-                                    retry_count += 1
-                                    if retry_count < max_retries:
-                                        logging.warning(f"Rate limited on channel {channel_id}, retrying in {retry_wait}s... (attempt {retry_count})")
-                                        await asyncio.sleep(retry_wait)
-                                        retry_wait = min(retry_wait * 2, 60)  # Exponential backoff, max 60s
-                                    else:
-                                        logging.error(f"Rate limited {max_retries}x on channel {channel_id}, skipping")
-                                else:
-                                    # Other HTTP error
-                                    logging.error(f"Failed to update leaderboard channel {channel_id}: {e}")
-                                    break
-                        
-                        # Standard delay between channels (spacing out requests to avoid rate limits)
-                        # Discord limit: ~5 PATCH requests per 10 seconds, so 2 seconds between requests
-                        if i < len(rankings) - 1:  # Don't wait after last channel
-                            await asyncio.sleep(2)
-                    except Exception as e:
-                        logging.error(f"Failed to update leaderboard channel {channel_id}: {e}")
-                
-            except Exception as e:
-                logging.error(f"Leaderboard update error for guild {guild.id}: {e}")
-            finally:
-                # Always remove guild from updating set when done (success or error)
-                self.leaderboard_updating.discard(guild_id)
-                self.leaderboard_update_times.pop(guild_id, None)
-            
-            # Add delay between guild updates to avoid global rate limits
-            # Only if there are more guilds to process
-            if guild_idx < len(guild_list) - 1:
-                await asyncio.sleep(5)
-        
+        # Each guild has its own edit budget in the scheduler, so guilds refresh concurrently
+        await asyncio.gather(*(self.update_guild_leaderboard(guild) for guild in list(self.bot.guilds)))
         gc.collect()
-    
+
+    async def update_guild_leaderboard(self, guild: discord.Guild):
+        """Render one guild's leaderboard channels, editing only what changed."""
+        guild_id = guild.id
+        try:
+            # Skip if already updating this guild's leaderboard (prevents concurrent updates)
+            if guild_id in self.leaderboard_updating:
+                start_time = self.leaderboard_update_times.get(guild_id, 0)
+                if time.time() - start_time < 600:  # 10 minute timeout
+                    logging.info(f"Leaderboard update already in progress for guild {guild_id}, skipping...")
+                    return
+                logging.warning(f"Leaderboard update for guild {guild_id} stale (>10min), resetting...")
+
+            self.leaderboard_updating.add(guild_id)
+            self.leaderboard_update_times[guild_id] = time.time()
+            logging.info(f"Starting leaderboard update for guild {guild_id}")
+
+            # Validate and clean voice stats (remove non-competitors to prevent contamination)
+            if self.validate_and_clean_voice_stats(guild_id):
+                logging.info(f"Cleaned contaminated voice stats for guild {guild_id}")
+
+            # Checkpoint: Save current voice stats for people in voice channels
+            self.checkpoint_voice_stats(guild_id)
+
+            competitors = self.load_competitors(guild_id)
+            if not competitors:
+                return
+
+            # Use current-month totals for leaderboard channel names.
+            stats = self.load_voice_stats(guild_id)
+            rankings = []
+            for user_id, channel_id in competitors.items():
+                total_hours = stats.get(user_id, 0) / 3600
+                rankings.append((user_id, total_hours, channel_id))
+
+            # Sort by hours descending
+            rankings.sort(key=lambda x: x[1], reverse=True)
+
+            channels = {}
+            desired = []
+            medals = ["🥇", "🥈", "🥉"]
+            for i, (user_id, hours, channel_id) in enumerate(rankings):
+                if not channel_id:
+                    continue
+                channel = self.bot.get_channel(int(channel_id))
+                if not channel:
+                    continue
+                # Use guild member for guild-specific display name (not global user)
+                guild_member = guild.get_member(user_id)
+                name = guild_member.display_name if guild_member else f"User{user_id}"
+                medal = medals[i] if i < len(medals) else f"#{i+1}"
+                channels[channel.id] = channel
+                desired.append((channel.id, f"{medal} {name}: {int(hours)}h"))
+
+            rendered = self._rendered_leaderboard(guild_id, channels)
+            edits = plan_channel_edits(desired, rendered)
+            logging.info(f"Leaderboard update for guild {guild_id}: {len(edits)}/{len(desired)} channels changed")
+            for channel_id, changes in edits:
+                channel = channels[channel_id]
+                applied = await self.edit_scheduler.run(
+                    guild_id,
+                    lambda channel=channel, changes=changes: channel.edit(**changes),
+                    route="channel_rename" if "name" in changes else None,
+                    route_key=channel_id,
+                )
+                if applied:
+                    name, position = rendered.get(channel_id, (None, None))
+                    rendered[channel_id] = (changes.get("name", name), changes.get("position", position))
+        except Exception as e:
+            logging.error(f"Leaderboard update error for guild {guild_id}: {e}")
+        finally:
+            # Always remove guild from updating set when done (success or error)
+            self.leaderboard_updating.discard(guild_id)
+            self.leaderboard_update_times.pop(guild_id, None)
+
+    def _rendered_leaderboard(self, guild_id: int, channels: dict) -> dict:
+        """Last rendered ``{channel_id: (name, position)}`` for a guild's leaderboard channels.
+
+        Seeded from the channel cache after a restart; entries whose live name no
+        longer matches (renamed by hand) are treated as unknown.
+        """
+        rendered = self.leaderboard_rendered.get(guild_id)
+        if rendered is None:
+            live = sorted(channels.values(), key=lambda ch: (ch.position, ch.id))
+            ordinals = {ch.id: i for i, ch in enumerate(live)}
+            rendered = self.leaderboard_rendered[guild_id] = {
+                channel_id: (ch.name, ordinals[channel_id])
+                for channel_id, ch in channels.items()
+            }
+        for channel_id, channel in channels.items():
+            name, position = rendered.get(channel_id, (None, None))
+            if channel.name != name:
+                rendered[channel_id] = (None, position)
+        return rendered
+
     @tasks.loop(minutes=5)
     async def voice_checkpoint(self):
         """Periodically checkpoint in-progress voice stats to prevent data loss on crash."""
@@ -488,6 +649,7 @@ class VoiceTrackingFeature(commands.Cog):
         try:
             for guild in self.bot.guilds:
                 self.checkpoint_voice_stats(guild.id)
+                self.schedule_rank_flush(guild)
         except Exception as e:
             logging.error(f"Periodic voice checkpoint error: {e}")
 
@@ -509,8 +671,7 @@ class VoiceTrackingFeature(commands.Cog):
                 
                 # If we have no recorded last reset month, initialize it and skip reset
                 if last_reset_month is None:
-                    state["last_reset_month"] = current_month
-                    self.save_state(guild_id, state)
+                    self.set_state_key(guild_id, "last_reset_month", current_month)
                     continue
                 
                 # If already recorded for this month, nothing to do
@@ -534,8 +695,8 @@ class VoiceTrackingFeature(commands.Cog):
                 rankings = []
                 for user_id, total_seconds in stats.items():
                     total_hours = total_seconds / 3600
-                    rank_name, role_id, perks, _ = self.get_user_rank(total_hours)
-                    rankings.append((int(user_id), total_hours, rank_name))
+                    rank_name, role_id, perks, _ = self.get_user_rank(total_hours, guild_id)
+                    rankings.append((user_id, total_hours, rank_name))
                 
                 rankings.sort(key=lambda x: x[1], reverse=True)
                 
@@ -554,7 +715,7 @@ class VoiceTrackingFeature(commands.Cog):
                         
                         for i, (user_id, hours, rank_name) in enumerate(rankings):
                             try:
-                                guild_member = guild.get_member(int(user_id))
+                                guild_member = guild.get_member(user_id)
                                 name = guild_member.display_name if guild_member else f"<@{user_id}>"
                             except Exception:
                                 name = f"<@{user_id}>"
@@ -572,7 +733,7 @@ class VoiceTrackingFeature(commands.Cog):
                         if remaining:
                             for i, (uid, hours, rank_name) in enumerate(remaining, start=4):
                                 try:
-                                    guild_member = guild.get_member(int(uid))
+                                    guild_member = guild.get_member(uid)
                                     display = guild_member.display_name if guild_member else f"<@{uid}>"
                                 except Exception:
                                     display = f"<@{uid}>"
@@ -596,33 +757,32 @@ class VoiceTrackingFeature(commands.Cog):
                 if now.month == 1:
                     archive_year -= 1  # If January, archive goes to December of previous year
                 
+                # 6. Reset all stats to 0 in the same transaction as the archive
                 try:
-                    storage.archive_voice_stats(guild_id, archive_year, archive_month, stats)
-                    logging.info(f"Archived stats for guild {guild_id} to SQLite ({archive_year}-{archive_month:02d})")
+                    storage.reset_voice_month(guild_id, archive_year, archive_month)
+                    logging.info(f"Archived stats for guild {guild_id} to SQLite ({archive_year}-{archive_month:02d}) and reset them to 0")
                 except Exception as e:
-                    logging.error(f"Failed to archive stats for guild {guild_id}: {e}")
-                
-                # 6. Reset all stats to 0
-                reset_stats = {user_id: 0 for user_id in stats.keys()}
-                self.save_voice_stats(guild_id, reset_stats)
-                logging.info(f"Voice stats reset to 0 for all users in guild {guild_id}")
+                    logging.error(f"Failed to archive and reset stats for guild {guild_id}: {e}")
                 
-                # 7. Sync roles to match new stats (everyone back to Iron)
+                # 7. Sync roles for everyone who dropped a rank (everyone back to Iron)
                 try:
-                    await self.apply_rank_roles_to_guild(guild)
-                    logging.info(f"Monthly reset: roles synced for guild {guild_id}")
+                    for user_id, seconds in stats.items():
+                        self.note_rank_transition(guild_id, user_id, seconds, 0)
+                    self.schedule_rank_flush(guild)
+                    logging.info(f"Monthly reset: role sync queued for guild {guild_id}")
                 except Exception as e:
                     logging.error(f"Failed to sync roles after monthly reset for guild {guild_id}: {e}")
                 
                 # 8. Update state
-                state["last_reset_month"] = current_month
-                self.save_state(guild_id, state)
+                self.set_state_key(guild_id, "last_reset_month", current_month)
                 
                 # 8.5. Reset economy purchases for this guild
                 storage = self._get_storage()
                 if storage:
                     storage.clear_purchases(guild_id)
                     logging.info(f"Economy purchases cleared for guild {guild_id}")
+                    # Durability barrier: the archive + reset must be on disk before moving on
+                    storage.flush()
                 
                 # 9. SYNC: Update leaderboard immediately after reset (don't wait up to 55 min)
                 logging.info(f"Syncing leaderboard immediately after reset for guild {guild_id}")
@@ -643,8 +803,8 @@ class VoiceTrackingFeature(commands.Cog):
         """Track competitor voice time and handle entrance sounds for Diamond+ users."""
         # Only track competitors (users who signed up for the competition)
         guild_id = member.guild.id
-        user_id = str(member.id)
-        competitors = self.load_competitors(guild_id)
+        user_id = member.id
+        competitors = await self.aload_competitors(guild_id)
         if user_id not in competitors:
             return
         now = time.time()
@@ -652,213 +812,126 @@ class VoiceTrackingFeature(commands.Cog):
         # Joined voice channel
         if before.channel is None and after.channel is not None:
             self.voice_join_times.setdefault(guild_id, {})[user_id] = now
+            self.voice_join_channels.setdefault(guild_id, {})[user_id] = after.channel.id
+            storage = self._get_storage()
+            if storage:
+                await storage.aopen_voice_session(guild_id, user_id, after.channel.id, now)
             
             # Check rank for entrance sound (Diamond+)
-            stats = self.load_voice_stats(guild_id)
+            stats = await self.aload_voice_stats(guild_id)
             total_seconds = stats.get(user_id, 0)
             total_hours = total_seconds / 3600
-            rank_name, role_id, perks, _ = self.get_user_rank(total_hours)
+            rank_name, role_id, perks, _ = self.get_user_rank(total_hours, guild_id)
             logging.info(f"Voice join detected: {member.display_name} ({member.id}) rank={rank_name} hours={total_hours:.2f}")
             
             # Diamond+ ranks can have entrance sounds
-            if rank_name in ["Diamond", "Elite", "Immortal", "Legendary"]:
-                entry_settings = self.load_entry_settings(guild_id)
+            if rank_name in ENTRANCE_RANKS:
+                entry_settings = await self.aload_entry_settings(guild_id)
                 user_settings = entry_settings.get(user_id, {"enabled": True, "type": "default"})
                 logging.info(f"Entry settings for {member.display_name} ({member.id}): {user_settings}")
                 
                 # Check if entrance is enabled
                 if user_settings.get("enabled", True):
-                    # If audio is already playing, drop the entrance sound
-                    if self.audio_lock.locked():
-                        logging.info(f"Dropped entrance sound for {member.display_name} - audio lock busy")
-                        return
                     logging.info(f"Scheduling entrance sound for {member.display_name} ({member.id})")
-                    # Play entrance sound
-                    asyncio.create_task(self.play_entrance_sound(member, after.channel, rank_name, user_settings))
+                    self.queue_entrance_sound(member, after.channel, rank_name, user_settings)
         
         # Left voice channel
         elif before.channel is not None and after.channel is None:
-            guild_times = self.voice_join_times.get(guild_id, {})
-            if user_id in guild_times:
-                start_time = guild_times.pop(user_id)
-                duration = now - start_time
-                
-                # Immediately save to JSON (persistence!)
-                stats = self.load_voice_stats(guild_id)
-                if user_id not in stats:
-                    stats[user_id] = 0
-                
-                stats[user_id] += duration
-                
-                self.save_voice_stats(guild_id, stats)
-                
-                # Economy: earn coins for this session
-                total_hours = stats[user_id] / 3600
-                _, _, _, mult = self.get_user_rank(total_hours)
-                coins_earned = (duration / 600) * mult
-                storage = self._get_storage()
-                if storage:
-                    event_mult = get_coin_multiplier(storage, guild_id)
-                    coins_earned *= event_mult
-                    storage.add_coins(guild_id, int(user_id), coins_earned)
-                
-                gc.collect()
+            await self._end_voice_segment(member, before.channel.id, now)
+        
+        # Moved between voice channels: close the segment and reopen it in the new channel
+        elif before.channel is not None and after.channel is not None and before.channel.id != after.channel.id:
+            await self._end_voice_segment(member, before.channel.id, now, next_channel_id=after.channel.id)
     
-    async def play_entrance_sound(self, member, voice_channel, rank_name, user_settings):
-        """Play entrance sound for a user joining voice channel."""
-        try:
-            async with self.audio_lock:
-                user_id = str(member.id)
-                entry_type = user_settings.get("type", "default")
-                
-                # For Immortal/Legendary with custom setup, play custom sound
-                if rank_name in ["Immortal", "Legendary"] and entry_type in ["tts", "file"]:
-                    # Look for custom file
-                    custom_files = [f"data/sfx/custom_{user_id}.mp3", f"data/sfx/custom_{user_id}.ogg"]
-                    audio_file = None
-                    for cf in custom_files:
-                        if os.path.exists(cf):
-                            audio_file = cf
-                            break
-                    
-                    if audio_file:
-                        # Play custom file
-                        try:
-                            logging.info(f"Found custom entrance file for {member.display_name} ({member.id}): {audio_file}")
-                            voice_client = None
-                            # Find existing voice client for this guild
-                            for vc in self.bot.voice_clients:
-                                if vc.guild.id == member.guild.id and vc.channel.id == voice_channel.id:
-                                    voice_client = vc
-                                    break
-                            
-                            if not voice_client:
-                                voice_client = await voice_channel.connect()
-                            
-                            voice_client.play(discord.FFmpegPCMAudio(audio_file, executable=self.ffmpeg_exec))
-                            
-                            # Wait for playback to finish
-                            while voice_client.is_playing():
-                                await asyncio.sleep(0.1)
-                            
-                            await voice_client.disconnect()
-                            return
-                        except Exception as e:
-                            logging.error(f"Failed to play custom entrance for {member.display_name}: {e}")
-                
-                # Default: Generate TTS "Xin chào {name}" for Diamond/Elite or fallback
-                if rank_name in ["Diamond", "Elite", "Immortal", "Legendary"]:
-                    temp_file = f"data/sfx/tts_entrance_{member.id}.mp3"
-                    try:
-                        message = f"Xin chào {member.display_name}"
-                        logging.info(f"Generating TTS entrance for {member.display_name} ({member.id}): '{message}'")
-                        tts = gTTS(text=message, lang='vi', slow=False)
-                        await asyncio.to_thread(tts.save, temp_file)
-                        
-                        # Play TTS
-                        voice_client = None
-                        for vc in self.bot.voice_clients:
-                            if vc.guild.id == member.guild.id and vc.channel.id == voice_channel.id:
-                                voice_client = vc
-                                break
-                        
-                        if not voice_client:
-                            voice_client = await voice_channel.connect()
-                        
-                        voice_client.play(discord.FFmpegPCMAudio(temp_file, executable=self.ffmpeg_exec))
-                        
-                        # Wait for playback to finish
-                        while voice_client.is_playing():
-                            await asyncio.sleep(0.1)
-                        
-                        await voice_client.disconnect()
-                        
-                    except Exception as e:
-                        logging.error(f"Failed to play default entrance TTS for {member.display_name}: {e}")
-                    finally:
-                        # Delete temp file
-                        try:
-                            if os.path.exists(temp_file):
-                                os.remove(temp_file)
-                        except:
-                            pass
-                        gc.collect()
+    async def _end_voice_segment(self, member, channel_id, now: float, next_channel_id=None):
+        """Credit a member's voice time since their join (or last move) and close or reopen the session."""
+        guild_id = member.guild.id
+        user_id = member.id
+        guild_times = self.voice_join_times.get(guild_id, {})
+        if user_id not in guild_times:
+            return
+        start_time = guild_times.pop(user_id)
+        self.voice_join_channels.get(guild_id, {}).pop(user_id, None)
+        if next_channel_id is not None:
+            guild_times[user_id] = now
+            self.voice_join_channels.setdefault(guild_id, {})[user_id] = next_channel_id
+        duration = now - start_time
         
-        except Exception as e:
-            logging.error(f"Entrance sound error for {member.display_name}: {e}")
+        # Economy: earn coins for this segment
+        storage = self._get_storage()
+        stats = await self.aload_voice_stats(guild_id)
+        total_hours = (stats.get(user_id, 0) + duration) / 3600
+        _, _, _, mult = self.get_user_rank(total_hours, guild_id)
+        event_mult = await asyncio.to_thread(get_coin_multiplier, storage, guild_id)
+        coins_earned = (duration / 600) * mult * event_mult
+        
+        # Seconds, session log and coins land in one transaction
+        total_seconds = await storage.arecord_voice_leave(
+            guild_id, user_id, duration, coins_earned, (channel_id, start_time, now), next_channel_id
+        )
+        if self.note_rank_transition(guild_id, user_id, total_seconds - duration, total_seconds):
+            self.schedule_rank_flush(member.guild)
+        
+        gc.collect()
     
-    async def process_say_queue(self):
-        """Background task to process /say commands from the queue."""
-        while True:
-            try:
-                # Wait for next item in queue
-                interaction, message_text = await self.say_queue.get()
-                
-                # Get user's voice channel
-                if not interaction.user.voice or not interaction.user.voice.channel:
-                    try:
-                        await interaction.followup.send("❌ Bạn phải ở trong voice channel!", ephemeral=True)
-                    except:
-                        pass
-                    continue
-                
-                voice_channel = interaction.user.voice.channel
-                
-                # Generate TTS file
-                temp_file = f"data/sfx/tts_{interaction.id}.mp3"
+    def queue_entrance_sound(self, member, voice_channel, rank_name, user_settings):
+        """Queue a member's entrance sound; a quick rejoin updates the pending one."""
+        try:
+            self.audio_scheduler.submit(
+                member.guild, voice_channel,
+                lambda: self.load_entrance_source(member, rank_name, user_settings),
+                priority=PRIORITY_ENTRANCE, key=("entrance", member.id),
+            )
+        except asyncio.QueueFull:
+            logging.info(f"Dropped entrance sound for {member.display_name} - entrance queue full")
+
+    async def load_entrance_source(self, member, rank_name, user_settings):
+        """Audio source for a member's entrance sound, or None if there is nothing to play."""
+        if member.voice is None or member.voice.channel is None:
+            return None  # Already left again
+        user_id = member.id
+        entry_type = user_settings.get("type", "default")
+        
+        # For Immortal/Legendary with custom setup, play custom sound
+        if rank_name in ["Immortal", "Legendary"] and entry_type in ["tts", "file"]:
+            # Look for custom file
+            custom_files = [f"data/sfx/custom_{user_id}.mp3", f"data/sfx/custom_{user_id}.ogg"]
+            audio_file = None
+            for cf in custom_files:
+                if os.path.exists(cf):
+                    audio_file = cf
+                    break
+            
+            if audio_file:
                 try:
-                    tts = gTTS(text=message_text, lang='vi', slow=False)
-                    await asyncio.to_thread(tts.save, temp_file)
+                    logging.info(f"Found custom entrance file for {member.display_name} ({member.id}): {audio_file}")
+                    return await self.open_audio_source(audio_file)
                 except Exception as e:
-                    try:
-                        await interaction.followup.send(f"❌ TTS generation failed: {e}", ephemeral=True)
-                    except:
-                        pass
-                    continue
-                
-                # Acquire audio lock and play
-                async with self.audio_lock:
-                    try:
-                        # Connect to voice
-                        voice_client = None
-                        for vc in self.bot.voice_clients:
-                            if vc.guild.id == interaction.guild.id:
-                                voice_client = vc
-                                break
-                        
-                        if not voice_client or not voice_client.is_connected():
-                            voice_client = await voice_channel.connect()
-                        elif voice_client.channel.id != voice_channel.id:
-                            await voice_client.move_to(voice_channel)
-                        
-                        # Play audio
-                        voice_client.play(discord.FFmpegPCMAudio(temp_file, executable=self.ffmpeg_exec))
-                        
-                        # Wait for playback to finish
-                        while voice_client.is_playing():
-                            await asyncio.sleep(0.1)
-                        
-                        # Disconnect
-                        await voice_client.disconnect()
-                        
-                    except Exception as e:
-                        logging.error(f"Say playback error: {e}")
-                        try:
-                            await interaction.followup.send(f"❌ Playback failed: {e}", ephemeral=True)
-                        except:
-                            pass
-                    finally:
-                        # Always delete the temp file
-                        try:
-                            if os.path.exists(temp_file):
-                                os.remove(temp_file)
-                        except Exception as e:
-                            logging.warning(f"Failed to delete temp file {temp_file}: {e}")
-                        gc.collect()
-            
-            except Exception as e:
-                logging.error(f"Say queue processor error: {e}")
-                await asyncio.sleep(1)
+                    logging.error(f"Failed to load custom entrance for {member.display_name}: {e}")
+        
+        # Default: TTS "Xin chào {name}" for Diamond/Elite or fallback
+        if rank_name in ENTRANCE_RANKS:
+            message = f"Xin chào {member.display_name}"
+            logging.info(f"Playing TTS entrance for {member.display_name} ({member.id}): '{message}'")
+            return await self.open_tts_source(message)
+        return None
+    
+    async def load_say_source(self, message_text: str):
+        """Audio source for a /say message (synthesized on a cache miss)."""
+        return await self.open_tts_source(message_text)
+    
+    async def report_say_result(self, interaction: discord.Interaction, message_text: str, result: asyncio.Future):
+        """Tell the /say user if their message was dropped or failed to play."""
+        try:
+            if not await result:
+                await interaction.followup.send(f"⌛ Hàng đợi quá lâu, đã bỏ qua: '{message_text}'", ephemeral=True)
+        except Exception as e:
+            try:
+                await interaction.followup.send(f"❌ Playback failed: {e}", ephemeral=True)
+            except:
+                pass
+        finally:
+            gc.collect()
     
     # --- Slash Commands ---
     
@@ -893,6 +966,111 @@ class VoiceTrackingFeature(commands.Cog):
             logging.error(f"Manual leaderboard refresh failed: {e}")
             await interaction.followup.send(f"❌ Refresh failed: {e}", ephemeral=True)
     
+    @app_commands.command(name="rebuild_all_time", description="(Admin) Rebuild all-time voice totals from monthly stats")
+    @admin_only()
+    async def rebuild_all_time_cmd(self, interaction: discord.Interaction):
+        """Recompute the materialized all-time user and channel voice totals for this guild."""
+        await interaction.response.defer(ephemeral=True)
+        try:
+            guild_id = interaction.guild.id
+            storage = self._get_storage()
+            rebuilt_users = storage.rebuild_voice_stats_all_time(guild_id)
+            rebuilt_channels = storage.rebuild_channel_stats_all_time(guild_id)
+            logging.info(f"Rebuilt all-time voice totals for guild {guild_id}: {rebuilt_users} users, {rebuilt_channels} channels")
+            await interaction.followup.send(
+                f"✅ All-time totals rebuilt for {rebuilt_users} users and {rebuilt_channels} channels.",
+                ephemeral=True
+            )
+        except Exception as e:
+            logging.error(f"All-time rebuild failed: {e}")
+            await interaction.followup.send(f"❌ Rebuild failed: {e}", ephemeral=True)
+
+    @app_commands.command(name="storage_profile", description="(Admin) Show storage latency by method and slow queries")
+    @admin_only()
+    async def storage_profile_cmd(self, interaction: discord.Interaction):
+        """Dump the busiest storage methods (queue wait vs execution) and recent slow queries."""
+        await interaction.response.defer(ephemeral=True)
+        snapshot = self._get_storage().profile_snapshot()
+        calls = sorted(snapshot["calls"].items(), key=lambda item: item[1]["exec"]["total_ms"], reverse=True)
+        lines = ["**Storage methods** (count · avg queue · avg exec · max exec)"]
+        for method, stats in calls[:10]:
+            lines.append(
+                f"`{method}` {stats['exec']['count']} · {stats['queue']['avg_ms']:.1f} ms · "
+                f"{stats['exec']['avg_ms']:.1f} ms · {stats['exec']['max_ms']:.1f} ms"
+            )
+        slow = snapshot["slow_queries"][-3:]
+        lines.append(f"**Slow queries**: {len(snapshot['slow_queries'])}")
+        for entry in slow:
+            plan = "; ".join(entry["plan"]) or "n/a"
+            lines.append(f"{entry['elapsed_ms']:.0f} ms `{entry['sql'][:120]}` → {plan[:120]}")
+        await interaction.followup.send("\n".join(lines)[:1900], ephemeral=True)
+
+    @app_commands.command(name="voice_activity", description="Show this week's top voice members and peak hours")
+    async def voice_activity_cmd(self, interaction: discord.Interaction):
+        """Summarise this week's voice roll-ups: top members, busiest hours and daily totals."""
+        await interaction.response.defer(ephemeral=True)
+        guild = interaction.guild
+        if not guild:
+            await interaction.followup.send("❌ Guild context required.", ephemeral=True)
+            return
+        now = datetime.now(self.config.VIETNAM_TZ)
+        week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        start_ts, end_ts = week_start.timestamp(), now.timestamp()
+        storage = self._get_storage()
+        try:
+            weekly = await storage.avoice_seconds_between(guild.id, start_ts, end_ts)
+            peaks = await storage.avoice_peak_hours(guild.id, start_ts, end_ts)
+            daily = await storage.avoice_daily_totals(guild.id, week_start.strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d"))
+        except Exception as e:
+            logging.error(f"Voice activity lookup failed for guild {guild.id}: {e}")
+            await interaction.followup.send(f"❌ Lookup failed: {e}", ephemeral=True)
+            return
+        if not weekly:
+            await interaction.followup.send("📊 No voice activity recorded this week yet.", ephemeral=True)
+            return
+
+        lines = [f"📊 **Voice activity since {week_start.strftime('%d/%m')}**", "", "**Top members**"]
+        top = sorted(weekly.items(), key=lambda item: item[1], reverse=True)[:10]
+        for i, (uid, seconds) in enumerate(top):
+            member = guild.get_member(uid)
+            name = member.display_name if member else f"<@{uid}>"
+            lines.append(f"#{i+1} {name}: {seconds / 3600:.1f}h")
+        lines.append("")
+        lines.append("**Peak hours**: " + ", ".join(f"{hour:02d}:00 ({seconds / 3600:.1f}h)" for hour, seconds in peaks[:3]))
+        lines.append("**Per day**: " + ", ".join(f"{day[8:]}/{day[5:7]} {seconds / 3600:.1f}h" for day, seconds in daily.items()))
+        await interaction.followup.send("\n".join(lines)[:1900], ephemeral=True)
+
+    @app_commands.command(name="rank_thresholds", description="(Admin) Show or set the hours needed for each rank")
+    @app_commands.describe(hours="Comma-separated hours per rank from Iron to Legendary, or 'default'")
+    @admin_only()
+    async def rank_thresholds_cmd(self, interaction: discord.Interaction, hours: str = None):
+        """Show this guild's rank thresholds, or replace them and resync rank roles."""
+        await interaction.response.defer(ephemeral=True)
+        guild = interaction.guild
+        guild_config = self.config.get_guild_config(guild.id)
+        if hours:
+            try:
+                thresholds = None if hours.strip().lower() == "default" else [
+                    float(value) for value in hours.replace(" ", "").split(",")
+                ]
+                guild_config.set_rank_thresholds(thresholds)
+            except ValueError as e:
+                await interaction.followup.send(f"❌ Invalid thresholds: {e}", ephemeral=True)
+                return
+        table = self.get_rank_table(guild.id)
+        lines = ["**Rank thresholds**"]
+        lines += [f"{rank.name}: {threshold:g}h" for rank, threshold in zip(table.ranks, table.thresholds)]
+        if hours:
+            lines.append("Rank roles are being resynced in the background.")
+        await interaction.followup.send("\n".join(lines), ephemeral=True)
+        if hours:
+            # Everyone's rank may have moved, so run the full repair sweep once,
+            # replacing any sweep still running against the old thresholds
+            previous = self.rank_sweep_tasks.get(guild.id)
+            if previous is not None and not previous.done():
+                previous.cancel()
+            self.rank_sweep_tasks[guild.id] = asyncio.create_task(self.apply_rank_roles_to_guild(guild))
+
     @app_commands.command(name="admin_force_reset", description="(Admin Only) Manually trigger monthly reset NOW")
     @admin_only()
     async def admin_force_reset_cmd(self, interaction: discord.Interaction):
@@ -923,8 +1101,8 @@ class VoiceTrackingFeature(commands.Cog):
             rankings = []
             for user_id, total_seconds in stats.items():
                 total_hours = total_seconds / 3600
-                rank_name, role_id, perks, _ = self.get_user_rank(total_hours)
-                rankings.append((int(user_id), total_hours, rank_name))
+                rank_name, role_id, perks, _ = self.get_user_rank(total_hours, guild_id)
+                rankings.append((user_id, total_hours, rank_name))
             
             rankings.sort(key=lambda x: x[1], reverse=True)
             
@@ -944,7 +1122,7 @@ class VoiceTrackingFeature(commands.Cog):
                     
                     for i, (user_id, hours, rank_name) in enumerate(rankings):
                         try:
-                            guild_member = guild.get_member(int(user_id))
+                            guild_member = guild.get_member(user_id)
                             name = guild_member.display_name if guild_member else f"<@{user_id}>"
                         except Exception:
                             name = f"<@{user_id}>"
@@ -962,7 +1140,7 @@ class VoiceTrackingFeature(commands.Cog):
                     if remaining:
                         for i, (uid, hours, rank_name) in enumerate(remaining, start=4):
                             try:
-                                guild_member = guild.get_member(int(uid))
+                                guild_member = guild.get_member(uid)
                                 display = guild_member.display_name if guild_member else f"<@{uid}>"
                             except Exception:
                                 display = f"<@{uid}>"
@@ -987,36 +1165,33 @@ class VoiceTrackingFeature(commands.Cog):
             if now.month == 1:
                 archive_year -= 1  # If January, archive goes to December of previous year
             
+            # 6. Reset all stats to 0 in the same transaction as the archive
             try:
-                storage.archive_voice_stats(guild_id, archive_year, archive_month, stats)
-                logging.info(f"Archived stats for guild {guild_id} to SQLite ({archive_year}-{archive_month:02d})")
+                storage.reset_voice_month(guild_id, archive_year, archive_month)
+                logging.info(f"Archived stats for guild {guild_id} to SQLite ({archive_year}-{archive_month:02d}) and reset them to 0")
             except Exception as e:
-                logging.error(f"Failed to archive stats for guild {guild_id}: {e}")
-            
-            # 6. Reset all stats to 0
-            reset_stats = {user_id: 0 for user_id in stats.keys()}
-            self.save_voice_stats(guild_id, reset_stats)
-            logging.info(f"Voice stats reset to 0 for all users in guild {guild_id}")
+                logging.error(f"Failed to archive and reset stats for guild {guild_id}: {e}")
             
-            # 7. Sync roles to match new stats (everyone back to Iron)
+            # 7. Sync roles for everyone who dropped a rank (everyone back to Iron)
             try:
-                await self.apply_rank_roles_to_guild(guild)
-                logging.info(f"Manual reset: roles synced for guild {guild_id}")
+                for user_id, seconds in stats.items():
+                    self.note_rank_transition(guild_id, user_id, seconds, 0)
+                self.schedule_rank_flush(guild)
+                logging.info(f"Manual reset: role sync queued for guild {guild_id}")
             except Exception as e:
                 logging.error(f"Failed to sync roles after manual reset for guild {guild_id}: {e}")
             
             # 8. Update state - increment month (or keep current if same month)
-            state = self.load_state(guild_id)
             now = datetime.now(self.config.VIETNAM_TZ)
-            current_month = now.month
-            state["last_reset_month"] = current_month
-            self.save_state(guild_id, state)
+            self.set_state_key(guild_id, "last_reset_month", now.month)
             
             # 8.5. Reset economy purchases for this guild
             storage = self._get_storage()
             if storage:
                 storage.clear_purchases(guild_id)
                 logging.info(f"Economy purchases cleared for guild {guild_id}")
+                # Durability barrier: the archive + reset must be on disk before moving on
+                storage.flush()
             
             # 9. Update leaderboard immediately
             try:
@@ -1058,7 +1233,7 @@ class VoiceTrackingFeature(commands.Cog):
         
         if action.lower() == "add":
             target_user = user if user else interaction.user
-            user_id = str(target_user.id)
+            user_id = target_user.id
             
             # Admin check only if adding someone else
             if user and not interaction.user.guild_permissions.administrator:
@@ -1071,11 +1246,8 @@ class VoiceTrackingFeature(commands.Cog):
                 await interaction.followup.send(f"⚠️ {target_user.display_name} is already in the competition.", ephemeral=True)
                 return
             
-            # Initialize stats for new competitor
-            stats = self.load_voice_stats(guild_id)
-            if user_id not in stats:
-                stats[user_id] = 0
-                self.save_voice_stats(guild_id, stats)
+            # Initialize stats for new competitor (adding 0 creates the row if missing)
+            total_seconds = self.add_voice_seconds(guild_id, user_id, 0)
             
             # Create voice channel
             try:
@@ -1085,15 +1257,14 @@ class VoiceTrackingFeature(commands.Cog):
                     await interaction.followup.send("❌ Rank category not found. Please check guild config.", ephemeral=True)
                     return
                 
-                total_hours = stats.get(user_id, 0) / 3600
+                total_hours = total_seconds / 3600
                 
                 new_channel = await category.create_voice_channel(
                     name=f"🏅 {target_user.display_name}: {int(total_hours)}h",
                     reason=f"Rank channel for {target_user.display_name}"
                 )
                 
-                competitors[user_id] = str(new_channel.id)
-                self.save_competitors(guild_id, competitors)
+                self.set_competitor(guild_id, user_id, new_channel.id)
                 
                 await interaction.followup.send(f"✅ {target_user.display_name} joined the competition! Channel created: {new_channel.mention}", ephemeral=True)
                 gc.collect()
@@ -1107,7 +1278,7 @@ class VoiceTrackingFeature(commands.Cog):
                 return
             
             target_user = user if user else interaction.user
-            user_id = str(target_user.id)
+            user_id = target_user.id
             
             competitors = self.load_competitors(guild_id)
             
@@ -1125,8 +1296,7 @@ class VoiceTrackingFeature(commands.Cog):
                 except Exception as e:
                     logging.error(f"Failed to delete channel {channel_id}: {e}")
             
-            del competitors[user_id]
-            self.save_competitors(guild_id, competitors)
+            self.delete_competitor(guild_id, user_id)
             
             await interaction.followup.send(f"✅ {target_user.display_name} removed from voice time competition.", ephemeral=True)
             gc.collect()
@@ -1147,7 +1317,7 @@ class VoiceTrackingFeature(commands.Cog):
             for uid, channel_id in competitors.items():
                 total_seconds = stats.get(uid, 0)
                 total_hours = total_seconds / 3600
-                rankings.append((int(uid), total_hours))
+                rankings.append((uid, total_hours))
             
             rankings.sort(key=lambda x: x[1], reverse=True)
             
@@ -1180,11 +1350,12 @@ class VoiceTrackingFeature(commands.Cog):
                 await interaction.followup.send("❌ Please provide a valid number of seconds (0 or greater).", ephemeral=True)
                 return
             
-            user_id = str(user.id)
+            user_id = user.id
             stats = self.load_voice_stats(guild_id)
             old_seconds = stats.get(user_id, 0)
-            stats[user_id] = seconds
-            self.save_voice_stats(guild_id, stats)
+            self.set_voice_seconds(guild_id, user_id, seconds)
+            if self.note_rank_transition(guild_id, user_id, old_seconds, seconds):
+                self.schedule_rank_flush(interaction.guild)
             
             old_hours = int(old_seconds / 3600)
             new_hours = int(seconds / 3600)
@@ -1226,13 +1397,13 @@ class VoiceTrackingFeature(commands.Cog):
             logging.warning(f"Interaction defer failed for /say: {e}")
         
         guild_id = interaction.guild.id
-        user_id = str(interaction.user.id)
+        user_id = interaction.user.id
         
         # Check rank
         stats = self.load_voice_stats(guild_id)
         total_seconds = stats.get(user_id, 0)
         total_hours = total_seconds / 3600
-        rank_name, role_id, perks, _ = self.get_user_rank(total_hours)
+        rank_name, role_id, perks, _ = self.get_user_rank(total_hours, guild_id)
         
         # Must be Gold+ rank
         if rank_name not in ["Gold", "Platinum", "Diamond", "Elite", "Immortal", "Legendary"]:
@@ -1252,7 +1423,7 @@ class VoiceTrackingFeature(commands.Cog):
         storage = self._get_storage()
         if storage:
             month = datetime.now().strftime("%Y-%m")
-            purchased = storage.get_purchase(guild_id, int(user_id), month, "say_tokens")
+            purchased = storage.get_purchase(guild_id, user_id, month, "say_tokens")
             max_chars += int(purchased)
         if len(message) > max_chars:
             await interaction.followup.send(f"❌ Message quá dài! Tối đa {max_chars} characters.", ephemeral=True)
@@ -1263,20 +1434,40 @@ class VoiceTrackingFeature(commands.Cog):
             await interaction.followup.send("❌ Bạn phải ở trong voice channel!", ephemeral=True)
             return
         
-        # Try to add to queue
+        # Try to add to the guild's queue
         try:
-            self.say_queue.put_nowait((interaction, message))
+            result = self.audio_scheduler.submit(
+                interaction.guild, interaction.user.voice.channel,
+                lambda: self.load_say_source(message), priority=PRIORITY_SAY,
+            )
+            asyncio.create_task(self.report_say_result(interaction, message, result))
             self.say_cooldowns[user_id] = now
             await interaction.followup.send(f"✅ Đã thêm vào hàng đợi: '{message}'", ephemeral=True)
         except asyncio.QueueFull:
             await interaction.followup.send("❌ Bot đang quá tải audio, chờ xíu!", ephemeral=True)
     
+    async def cog_load(self):
+        """Called when cog is added to the bot; starts one-off startup work."""
+        self.startup_tasks = [
+            # Pick up members who were already in voice when the bot started
+            asyncio.create_task(self.reconcile_voice_sessions()),
+            # Synthesize entrance greetings before anyone joins
+            asyncio.create_task(self.prewarm_entrance_tts()),
+        ]
+
     def cog_unload(self):
         """Called when cog is unloaded."""
         self.update_leaderboard.cancel()
         self.monthly_reset_check.cancel()
         self.periodic_role_sync.cancel()
         self.voice_checkpoint.cancel()
+        for task in self.startup_tasks:
+            task.cancel()
+        for task in self.rank_flush_tasks.values():
+            task.cancel()
+        for task in self.rank_sweep_tasks.values():
+            task.cancel()
+        asyncio.create_task(self.audio_scheduler.close(self.bot.guilds))
 
 
 # Entry command group setup
@@ -1290,24 +1481,22 @@ class EntryCommandsGroup(commands.GroupCog, name="entry", description="Manage en
     async def entry_on(self, interaction: discord.Interaction):
         """Enable entrance sound for Diamond+ users."""
         guild_id = interaction.guild.id
-        user_id = str(interaction.user.id)
+        user_id = interaction.user.id
         
         # Check rank
         stats = self.voice_feature.load_voice_stats(guild_id)
         total_seconds = stats.get(user_id, 0)
         total_hours = total_seconds / 3600
-        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours)
+        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours, guild_id)
         
         if rank_name not in ["Diamond", "Elite", "Immortal", "Legendary"]:
             await interaction.response.send_message(f"❌ Chỉ Diamond rank trở lên mới có entrance sound! (Rank hiện tại: {rank_name})", ephemeral=True)
             return
         
         entry_settings = self.voice_feature.load_entry_settings(guild_id)
-        if user_id not in entry_settings:
-            entry_settings[user_id] = {"enabled": True, "type": "default"}
-        else:
-            entry_settings[user_id]["enabled"] = True
-        self.voice_feature.save_entry_settings(guild_id, entry_settings)
+        user_settings = entry_settings.get(user_id, {"type": "default"})
+        user_settings["enabled"] = True
+        self.voice_feature.set_entry_setting(guild_id, user_id, user_settings)
         
         await interaction.response.send_message("✅ Entrance sound đã BẬT!", ephemeral=True)
     
@@ -1315,24 +1504,22 @@ class EntryCommandsGroup(commands.GroupCog, name="entry", description="Manage en
     async def entry_off(self, interaction: discord.Interaction):
         """Disable entrance sound for Diamond+ users."""
         guild_id = interaction.guild.id
-        user_id = str(interaction.user.id)
+        user_id = interaction.user.id
         
         # Check rank
         stats = self.voice_feature.load_voice_stats(guild_id)
         total_seconds = stats.get(user_id, 0)
         total_hours = total_seconds / 3600
-        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours)
+        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours, guild_id)
         
         if rank_name not in ["Diamond", "Elite", "Immortal", "Legendary"]:
             await interaction.response.send_message(f"❌ Chỉ Diamond rank trở lên mới có entrance sound! (Rank hiện tại: {rank_name})", ephemeral=True)
             return
         
         entry_settings = self.voice_feature.load_entry_settings(guild_id)
-        if user_id not in entry_settings:
-            entry_settings[user_id] = {"enabled": False, "type": "default"}
-        else:
-            entry_settings[user_id]["enabled"] = False
-        self.voice_feature.save_entry_settings(guild_id, entry_settings)
+        user_settings = entry_settings.get(user_id, {"type": "default"})
+        user_settings["enabled"] = False
+        self.voice_feature.set_entry_setting(guild_id, user_id, user_settings)
         
         await interaction.response.send_message("✅ Entrance sound đã TẮT!", ephemeral=True)
     
@@ -1340,13 +1527,13 @@ class EntryCommandsGroup(commands.GroupCog, name="entry", description="Manage en
     async def entry_add(self, interaction: discord.Interaction):
         """Add custom entrance sound for Immortal+ users."""
         guild_id = interaction.guild.id
-        user_id = str(interaction.user.id)
+        user_id = interaction.user.id
         
         # Check rank
         stats = self.voice_feature.load_voice_stats(guild_id)
         total_seconds = stats.get(user_id, 0)
         total_hours = total_seconds / 3600
-        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours)
+        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours, guild_id)
         
         if rank_name not in ["Immortal", "Legendary"]:
             await interaction.response.send_message(f"❌ Chỉ Immortal rank trở lên mới tùy chỉnh entrance sound! (Rank hiện tại: {rank_name})", ephemeral=True)
@@ -1363,13 +1550,13 @@ class EntryCommandsGroup(commands.GroupCog, name="entry", description="Manage en
         await interaction.response.defer(ephemeral=True)
         
         guild_id = interaction.guild.id
-        user_id = str(interaction.user.id)
+        user_id = interaction.user.id
         
         # Check rank
         stats = self.voice_feature.load_voice_stats(guild_id)
         total_seconds = stats.get(user_id, 0)
         total_hours = total_seconds / 3600
-        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours)
+        rank_name, role_id, perks, _ = self.voice_feature.get_user_rank(total_hours, guild_id)
         
         if rank_name not in ["Immortal", "Legendary"]:
             await interaction.followup.send(f"❌ Chỉ Immortal rank trở lên mới upload custom audio! (Rank hiện tại: {rank_name})", ephemeral=True)
@@ -1380,7 +1567,7 @@ class EntryCommandsGroup(commands.GroupCog, name="entry", description="Manage en
         storage = self.voice_feature._get_storage()
         if storage:
             month = datetime.now().strftime("%Y-%m")
-            purchased_kb = storage.get_purchase(guild_id, int(user_id), month, "entry_storage")
+            purchased_kb = storage.get_purchase(guild_id, user_id, month, "entry_storage")
             max_bytes += int(purchased_kb) * 1024
         if file.size > max_bytes:
             await interaction.followup.send(f"❌ File quá lớn! Tối đa {max_bytes // 1024}KB (file của bạn: {file.size // 1024}KB)", ephemeral=True)
@@ -1398,6 +1585,7 @@ class EntryCommandsGroup(commands.GroupCog, name="entry", description="Manage en
             try:
                 if os.path.exists(old_file):
                     os.remove(old_file)
+                remove_opus(old_file)
             except Exception as e:
                 logging.warning(f"Failed to delete old custom file {old_file}: {e}")
         
@@ -1405,11 +1593,10 @@ class EntryCommandsGroup(commands.GroupCog, name="entry", description="Manage en
         custom_file = f"data/sfx/custom_{user_id}{ext}"
         try:
             await file.save(custom_file)
+            await self.voice_feature.prepare_audio(custom_file)
             
             # Update settings
-            entry_settings = self.voice_feature.load_entry_settings(guild_id)
-            entry_settings[user_id] = {"enabled": True, "type": "file"}
-            self.voice_feature.save_entry_settings(guild_id, entry_settings)
+            self.voice_feature.set_entry_setting(guild_id, user_id, {"enabled": True, "type": "file"})
             
             await interaction.followup.send(f"✅ Đã upload custom entrance sound! ({file.filename})", ephemeral=True)
         except Exception as e:
@@ -1467,21 +1654,21 @@ class EntryTTSModal(discord.ui.Modal, title="Custom TTS Entrance"):
             try:
                 if os.path.exists(old_file):
                     os.remove(old_file)
+                remove_opus(old_file)
             except Exception as e:
                 logging.warning(f"Failed to delete old custom file {old_file}: {e}")
         
-        # Generate TTS file
+        # Copy the clip out of the TTS cache (synthesized once per distinct text)
         custom_file = f"data/sfx/custom_{self.user_id}.mp3"
         try:
-            tts = gTTS(text=text, lang='vi', slow=False)
-            await asyncio.to_thread(tts.save, custom_file)
-            
-            # Get voice_feature from bot
             voice_feature = interaction.client.get_cog("VoiceTrackingFeature")
+            tts_cache = voice_feature.get_tts_cache() if voice_feature else TTSCache()
+            clip_path = await tts_cache.get_path(text, "vi")
+            await asyncio.to_thread(shutil.copyfile, clip_path, custom_file)
+            
             if voice_feature:
-                entry_settings = voice_feature.load_entry_settings(self.guild_id)
-                entry_settings[self.user_id] = {"enabled": True, "type": "tts", "text": text}
-                voice_feature.save_entry_settings(self.guild_id, entry_settings)
+                await voice_feature.prepare_audio(custom_file)
+                voice_feature.set_entry_setting(self.guild_id, self.user_id, {"enabled": True, "type": "tts", "text": text})
             
             await interaction.followup.send(f"✅ Đã tạo custom TTS entrance: '{text}'", ephemeral=True)
         except Exception as e:
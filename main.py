@@ -249,6 +249,7 @@ async def help_command(interaction: discord.Interaction):
         name="�🔧 Admin Commands",
         value="• `/sync_roles` - Sync rank roles for all members\n"
               "• `/refresh_leaderboard` - Force update leaderboard channels\n"
+              "• `/rank_thresholds` - Show or set hours per rank\n"
               "• `/admin_force_reset` - Manually trigger monthly reset (testing)",
         inline=False
     )
@@ -405,8 +406,9 @@ async def on_ready():
     # Cleanup orphaned TTS files from previous sessions
     try:
         for filename in os.listdir("data/sfx"):
-            if filename.startswith("tts_"):
-                file_path = os.path.join("data/sfx", filename)
+            file_path = os.path.join("data/sfx", filename)
+            # Skip directories such as the persistent tts_cache
+            if filename.startswith("tts_") and os.path.isfile(file_path):
                 try:
                     os.remove(file_path)
                     logging.info(f"Cleaned up orphaned file: {filename}")
@@ -520,5 +522,9 @@ async def on_guild_join(guild: discord.Guild):
 
 # --- Main Entry Point ---
 if __name__ == "__main__":
-    bot.run(BotConfig.DISCORD_TOKEN)
+    try:
+        bot.run(BotConfig.DISCORD_TOKEN)
+    finally:
+        # Durability barrier: commit anything still queued by group commit
+        BotConfig.close_storage()
 
@@ -0,0 +1,96 @@
+"""Microbenchmark for the storage hot read paths.
+
+Not collected by pytest. Run from the repo root:
+
+    python -m tests.bench_storage [--rows 200] [--calls 2000]
+
+It compares the old ``aiosqlite.Row`` + dict-comprehension decoding against the
+tuple fast path, ``json.dumps(..., ensure_ascii=False)`` against the shared
+encoder, and reports the end-to-end per-call cost of the uncached storage loads.
+"""
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+
+from core.storage import (
+    _SQL_LOAD_VOICE_STATS,
+    SQLiteStorage,
+    _json_dumps,
+)
+
+
+def _per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def bench_row_decoding(db_path: str, guild_id: int, calls: int):
+    row_conn = sqlite3.connect(db_path)
+    row_conn.row_factory = sqlite3.Row
+    tuple_conn = sqlite3.connect(db_path)
+
+    def with_rows():
+        rows = row_conn.execute(_SQL_LOAD_VOICE_STATS, (guild_id,)).fetchall()
+        return {row["user_id"]: row["total_seconds"] for row in rows}
+
+    def with_tuples():
+        return dict(tuple_conn.execute(_SQL_LOAD_VOICE_STATS, (guild_id,)).fetchall())
+
+    assert with_rows() == with_tuples()
+    before = _per_call_us(with_rows, calls)
+    after = _per_call_us(with_tuples, calls)
+    row_conn.close()
+    tuple_conn.close()
+    return before, after
+
+
+def bench_json(calls: int):
+    value = {"enabled": True, "type": "custom", "message": "Chào mừng {user} đã vào kênh"}
+    before = _per_call_us(lambda: json.dumps(value, ensure_ascii=False), calls)
+    after = _per_call_us(lambda: _json_dumps(value), calls)
+    return before, after
+
+
+def bench_storage_loads(storage: SQLiteStorage, guild_id: int, calls: int) -> dict:
+    loads = {
+        "load_voice_stats": lambda: storage._call(storage._load_voice_stats(guild_id)),
+        "load_competitors": lambda: storage._call(storage._load_competitors(guild_id)),
+        "load_tracked_channels": lambda: storage._call(storage._load_tracked_channels(guild_id)),
+        "get_balance": lambda: storage.get_balance(guild_id, 1),
+    }
+    return {name: _per_call_us(fn, calls) for name, fn in loads.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200, help="users per guild")
+    parser.add_argument("--calls", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+
+    guild_id = 1
+    with tempfile.TemporaryDirectory() as base_dir:
+        storage = SQLiteStorage(base_dir)
+        try:
+            storage.save_voice_stats(guild_id, {str(user): float(user) for user in range(args.rows)})
+            storage.save_competitors(guild_id, {str(user): 900 + user for user in range(args.rows)})
+            for channel_id in range(20):
+                storage.add_tracked_channel(guild_id, channel_id)
+            storage.add_coins(guild_id, 1, 10.0)
+
+            before, after = bench_row_decoding(storage.db_path, guild_id, args.calls)
+            print(f"voice_stats decode ({args.rows} rows): Row+dict {before:8.1f} us  tuples {after:8.1f} us")
+            before, after = bench_json(args.calls * 10)
+            print(f"JSON encode:                  json.dumps {before:8.2f} us  shared {after:8.2f} us")
+            for name, cost in bench_storage_loads(storage, guild_id, args.calls).items():
+                print(f"{name:<30}{cost:8.1f} us/call (storage thread round trip)")
+        finally:
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
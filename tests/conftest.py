@@ -12,6 +12,7 @@ class MockStorage:
 
     def __init__(self):
         self.data = {}
+        self.open_sessions = {}  # {(guild_id, user_id): (channel_id, started_at, checkpoint_at)}
 
     def _guild_key(self, guild_id: int, table: str):
         return (guild_id, table)
@@ -22,6 +23,12 @@ class MockStorage:
     def _set(self, guild_id: int, table: str, value):
         self.data[self._guild_key(guild_id, table)] = value
 
+    def flush(self):
+        pass
+
+    def profile_snapshot(self) -> dict:
+        return {"calls": {}, "statements": {}, "slow_queries": []}
+
     def ensure_guild_initialized(self, guild_id: int, guild_dir: str, default_config: dict):
         key = self._guild_key(guild_id, "guild_config")
         if key not in self.data:
@@ -36,9 +43,103 @@ class MockStorage:
     def load_voice_stats(self, guild_id: int):
         return dict(self._get(guild_id, "voice_stats", {}))
 
+    async def aload_voice_stats(self, guild_id: int):
+        return self.load_voice_stats(guild_id)
+
     def save_voice_stats(self, guild_id: int, data: dict):
         self._set(guild_id, "voice_stats", dict(data))
 
+    def add_voice_seconds(self, guild_id: int, user_id, delta: float) -> float:
+        stats = self._get(guild_id, "voice_stats", {})
+        uid = int(user_id)
+        stats[uid] = stats.get(uid, 0) + delta
+        self._set(guild_id, "voice_stats", stats)
+        return stats[uid]
+
+    def apply_voice_checkpoint(self, guild_id: int, seconds_items: list, coin_items: list, sessions: list = ()):
+        for user_id, delta in seconds_items:
+            self.add_voice_seconds(guild_id, user_id, delta)
+        self.add_coins_many(guild_id, coin_items)
+        self._log_voice_sessions(guild_id, sessions)
+        for user_id, channel_id, started_at, ended_at in sessions:
+            previous = self.open_sessions.get((guild_id, int(user_id)))
+            start = previous[1] if previous else started_at
+            self.open_sessions[(guild_id, int(user_id))] = (channel_id, start, ended_at)
+
+    def _log_voice_sessions(self, guild_id: int, sessions: list):
+        log = self._get(guild_id, "voice_sessions", [])
+        log.extend((int(user_id), channel_id, start, end) for user_id, channel_id, start, end in sessions)
+        self._set(guild_id, "voice_sessions", log)
+
+    def open_voice_session(self, guild_id: int, user_id, channel_id, started_at: float):
+        self.open_sessions[(guild_id, int(user_id))] = (channel_id, started_at, started_at)
+
+    async def aopen_voice_session(self, guild_id: int, user_id, channel_id, started_at: float):
+        self.open_voice_session(guild_id, user_id, channel_id, started_at)
+
+    def record_voice_leave(self, guild_id: int, user_id, seconds: float, coins: float, session: tuple,
+                           next_channel_id=None) -> float:
+        total_seconds = self.add_voice_seconds(guild_id, user_id, seconds)
+        self._log_voice_sessions(guild_id, [(user_id, *session)])
+        self.open_sessions.pop((guild_id, int(user_id)), None)
+        if next_channel_id is not None:
+            self.open_voice_session(guild_id, user_id, next_channel_id, session[2])
+        self.add_coins(guild_id, user_id, coins)
+        return total_seconds
+
+    async def arecord_voice_leave(self, guild_id: int, user_id, seconds: float, coins: float, session: tuple,
+                                  next_channel_id=None) -> float:
+        return self.record_voice_leave(guild_id, user_id, seconds, coins, session, next_channel_id)
+
+    def load_open_voice_sessions(self) -> dict:
+        result = {}
+        for (guild_id, user_id), session in self.open_sessions.items():
+            result.setdefault(guild_id, {})[user_id] = session
+        return result
+
+    async def aload_open_voice_sessions(self) -> dict:
+        return self.load_open_voice_sessions()
+
+    def reconcile_open_voice_sessions(self, resumed: list, closed: list):
+        for guild_id, user_id in closed:
+            self.open_sessions.pop((guild_id, int(user_id)), None)
+        for guild_id, user_id, channel_id, started_at, checkpoint_at in resumed:
+            self.open_sessions[(guild_id, int(user_id))] = (channel_id, started_at, checkpoint_at)
+
+    async def areconcile_open_voice_sessions(self, resumed: list, closed: list):
+        self.reconcile_open_voice_sessions(resumed, closed)
+
+    def rollup_voice_sessions(self) -> int:
+        return 0
+
+    def voice_seconds_between(self, guild_id: int, start_ts: float, end_ts: float) -> dict:
+        totals = {}
+        for user_id, _, start, end in self._get(guild_id, "voice_sessions", []):
+            overlap = min(end, end_ts) - max(start, start_ts)
+            if overlap > 0:
+                totals[user_id] = totals.get(user_id, 0) + overlap
+        return totals
+
+    async def avoice_seconds_between(self, guild_id: int, start_ts: float, end_ts: float) -> dict:
+        return self.voice_seconds_between(guild_id, start_ts, end_ts)
+
+    def voice_peak_hours(self, guild_id: int, start_ts: float, end_ts: float) -> list:
+        return []
+
+    async def avoice_peak_hours(self, guild_id: int, start_ts: float, end_ts: float) -> list:
+        return self.voice_peak_hours(guild_id, start_ts, end_ts)
+
+    def voice_daily_totals(self, guild_id: int, first_day: str, last_day: str) -> dict:
+        return {}
+
+    async def avoice_daily_totals(self, guild_id: int, first_day: str, last_day: str) -> dict:
+        return self.voice_daily_totals(guild_id, first_day, last_day)
+
+    def set_voice_seconds(self, guild_id: int, user_id, seconds: float):
+        stats = self._get(guild_id, "voice_stats", {})
+        stats[int(user_id)] = seconds
+        self._set(guild_id, "voice_stats", stats)
+
     def load_all_time_voice_stats(self, guild_id: int):
         result = dict(self._get(guild_id, "voice_stats", {}))
         archives = self._get(guild_id, "voice_stats_archives", {})
@@ -47,11 +148,30 @@ class MockStorage:
                 result[uid] = result.get(uid, 0) + int(secs or 0)
         return result
 
+    def get_all_time_voice_seconds(self, guild_id: int, user_id) -> float:
+        return self.load_all_time_voice_stats(guild_id).get(int(user_id), 0)
+
+    def rebuild_voice_stats_all_time(self, guild_id: int | None = None) -> int:
+        return len(self.load_all_time_voice_stats(guild_id))
+
+    def rebuild_channel_stats_all_time(self, guild_id: int | None = None) -> int:
+        return 0
+
     def archive_voice_stats(self, guild_id: int, year: int, month: int, stats: dict):
         archives = self._get(guild_id, "voice_stats_archives", {})
         archives[f"{year}-{month:02d}"] = dict(stats)
         self._set(guild_id, "voice_stats_archives", archives)
 
+    def reset_voice_month(self, guild_id: int, year: int, month: int):
+        stats = self._get(guild_id, "voice_stats", {})
+        archives = self._get(guild_id, "voice_stats_archives", {})
+        archive = archives.setdefault(f"{year}-{month:02d}", {})
+        for user_id, seconds in stats.items():
+            if seconds > 0:
+                archive[user_id] = archive.get(user_id, 0) + seconds
+        self._set(guild_id, "voice_stats_archives", archives)
+        self._set(guild_id, "voice_stats", {user_id: 0 for user_id in stats})
+
     def load_voice_stats_archive(self, guild_id: int, year: int, month: int):
         archives = self._get(guild_id, "voice_stats_archives", {})
         return dict(archives.get(f"{year}-{month:02d}", {}))
@@ -59,30 +179,64 @@ class MockStorage:
     def load_competitors(self, guild_id: int):
         return dict(self._get(guild_id, "competitors", {}))
 
+    async def aload_competitors(self, guild_id: int):
+        return self.load_competitors(guild_id)
+
     def save_competitors(self, guild_id: int, data: dict):
         self._set(guild_id, "competitors", dict(data))
 
+    def set_competitor(self, guild_id: int, user_id, channel_id):
+        competitors = self._get(guild_id, "competitors", {})
+        competitors[int(user_id)] = int(channel_id) if channel_id else None
+        self._set(guild_id, "competitors", competitors)
+
+    def delete_competitor(self, guild_id: int, user_id):
+        competitors = self._get(guild_id, "competitors", {})
+        competitors.pop(int(user_id), None)
+        self._set(guild_id, "competitors", competitors)
+
     def load_entry_settings(self, guild_id: int):
         return dict(self._get(guild_id, "entry_settings", {}))
 
+    async def aload_entry_settings(self, guild_id: int):
+        return self.load_entry_settings(guild_id)
+
     def save_entry_settings(self, guild_id: int, data: dict):
         self._set(guild_id, "entry_settings", dict(data))
 
+    def set_entry_setting(self, guild_id: int, user_id, settings: dict):
+        entry_settings = self._get(guild_id, "entry_settings", {})
+        entry_settings[int(user_id)] = dict(settings)
+        self._set(guild_id, "entry_settings", entry_settings)
+
     def load_state(self, guild_id: int):
         return dict(self._get(guild_id, "state", {}))
 
     def save_state(self, guild_id: int, data: dict):
         self._set(guild_id, "state", dict(data))
 
+    def get_guild_state(self, guild_id: int, key: str, default=None):
+        return self._get(guild_id, "state", {}).get(key, default)
+
+    def set_guild_state(self, guild_id: int, key: str, value):
+        state = self._get(guild_id, "state", {})
+        state[key] = value
+        self._set(guild_id, "state", state)
+
     def load_birthdays(self, guild_id: int):
         return dict(self._get(guild_id, "birthdays", {}))
 
     def save_birthdays(self, guild_id: int, data: dict):
         self._set(guild_id, "birthdays", dict(data))
 
+    def set_birthday(self, guild_id: int, user_id, birthday: str):
+        birthdays = self._get(guild_id, "birthdays", {})
+        birthdays[int(user_id)] = birthday
+        self._set(guild_id, "birthdays", birthdays)
+
     def append_chat_history(self, guild_id: int, role: str, entry_json: str, memory_limit: int):
         history = list(self._get(guild_id, "chat_history", []))
-        history.append(entry_json)
+        history.append({"created_at": "", "speaker": role, "content": entry_json})
         if len(history) > memory_limit:
             history = history[-memory_limit:]
         self._set(guild_id, "chat_history", history)
@@ -124,6 +278,10 @@ class MockStorage:
         self._set(guild_id, "economy_accounts", accounts)
         return accounts[user_id]
 
+    def add_coins_many(self, guild_id: int, items: list):
+        for user_id, amount in items:
+            self.add_coins(guild_id, user_id, amount)
+
     def spend_coins(self, guild_id: int, user_id: int, amount: float) -> bool:
         balance = self.get_balance(guild_id, user_id)
         if balance < amount:
@@ -131,6 +289,21 @@ class MockStorage:
         self.add_coins(guild_id, user_id, -amount)
         return True
 
+    def transfer(self, guild_id: int, from_user_id: int, to_user_id: int, amount: float, tax: float = 0):
+        if not self.spend_coins(guild_id, from_user_id, amount + tax):
+            return None
+        self.add_coins(guild_id, to_user_id, amount)
+        return self.get_balance(guild_id, from_user_id)
+
+    def purchase(self, guild_id: int, user_id: int, price: float, month: str, ptype: str, value: float,
+                 voice_seconds: float = 0):
+        if not self.spend_coins(guild_id, user_id, price):
+            return None
+        self.save_purchase(guild_id, {"user_id": user_id, "month": month, "type": ptype, "value": value})
+        if voice_seconds:
+            self.add_voice_seconds(guild_id, user_id, voice_seconds)
+        return self.get_balance(guild_id, user_id)
+
 # Test guild ID constant used across all tests
 TEST_GUILD_ID = 999888777666555
 
@@ -217,6 +390,8 @@ def mock_config():
     mock_guild_config.get_general_channel_id = MagicMock(return_value=234567)
     mock_guild_config.get_rank_category_id = MagicMock(return_value=345678)
     mock_guild_config.get_rank_role_ids = MagicMock(return_value=[1001, 1002, 1003, 1004, 1005, 1006, 1007, 1008, 1009])
+    mock_guild_config.get_rank_thresholds = MagicMock(return_value=None)
+    mock_guild_config.version = 0
     
     config.get_guild_config = MagicMock(return_value=mock_guild_config)
     config.get_storage = MagicMock(return_value=MockStorage())
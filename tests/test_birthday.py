@@ -36,14 +36,14 @@ class TestBirthdayFeature:
     
     def test_load_birthdays_with_data(self, birthday_feature):
         """Test loading saved birthdays."""
-        test_data = {"123456": "25/12", "789012": "01/01"}
+        test_data = {123456: "25/12", 789012: "01/01"}
         birthday_feature.save_birthdays(TEST_GUILD_ID, test_data)
         result = birthday_feature.load_birthdays(TEST_GUILD_ID)
         assert result == test_data
     
     def test_save_birthdays(self, birthday_feature):
         """Test saving birthdays via storage."""
-        test_data = {"123456": "25/12"}
+        test_data = {123456: "25/12"}
         birthday_feature.save_birthdays(TEST_GUILD_ID, test_data)
         result = birthday_feature.load_birthdays(TEST_GUILD_ID)
         assert result == test_data
@@ -73,7 +73,7 @@ class TestBirthdayFeature:
         mock_interaction.user.guild_permissions.administrator = True
         
         with patch.object(birthday_feature, 'load_birthdays', return_value={}):
-            with patch.object(birthday_feature, 'save_birthdays') as mock_save:
+            with patch.object(birthday_feature, 'set_birthday') as mock_set:
                 await birthday_feature.birthday_cmd.callback(
                     birthday_feature,
                     mock_interaction,
@@ -82,14 +82,8 @@ class TestBirthdayFeature:
                     date="25/12"
                 )
                 
-                # Verify guild_id and user ID
-                mock_save.assert_called_once()
-                # First argument should be guild_id
-                assert mock_save.call_args[0][0] == TEST_GUILD_ID
-                # Second argument is the data dict
-                saved_data = mock_save.call_args[0][1]
-                assert str(mock_member.id) in saved_data
-                assert saved_data[str(mock_member.id)] == "25/12"
+                # Verify a single-row write for guild_id and user ID
+                mock_set.assert_called_once_with(TEST_GUILD_ID, mock_member.id, "25/12")
                 
                 # Should send success message
                 mock_interaction.response.send_message.assert_called_once()
@@ -118,7 +112,7 @@ class TestBirthdayFeature:
     async def test_birthday_cmd_list_with_data(self, birthday_feature, mock_interaction, mock_bot):
         """Test /birthday list with existing birthdays."""
         mock_interaction.user.guild_permissions.administrator = True
-        test_birthdays = {"123456": "25/12", "789012": "01/01"}
+        test_birthdays = {123456: "25/12", 789012: "01/01"}
         
         # Mock fetch_user to return member objects
         mock_user1 = MagicMock()
@@ -208,7 +202,7 @@ class TestBirthdayFeature:
         mock_user.display_name = "User"
         birthday_feature.bot.fetch_user = AsyncMock(return_value=mock_user)
         
-        test_birthdays = {"123456": today_str}
+        test_birthdays = {123456: today_str}
         
         guild_config = mock_config.get_guild_config(TEST_GUILD_ID)
         guild_config.get_birthday_channel_ids.return_value = [123456]
@@ -233,7 +227,7 @@ class TestBirthdayFeature:
         mock_now = datetime(2026, 3, 12, 0, 0, 0, tzinfo=mock_config.VIETNAM_TZ)
         
         # Setup birthday for today
-        test_birthdays = {"123456": "12/03"}
+        test_birthdays = {123456: "12/03"}
         
         # Mock guild
         mock_guild = MagicMock()
@@ -0,0 +1,121 @@
+"""
+Unit tests for the Discord edit planner and scheduler.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import discord
+import pytest
+
+from core.edit_scheduler import EditScheduler, TokenBucket, plan_channel_edits
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.mark.unit
+class TestEditScheduler:
+    def test_plan_channel_edits_only_emits_changes(self):
+        """Unchanged channels produce no edits; moves and renames are combined per channel."""
+        current = {1: ("🥇 A: 10h", 0), 2: ("🥈 B: 5h", 1), 3: ("🥉 C: 1h", 2)}
+        assert plan_channel_edits([(1, "🥇 A: 10h"), (2, "🥈 B: 5h"), (3, "🥉 C: 1h")], current) == []
+        assert plan_channel_edits([(1, "🥇 A: 11h"), (3, "🥈 C: 6h"), (2, "🥉 B: 5h")], current) == [
+            (1, {"name": "🥇 A: 11h"}),
+            (3, {"name": "🥈 C: 6h", "position": 1}),
+            (2, {"name": "🥉 B: 5h", "position": 2}),
+        ]
+        assert plan_channel_edits([(4, "#4 D: 0h")], {}) == [(4, {"name": "#4 D: 0h", "position": 0})]
+
+    def test_token_bucket_refills_and_pauses(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, 10.0, clock=clock)
+        bucket.take()
+        bucket.take()
+        assert bucket.delay() == pytest.approx(5.0)
+        clock.now = 5.0
+        assert bucket.delay() == 0.0
+        bucket.pause(30.0)
+        assert bucket.delay() == pytest.approx(30.0)
+
+    @pytest.mark.asyncio
+    async def test_run_waits_for_bucket_and_honours_retry_after(self):
+        """Edits are paced by the guild bucket and a 429 pauses for the server's retry_after."""
+        clock = FakeClock()
+        scheduler = EditScheduler(guild_rate=(1, 2.0), route_limits={}, clock=clock)
+        edit = AsyncMock(side_effect=[None, discord.RateLimited(7.0), None])
+
+        with patch("core.edit_scheduler.asyncio.sleep", side_effect=clock.sleep):
+            assert await scheduler.run(1, edit)
+            assert await scheduler.run(1, edit)
+            # A different guild has its own budget
+            assert await scheduler.run(2, AsyncMock())
+
+        assert edit.await_count == 3
+        assert clock.now == pytest.approx(2.0 + 7.0)
+
+    @pytest.mark.asyncio
+    async def test_run_defers_edits_past_max_wait_and_drops_other_errors(self):
+        clock = FakeClock()
+        scheduler = EditScheduler(route_limits={"channel_rename": (1, 600.0)}, max_wait=60.0, clock=clock)
+        edit = AsyncMock()
+
+        with patch("core.edit_scheduler.asyncio.sleep", side_effect=clock.sleep):
+            assert await scheduler.run(1, edit, route="channel_rename", route_key=5)
+            assert not await scheduler.run(1, edit, route="channel_rename", route_key=5)
+            assert await scheduler.run(1, edit, route="channel_rename", route_key=6)
+            failing = AsyncMock(side_effect=discord.HTTPException(MagicMock(status=403), "Missing Permissions"))
+            assert not await scheduler.run(1, failing)
+
+        assert edit.await_count == 2
+        assert failing.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_member_edits_have_their_own_budget(self):
+        """Role edits neither spend nor wait on the guild's channel budget."""
+        clock = FakeClock()
+        scheduler = EditScheduler(guild_rate=(1, 10.0), member_rate=(2, 10.0), route_limits={}, clock=clock)
+        edit = AsyncMock()
+
+        with patch("core.edit_scheduler.asyncio.sleep", side_effect=clock.sleep):
+            assert await scheduler.run(1, edit)
+            assert await scheduler.run(1, edit, members=True)
+            assert await scheduler.run(1, edit, members=True)
+            assert clock.now == 0.0
+            assert await scheduler.run(1, edit, members=True)
+
+        assert edit.await_count == 4
+        assert clock.now == pytest.approx(5.0)
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_scope_decides_which_buckets_pause(self):
+        """A route-scoped 429 pauses its route, a shared one the whole edit, a global one every guild."""
+        clock = FakeClock()
+        scheduler = EditScheduler(guild_rate=(10, 10.0), route_limits={"channel_rename": (10, 10.0)},
+                                  max_retries=1, clock=clock)
+
+        def limited(scope):
+            response = MagicMock(status=429, headers={"Retry-After": "5", "X-RateLimit-Scope": scope})
+            return AsyncMock(side_effect=discord.HTTPException(response, "You are being rate limited."))
+
+        def delays():
+            return {key: bucket.delay() for key, bucket in scheduler.buckets.items()}
+
+        assert await scheduler.run(2, AsyncMock())
+        assert not await scheduler.run(1, limited("user"), route="channel_rename", route_key=5)
+        assert delays() == {("guild", 2): 0.0, ("guild", 1): 0.0, ("channel_rename", 5): 5.0}
+
+        clock.now = 10.0
+        assert not await scheduler.run(1, limited("shared"), route="channel_rename", route_key=6)
+        assert delays() == {("guild", 2): 0.0, ("guild", 1): 5.0, ("channel_rename", 5): 0.0, ("channel_rename", 6): 5.0}
+
+        clock.now = 20.0
+        assert not await scheduler.run(1, limited("global"))
+        assert set(delays().values()) == {5.0}
@@ -56,3 +56,23 @@ class TestGuildConfig:
         assert cfg.get_general_channel_id() == 222
         assert cfg.get_rank_category_id() == 333
         assert len(cfg.get_rank_role_ids()) == 9
+
+    def test_rank_thresholds_validate_and_bump_version(self, tmp_path, monkeypatch):
+        """Custom rank thresholds persist, are validated, and bump the config version."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("BEANIE_BASE_DIR", str(tmp_path))
+
+        guild_config = GuildConfigManager().get_guild_config(999002)
+        assert guild_config.get_rank_thresholds() is None
+        version = guild_config.version
+
+        guild_config.set_rank_thresholds([0, 10, 20, 30, 40, 50, 60, 70, 80])
+        assert guild_config.get_rank_thresholds() == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0]
+        assert guild_config.version > version
+
+        for bad in ([0, 10], [5, 10, 20, 30, 40, 50, 60, 70, 80], [0, 10, 10, 30, 40, 50, 60, 70, 80]):
+            with pytest.raises(ValueError):
+                guild_config.set_rank_thresholds(bad)
+
+        guild_config.set_rank_thresholds(None)
+        assert guild_config.get_rank_thresholds() is None
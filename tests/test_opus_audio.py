@@ -0,0 +1,89 @@
+"""
+Unit tests for pre-transcoded Opus playback.
+"""
+
+import os
+import struct
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.opus_audio import (
+    OpusPacketSource,
+    ensure_opus,
+    opus_path_for,
+    transcode_to_opus,
+    write_packet_file,
+)
+
+
+def _ogg(packets):
+    """Single-page Ogg stream holding short (<255 byte) packets."""
+    header = struct.pack("<BBQIIIB", 0, 2, 0, 1, 0, 0, len(packets))
+    return b"OggS" + header + bytes(len(p) for p in packets) + b"".join(packets)
+
+
+def _ffmpeg_result(packets, returncode=0):
+    return MagicMock(returncode=returncode, stdout=_ogg(packets), stderr=b"boom")
+
+
+@pytest.mark.unit
+class TestOpusAudio:
+    def test_packet_file_round_trip(self, tmp_path):
+        path = str(tmp_path / "clip.opuspk")
+        packets = [b"\x01" * 10, b"\x02" * 300, b"\x03"]
+        assert write_packet_file(packets, path) == 3
+
+        source = OpusPacketSource(path)
+        assert source.is_opus()
+        assert [source.read() for _ in range(4)] == packets + [b""]
+        source.cleanup()
+        assert source.read() == b""
+
+    def test_rejects_non_packet_files(self, tmp_path):
+        path = tmp_path / "clip.mp3"
+        path.write_bytes(b"ID3 not opus")
+        with pytest.raises(ValueError):
+            OpusPacketSource(str(path))
+
+    def test_transcode_drops_ogg_headers(self, tmp_path):
+        source = tmp_path / "custom_1.mp3"
+        source.write_bytes(b"mp3")
+        result = _ffmpeg_result([b"OpusHead\x01", b"OpusTags", b"frame1", b"frame2"])
+
+        with patch("core.opus_audio.subprocess.run", return_value=result) as run:
+            dest = transcode_to_opus(str(source), executable="ffmpeg-bin")
+
+        assert dest == opus_path_for(str(source))
+        assert run.call_args.args[0][:3] == ["ffmpeg-bin", "-i", str(source)]
+        packet_source = OpusPacketSource(dest)
+        assert [packet_source.read() for _ in range(3)] == [b"frame1", b"frame2", b""]
+        packet_source.cleanup()
+
+    def test_transcode_failure_leaves_no_packet_file(self, tmp_path):
+        source = tmp_path / "custom_1.ogg"
+        source.write_bytes(b"ogg")
+
+        with patch("core.opus_audio.subprocess.run", return_value=_ffmpeg_result([], returncode=1)):
+            with pytest.raises(RuntimeError):
+                transcode_to_opus(str(source))
+        with patch("core.opus_audio.subprocess.run", return_value=_ffmpeg_result([b"OpusHead"])):
+            with pytest.raises(RuntimeError):
+                transcode_to_opus(str(source))
+
+        assert os.listdir(tmp_path) == ["custom_1.ogg"]
+
+    def test_ensure_opus_transcodes_once_until_source_changes(self, tmp_path):
+        source = tmp_path / "custom_1.mp3"
+        source.write_bytes(b"mp3")
+
+        with patch("core.opus_audio.subprocess.run", return_value=_ffmpeg_result([b"frame"])) as run:
+            dest = ensure_opus(str(source))
+            ensure_opus(str(source))
+            assert run.call_count == 1
+
+            # A re-upload makes the packet file stale
+            mtime = os.path.getmtime(dest)
+            os.utime(source, (mtime + 10, mtime + 10))
+            ensure_opus(str(source))
+            assert run.call_count == 2
@@ -22,8 +22,118 @@ class TestSQLiteStorage:
 
         history = storage.load_chat_history(guild_id)
         assert len(history) == 2
-        assert history[0].endswith("u2: two")
-        assert history[1].endswith("u3: three")
+        assert [(row["speaker"], row["content"]) for row in history] == [("u2", "two"), ("u3", "three")]
+
+    def test_chat_history_ring_wraps_and_resizes(self, tmp_path):
+        """Appends overwrite the oldest slot; a smaller limit keeps only the newest rows."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 987000111
+            for i in range(7):
+                storage.append_chat_history(guild_id, "u", str(i), 3)
+            assert [row["content"] for row in storage.load_chat_history(guild_id)] == ["4", "5", "6"]
+            assert [row["content"] for row in storage.load_chat_history(guild_id, limit=2)] == ["5", "6"]
+
+            storage.append_chat_history(guild_id, "u", "7", 2)
+            assert [row["content"] for row in storage.load_chat_history(guild_id)] == ["6", "7"]
+
+            storage.append_chat_history(guild_id, "u", "8", 4)
+            storage.append_chat_history(guild_id, "u", "9", 4)
+            assert [row["content"] for row in storage.load_chat_history(guild_id)] == ["6", "7", "8", "9"]
+        finally:
+            storage.close()
+
+    def test_legacy_chat_history_is_migrated_into_ring(self, tmp_path):
+        """Rows in the old chat_history table survive the move to the ring table."""
+        import sqlite3
+
+        from core.storage import SQLiteStorage
+
+        db_dir = tmp_path / "data"
+        db_dir.mkdir()
+        conn = sqlite3.connect(db_dir / "beanie.sqlite3")
+        conn.execute(
+            "CREATE TABLE chat_history (id INTEGER PRIMARY KEY AUTOINCREMENT, guild_id INTEGER NOT NULL, "
+            "created_at TEXT NOT NULL, speaker TEXT NOT NULL, content TEXT NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO chat_history (guild_id, created_at, speaker, content) VALUES (?, ?, ?, ?)",
+            [(1, "t", "u", str(i)) for i in range(4)],
+        )
+        conn.commit()
+        conn.close()
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            assert [row["content"] for row in storage.load_chat_history(1)] == ["0", "1", "2", "3"]
+            storage.append_chat_history(1, "u", "4", 3)
+            assert [row["content"] for row in storage.load_chat_history(1)] == ["2", "3", "4"]
+        finally:
+            storage.close()
+
+    def test_versioned_migrations_upgrade_old_schema(self, tmp_path):
+        """An old database loses redundant indexes and is rebuilt WITHOUT ROWID, keeping its rows."""
+        import sqlite3
+
+        from core.storage import SQLiteStorage
+
+        db_dir = tmp_path / "data"
+        db_dir.mkdir()
+        db_path = db_dir / "beanie.sqlite3"
+        conn = sqlite3.connect(db_path)
+        conn.executescript(
+            """
+            CREATE TABLE guild_config (
+                guild_id INTEGER PRIMARY KEY, birthday_channel_id INTEGER, rank_category_id INTEGER,
+                general_channel_id INTEGER, auto_shutdown_channel_id INTEGER,
+                rank_role_ids_json TEXT NOT NULL, features_json TEXT NOT NULL
+            );
+            CREATE TABLE voice_stats (
+                guild_id INTEGER NOT NULL, user_id TEXT NOT NULL, total_seconds REAL NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            );
+            CREATE TABLE competitors (
+                guild_id INTEGER NOT NULL, user_id TEXT NOT NULL, channel_id INTEGER,
+                PRIMARY KEY (guild_id, user_id)
+            );
+            CREATE INDEX idx_voice_stats_guild_user ON voice_stats(guild_id, user_id);
+            CREATE INDEX idx_competitors_guild_user ON competitors(guild_id, user_id);
+            INSERT INTO voice_stats VALUES (1, '42', 120.0);
+            INSERT INTO competitors VALUES (1, '42', 900);
+            """
+        )
+        conn.commit()
+        conn.close()
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            assert storage.schema_version() == SQLiteStorage._MIGRATIONS[-1][0]
+            assert storage.load_voice_stats(1) == {42: 120.0}
+            assert storage.load_all_time_voice_stats(1) == {42: 120.0}
+            storage.add_voice_seconds(1, 42, 30.0)
+            assert storage.load_all_time_voice_stats(1) == {42: 150.0}
+            assert storage.load_competitors(1) == {42: 900}
+        finally:
+            storage.close()
+
+        conn = sqlite3.connect(db_path)
+        try:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            assert "idx_voice_stats_guild_user" not in indexes
+            assert "idx_competitors_guild_user" not in indexes
+            assert "idx_economy_accounts_leaderboard" in indexes
+            for table in ("voice_stats", "competitors"):
+                sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+                assert sql.rstrip().endswith("WITHOUT ROWID")
+                user_id_type = [row[2] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] == "user_id"]
+                assert user_id_type == ["INTEGER"]
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(guild_config)")]
+            assert "patch_notes_channel_id" in columns
+            assert "rank_thresholds_json" in columns
+        finally:
+            conn.close()
 
     def test_load_voice_stats_archive_roundtrip(self, tmp_path, monkeypatch):
         """Test load_voice_stats_archive returns what was stored."""
@@ -34,11 +144,537 @@ class TestSQLiteStorage:
         GuildConfig(guild_id)
         storage = get_storage(str(tmp_path))
 
-        storage.archive_voice_stats(guild_id, 2026, 3, {"42": 3600.0, "99": 7200.0})
+        storage.archive_voice_stats(guild_id, 2026, 3, {42: 3600.0, 99: 7200.0})
         archived = storage.load_voice_stats_archive(guild_id, 2026, 3)
 
-        assert archived == {"42": 3600.0, "99": 7200.0}
+        assert archived == {42: 3600.0, 99: 7200.0}
 
         # Non-existent archive returns empty dict
         missing = storage.load_voice_stats_archive(guild_id, 2025, 1)
-        assert missing == {}
\ No newline at end of file
+        assert missing == {}
+
+    def test_row_level_upserts_touch_single_rows(self, tmp_path, monkeypatch):
+        """Row-level setters update one row and leave the rest of the table alone."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("BEANIE_BASE_DIR", str(tmp_path))
+
+        guild_id = 222333444
+        GuildConfig(guild_id)
+        storage = get_storage(str(tmp_path))
+
+        storage.save_voice_stats(guild_id, {1: 100.0, 2: 200.0})
+        assert storage.add_voice_seconds(guild_id, 1, 50.0) == 150.0
+        assert storage.add_voice_seconds(guild_id, 3, 0) == 0
+        storage.set_voice_seconds(guild_id, 2, 10.0)
+        assert storage.load_voice_stats(guild_id) == {1: 150.0, 2: 10.0, 3: 0.0}
+
+        storage.set_competitor(guild_id, 1, 900)
+        storage.set_competitor(guild_id, 2, 901)
+        storage.delete_competitor(guild_id, 1)
+        assert storage.load_competitors(guild_id) == {2: 901}
+
+        storage.set_entry_setting(guild_id, 1, {"enabled": False, "type": "default"})
+        assert storage.load_entry_settings(guild_id) == {1: {"enabled": False, "type": "default"}}
+
+        storage.set_birthday(guild_id, 1, "25/12")
+        storage.set_birthday(guild_id, 1, "01/01")
+        assert storage.load_birthdays(guild_id) == {1: "01/01"}
+
+        storage.set_guild_state(guild_id, "last_reset_month", 3)
+        storage.set_guild_state(guild_id, "last_reset_month", 4)
+        assert storage.get_guild_state(guild_id, "last_reset_month") == 4
+
+    def test_hot_table_cache_serves_reads_and_invalidates_on_write(self, tmp_path):
+        """Repeat loads hit memory; writes invalidate so the next load sees them."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 333444555
+            storage.set_competitor(guild_id, 1, 900)
+            assert storage.load_competitors(guild_id) == {1: 900}
+            assert storage.load_competitors(guild_id) == {1: 900}
+            assert storage.cache_stats()["hits"] == 1
+
+            # Mutating a returned value must not leak into the cache.
+            storage.load_competitors(guild_id)[2] = 901
+            assert storage.load_competitors(guild_id) == {1: 900}
+
+            storage.delete_competitor(guild_id, 1)
+            assert storage.load_competitors(guild_id) == {}
+            assert storage.cache_stats()["invalidations"] == 1
+
+            # Voice totals are updated in place rather than dropped.
+            storage.save_voice_stats(guild_id, {1: 10.0})
+            assert storage.load_voice_stats(guild_id) == {1: 10.0}
+            storage.add_voice_seconds(guild_id, 1, 5.0)
+            hits = storage.cache_stats()["hits"]
+            assert storage.load_voice_stats(guild_id) == {1: 15.0}
+            assert storage.cache_stats()["hits"] == hits + 1
+
+            storage.add_tracked_channel(guild_id, 42)
+            assert storage.load_tracked_channels(guild_id) == [42]
+            storage.remove_tracked_channel(guild_id, 42)
+            assert storage.load_tracked_channels(guild_id) == []
+        finally:
+            storage.close()
+
+    def test_all_time_voice_totals_follow_current_and_archive(self, tmp_path):
+        """voice_stats_all_time always equals current month plus archives, across a reset."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 666777888
+            storage.save_voice_stats(guild_id, {1: 100.0, 2: 50.0})
+            storage.add_voice_seconds(guild_id, 1, 20.0)
+            storage.set_voice_seconds(guild_id, 2, 60.0)
+            assert storage.load_all_time_voice_stats(guild_id) == {1: 120.0, 2: 60.0}
+
+            # Monthly reset: archive then zero the current month in one transaction.
+            storage.reset_voice_month(guild_id, 2026, 3)
+            assert storage.load_voice_stats(guild_id) == {1: 0.0, 2: 0.0}
+            assert storage.load_voice_stats_archive(guild_id, 2026, 3) == {1: 120.0, 2: 60.0}
+            storage.add_voice_seconds(guild_id, 1, 5.0)
+            assert storage.load_all_time_voice_stats(guild_id) == {1: 125.0, 2: 60.0}
+            assert storage.get_all_time_voice_seconds(guild_id, 1) == 125.0
+
+            # A second reset in the same month adds only the time counted since.
+            storage.reset_voice_month(guild_id, 2026, 3)
+            assert storage.load_voice_stats_archive(guild_id, 2026, 3) == {1: 125.0, 2: 60.0}
+            assert storage.get_all_time_voice_seconds(guild_id, 1) == 125.0
+
+            # Re-archiving the same month replaces, rather than doubles, its totals.
+            storage.archive_voice_stats(guild_id, 2026, 3, {1: 125.0, 2: 60.0})
+            assert storage.get_all_time_voice_seconds(guild_id, 1) == 125.0
+
+            storage._call(storage._conn.execute("DELETE FROM voice_stats_all_time"))
+            assert storage.rebuild_voice_stats_all_time(guild_id) == 2
+            assert storage.load_all_time_voice_stats(guild_id) == {1: 125.0, 2: 60.0}
+        finally:
+            storage.close()
+
+    def test_channel_all_time_rollup_and_bulk_reads(self, tmp_path):
+        """Channel all-time totals survive archive + reset and come back in one bulk read."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 777888999
+            storage.add_tracked_channel(guild_id, 10)
+            storage.add_tracked_channel(guild_id, 20)
+            storage.add_to_channel_stats(guild_id, 10, "2026-03", 100.0)
+            storage.add_to_channel_stats(guild_id, 10, "2026-03", 50.0)
+            assert storage.load_channel_voice_stats_bulk(guild_id, "2026-03") == {10: 150.0, 20: 0}
+
+            storage.archive_channel_stats(guild_id, 2026, 3, 10, 150.0)
+            storage.reset_channel_stats_for_period(guild_id, "2026-03")
+            storage.add_to_channel_stats(guild_id, 10, "2026-04", 25.0)
+            storage.save_channel_voice_stats(guild_id, 20, "2026-04", 40.0)
+
+            assert storage.load_all_time_channel_stats(guild_id, 10) == 175.0
+            assert storage.load_all_time_channel_stats_bulk(guild_id) == {10: 175.0, 20: 40.0}
+
+            storage._call(storage._conn.execute("DELETE FROM channel_voice_stats_all_time"))
+            assert storage.rebuild_channel_stats_all_time(guild_id) == 2
+            assert storage.load_all_time_channel_stats_bulk(guild_id) == {10: 175.0, 20: 40.0}
+        finally:
+            storage.close()
+
+    def test_coin_ledger_operations_are_atomic(self, tmp_path):
+        """Spends never overdraw, and transfer/purchase apply all of their writes or none."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 888999000
+            assert storage.add_coins(guild_id, 1, 100.0) == 100.0
+            assert storage.spend_coins(guild_id, 1, 150.0) is False
+            assert storage.spend_coins(guild_id, 1, 40.0) is True
+            assert storage.get_balance(guild_id, 1) == 60.0
+
+            assert storage.transfer(guild_id, 1, 2, 50.0, tax=20.0) is None
+            assert storage.transfer(guild_id, 1, 2, 50.0, tax=5.0) == 5.0
+            assert storage.get_balance(guild_id, 2) == 50.0
+
+            assert storage.purchase(guild_id, 2, 80.0, "2026-03", "hours", 1, voice_seconds=3600) is None
+            assert storage.get_purchase(guild_id, 2, "2026-03", "hours") == 0
+            assert storage.purchase(guild_id, 2, 30.0, "2026-03", "hours", 1, voice_seconds=3600) == 20.0
+            assert storage.get_purchase(guild_id, 2, "2026-03", "hours") == 1
+            assert storage.load_voice_stats(guild_id) == {2: 3600.0}
+        finally:
+            storage.close()
+
+    def test_voice_checkpoint_applies_seconds_and_coins_together(self, tmp_path):
+        """One checkpoint call credits every user's seconds and coins."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 121212121
+            storage.save_voice_stats(guild_id, {1: 100.0})
+            assert storage.load_voice_stats(guild_id) == {1: 100.0}
+
+            storage.apply_voice_checkpoint(guild_id, [(1, 300.0), (2, 600.0)], [(1, 0.5), (2, 1.0)])
+            assert storage.load_voice_stats(guild_id) == {1: 400.0, 2: 600.0}
+            assert storage._call(storage._load_voice_stats(guild_id)) == {1: 400.0, 2: 600.0}
+            assert storage.get_balance(guild_id, 1) == 0.5
+
+            storage.add_coins_many(guild_id, [(1, 1.5), (3, 2.0)])
+            assert storage.get_balance(guild_id, 1) == 2.0
+            assert storage.get_balance(guild_id, 3) == 2.0
+        finally:
+            storage.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_spends_cannot_double_spend(self, tmp_path):
+        """Racing spends against one balance succeed at most as often as funds allow."""
+        import asyncio
+
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 111000222
+            storage.add_coins(guild_id, 1, 100.0)
+            results = await asyncio.gather(*(storage.apurchase(guild_id, 1, 30.0, "2026-03", "xp", 1) for _ in range(10)))
+            assert sum(result is not None for result in results) == 3
+            assert storage.get_balance(guild_id, 1) == 10.0
+            assert storage.get_purchase(guild_id, 1, "2026-03", "xp") == 3
+        finally:
+            storage.close()
+
+    def test_atomic_rollback_keeps_other_coroutines_writes(self, tmp_path):
+        """A failed _atomic block only undoes its own statements; concurrent writes wait and survive."""
+        import asyncio
+
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        guild_id = 515151
+
+        async def failing_block(entered):
+            async with storage._atomic():
+                await storage._credit(guild_id, 1, 10.0)
+                entered.set()
+                await asyncio.sleep(0.05)
+                raise RuntimeError("boom")
+
+        async def race():
+            entered = asyncio.Event()
+            block = asyncio.ensure_future(failing_block(entered))
+            await entered.wait()
+            balance = await storage._add_coins(guild_id, 2, 5.0)
+            with pytest.raises(RuntimeError):
+                await block
+            return balance
+
+        try:
+            assert storage._call(race()) == 5.0
+            assert storage.get_balance(guild_id, 1) == 0.0
+            assert storage.get_balance(guild_id, 2) == 5.0
+        finally:
+            storage.close()
+
+    def test_rank_thresholds_survive_reload(self, tmp_path, monkeypatch):
+        """Per-guild rank thresholds are stored, not just kept on the GuildConfig in memory."""
+        from core.storage import SQLiteStorage
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("BEANIE_BASE_DIR", str(tmp_path))
+        thresholds = [0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0]
+
+        GuildConfig(42).set_rank_thresholds(thresholds)
+        assert GuildConfig(42).get_rank_thresholds() == thresholds
+
+        # A separate connection has no cached copy and reads the stored column
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            assert storage.load_guild_config(42)["rank_thresholds"] == thresholds
+            storage.save_guild_config(42, {**storage.load_guild_config(42), "rank_thresholds": None})
+            assert storage.load_guild_config(42)["rank_thresholds"] is None
+        finally:
+            storage.close()
+
+    @pytest.mark.asyncio
+    async def test_async_api_matches_sync_api(self, tmp_path, monkeypatch):
+        """Awaitable a* methods read and write the same data as the sync shims."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("BEANIE_BASE_DIR", str(tmp_path))
+
+        guild_id = 111222333
+        GuildConfig(guild_id)
+        storage = get_storage(str(tmp_path))
+
+        await storage.asave_voice_stats(guild_id, {42: 120.0})
+        assert await storage.aload_voice_stats(guild_id) == {42: 120.0}
+        assert storage.load_voice_stats(guild_id) == {42: 120.0}
+
+        assert await storage.aadd_coins(guild_id, 42, 5.0) == 5.0
+        assert storage.get_balance(guild_id, 42) == 5.0
+
+    @pytest.mark.asyncio
+    async def test_aclose_stops_the_storage_thread(self, tmp_path):
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        await storage.asave_voice_stats(1, {42: 60.0})
+        await storage.aclose()
+
+        assert not storage._thread.is_alive()
+        assert storage._loop.is_closed() or not storage._loop.is_running()
+
+    def test_group_commit_defers_until_flush(self, tmp_path):
+        """Group commit keeps writes in one open transaction until flush()."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path), group_commit_ms=60_000, group_commit_ops=1000)
+        try:
+            guild_id = 444555666
+            for user_id in range(5):
+                storage.add_coins(guild_id, user_id, 1.0)
+
+            # Reads on the writer connection see the pending writes...
+            assert storage.get_balance(guild_id, 4) == 1.0
+            assert storage._pending_writes == 5
+
+            # ...and flush() commits them all in one go.
+            storage.flush()
+            assert storage._pending_writes == 0
+            assert not storage._call(self._in_transaction(storage))
+        finally:
+            storage.close()
+
+    def test_reads_use_pool_unless_writer_has_pending_writes(self, tmp_path):
+        """Loads go to read-only connections, except while the writer holds uncommitted rows."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path), group_commit_ms=60_000, read_pool_size=2)
+        try:
+            guild_id = 777888999
+            storage.add_coins(guild_id, 1, 5.0)
+            assert storage._call(self._reads_from_writer(storage))
+            assert storage.get_balance(guild_id, 1) == 5.0
+
+            storage.flush()
+            assert not storage._call(self._reads_from_writer(storage))
+            assert storage.get_balance(guild_id, 1) == 5.0
+            assert storage.get_coin_leaderboard(guild_id) == [(1, 5.0)]
+        finally:
+            storage.close()
+
+    def test_profiler_splits_queue_and_exec_and_logs_slow_queries(self, tmp_path):
+        """Every call is timed per method and slow statements keep their query plan."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            storage.reset_profile()
+            storage._profiler.slow_ms = 0.000001
+            storage.save_voice_stats(1, {42: 10.0})
+            storage.load_voice_stats(1)
+
+            snapshot = storage.profile_snapshot()
+            assert snapshot["calls"]["load_voice_stats"]["exec"]["count"] == 1
+            assert snapshot["calls"]["load_voice_stats"]["queue"]["count"] == 1
+            assert sum(snapshot["calls"]["save_voice_stats"]["exec"]["histogram"].values()) == 1
+            assert "COMMIT" in snapshot["statements"]
+            plans = [entry["plan"] for entry in snapshot["slow_queries"] if entry["sql"].startswith("SELECT user_id")]
+            assert plans and any("voice_stats" in detail for detail in plans[-1])
+        finally:
+            storage.close()
+
+    def test_backup_vacuum_and_wal_checkpoint(self, tmp_path, monkeypatch):
+        """Online backups rotate, incremental vacuum shrinks the file and the WAL truncates."""
+        import os
+        import sqlite3
+
+        from core.storage import SQLiteStorage
+
+        monkeypatch.setenv("BEANIE_SQLITE_BACKUP_KEEP", "2")
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 121212
+            storage.archive_voice_stats(guild_id, 2026, 1, {user: float(user) for user in range(1, 20001)})
+
+            backups = [storage.backup()["path"] for _ in range(3)]
+            assert [os.path.basename(path) for path in storage._backup_files()] == [
+                os.path.basename(path) for path in backups[-2:]
+            ]
+            conn = sqlite3.connect(backups[-1])
+            try:
+                assert conn.execute("SELECT COUNT(*) FROM voice_stats_archive").fetchone()[0] == 20000
+                assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+            finally:
+                conn.close()
+
+            storage._call(storage._execute("DELETE FROM voice_stats_archive"))
+            storage._call(storage._commit())
+            size_before = os.path.getsize(storage.db_path)
+            result = storage.incremental_vacuum()
+            assert result["free_pages"] > 0
+            assert os.path.getsize(storage.db_path) < size_before
+
+            storage.add_coins(guild_id, 1, 1.0)
+            result = storage.checkpoint_wal()
+            assert not result["busy"]
+            assert storage._wal_size() == 0
+            assert set(storage.maintenance_stats()) == {"backup", "incremental_vacuum", "wal_checkpoint"}
+        finally:
+            storage.close()
+
+    def test_auto_vacuum_conversion_is_opt_in(self, tmp_path, monkeypatch):
+        """Existing files keep their auto_vacuum mode unless BEANIE_SQLITE_VACUUM_ON_START=1."""
+        import os
+        import sqlite3
+
+        from core.storage import SQLiteStorage
+
+        def legacy_file(root):
+            os.makedirs(root / "data")
+            conn = sqlite3.connect(root / "data" / "beanie.sqlite3")
+            conn.execute("PRAGMA auto_vacuum=NONE")
+            conn.execute("CREATE TABLE legacy (id INTEGER)")
+            conn.commit()
+            conn.close()
+
+        # Already migrated, then opted in on a later start
+        legacy_file(tmp_path / "later")
+        # Opted in while migrating: migration 7 runs the VACUUM itself
+        legacy_file(tmp_path / "upgrade")
+        for root, opt_in, expected in (("later", "0", 0), ("later", "1", 2), ("upgrade", "1", 2)):
+            monkeypatch.setenv("BEANIE_SQLITE_VACUUM_ON_START", opt_in)
+            storage = SQLiteStorage(str(tmp_path / root))
+            try:
+                assert storage._call(storage._fetchone("PRAGMA auto_vacuum"))[0] == expected
+                assert storage.schema_version() == SQLiteStorage._MIGRATIONS[-1][0]
+            finally:
+                storage.close()
+
+    def test_voice_session_rollups_split_hours_days_and_months(self, tmp_path):
+        """Session segments fold into hourly/daily/monthly rollups on Vietnam-time boundaries."""
+        from datetime import datetime, timezone
+
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            guild_id = 131313
+            # 23:30 -> 00:30 Vietnam time across the March/April boundary.
+            start = datetime(2026, 3, 31, 16, 30, tzinfo=timezone.utc).timestamp()
+            storage.apply_voice_checkpoint(guild_id, [(1, 3600.0)], [], [
+                (1, 55, start, start + 3600),
+                (2, 55, start + 1800, start + 2400),
+                (3, 55, start, start),
+            ])
+
+            # Reads only see what the maintenance tick has rolled up so far.
+            assert storage.voice_seconds_between(guild_id, start, start + 7200) == {}
+            assert storage.rollup_voice_sessions() == 2
+            assert storage.rollup_voice_sessions() == 0
+            assert storage.voice_daily_totals(guild_id, "2026-03-31", "2026-04-01") == {
+                "2026-03-31": 1800.0,
+                "2026-04-01": 2400.0,
+            }
+            assert storage.voice_seconds_between(guild_id, start + 1800, start + 5400) == {1: 1800.0, 2: 600.0}
+            assert storage.voice_peak_hours(guild_id, start, start + 7200) == [(0, 2400.0), (23, 1800.0)]
+            # Rollups are additive history; the monthly counter reset leaves them alone.
+            storage.reset_voice_month(guild_id, 2026, 3)
+            assert storage.voice_seconds_between(guild_id, start + 1800, start + 5400) == {1: 1800.0, 2: 600.0}
+        finally:
+            storage.close()
+
+    def test_open_voice_sessions_track_checkpoints_and_reconcile(self, tmp_path):
+        """Open sessions advance with each checkpoint, close on leave and reconcile in bulk."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            storage.open_voice_session(1, 10, 100, 1000.0)
+            storage.open_voice_session(1, 11, 100, 1000.0)
+            storage.open_voice_session(2, 20, 200, 1000.0)
+            storage.apply_voice_checkpoint(1, [(10, 300.0)], [], [(10, 101, 1000.0, 1300.0)])
+            storage.record_voice_leave(1, 11, 200.0, 0.0, (100, 1000.0, 1200.0))
+            assert storage.load_open_voice_sessions() == {
+                1: {10: (101, 1000.0, 1300.0)},
+                2: {20: (200, 1000.0, 1000.0)},
+            }
+
+            storage.reconcile_open_voice_sessions([(1, 12, 100, 1500.0, 1500.0)], [(2, 20)])
+            assert storage.load_open_voice_sessions() == {
+                1: {10: (101, 1000.0, 1300.0), 12: (100, 1500.0, 1500.0)},
+            }
+            storage.rollup_voice_sessions()
+            assert storage.voice_seconds_between(1, 0, 3600) == {10: 300.0, 11: 200.0}
+        finally:
+            storage.close()
+
+    def test_voice_leave_is_all_or_nothing(self, tmp_path, monkeypatch):
+        """A leave credits seconds, closes the session and pays coins in one transaction."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            storage.open_voice_session(1, 10, 100, 1000.0)
+            storage.open_voice_session(1, 11, 100, 1000.0)
+            assert storage.record_voice_leave(1, 10, 600.0, 1.0, (100, 1000.0, 1600.0)) == 600.0
+            assert storage.load_open_voice_sessions() == {1: {11: (100, 1000.0, 1000.0)}}
+            storage.rollup_voice_sessions()
+            assert storage.voice_seconds_between(1, 0, 3600) == {10: 600.0}
+            assert storage.get_balance(1, 10) == 1.0
+
+            # A channel move closes the segment and reopens the session in the new channel
+            storage.open_voice_session(1, 12, 100, 1000.0)
+            assert storage.record_voice_leave(1, 12, 100.0, 0.0, (100, 1000.0, 1100.0), next_channel_id=200) == 100.0
+            assert storage.load_open_voice_sessions()[1][12] == (200, 1100.0, 1100.0)
+
+            async def fail(guild_id, items):
+                raise RuntimeError("disk full")
+
+            monkeypatch.setattr(storage, "_credit_many", fail)
+            with pytest.raises(RuntimeError):
+                storage.record_voice_leave(1, 11, 300.0, 0.5, (100, 1000.0, 1300.0))
+            assert storage.load_voice_stats(1) == {10: 600.0, 12: 100.0}
+            assert storage.load_open_voice_sessions()[1][11] == (100, 1000.0, 1000.0)
+            storage.rollup_voice_sessions()
+            assert storage.voice_seconds_between(1, 0, 3600) == {10: 600.0, 12: 100.0}
+        finally:
+            storage.close()
+
+    def test_failed_writes_leave_rows_and_cache_untouched(self, tmp_path, monkeypatch):
+        """A failing purchase or bulk save rolls back fully and never leaves a stale cached total."""
+        from core.storage import SQLiteStorage
+
+        storage = SQLiteStorage(str(tmp_path))
+        try:
+            storage.add_coins(1, 10, 100.0)
+            storage.add_voice_seconds(1, 10, 60.0)
+            assert storage.load_voice_stats(1) == {10: 60.0}
+
+            increment = storage._increment_voice_seconds
+
+            async def fail_after_increment(guild_id, user_id, delta):
+                await increment(guild_id, user_id, delta)
+                raise RuntimeError("disk full")
+
+            monkeypatch.setattr(storage, "_increment_voice_seconds", fail_after_increment)
+            with pytest.raises(RuntimeError):
+                storage.purchase(1, 10, 30.0, "2026-03", "hours", 1, voice_seconds=3600)
+            assert storage.load_voice_stats(1) == {10: 60.0}
+            assert storage.get_balance(1, 10) == 100.0
+
+            # The DELETE before a failing INSERT batch is rolled back with it
+            with pytest.raises(ValueError):
+                storage.save_voice_stats(1, {"not-a-user": 5.0})
+            assert storage.load_voice_stats(1) == {10: 60.0}
+        finally:
+            storage.close()
+
+    @staticmethod
+    async def _reads_from_writer(storage):
+        async with storage._reader() as conn:
+            return conn is storage._conn
+
+    @staticmethod
+    async def _in_transaction(storage):
+        return storage._conn.in_transaction
@@ -0,0 +1,124 @@
+"""
+Unit tests for the TTS audio cache.
+"""
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from core.opus_audio import opus_path_for
+from core.tts_cache import TTSCache, cache_key
+
+
+class FakeSynth:
+    """Writes ``lang:text`` padded to ``size`` bytes and counts calls."""
+
+    def __init__(self, size=100, delay=0.0):
+        self.size = size
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, text, lang, path):
+        self.calls.append((text, lang))
+        if self.delay:
+            threading.Event().wait(self.delay)
+        with open(path, "wb") as f:
+            f.write(f"{lang}:{text}".encode("utf-8").ljust(self.size, b"."))
+
+
+@pytest.mark.unit
+class TestTTSCache:
+    @pytest.mark.asyncio
+    async def test_miss_then_hit(self, tmp_path):
+        synth = FakeSynth()
+        cache = TTSCache(str(tmp_path), max_bytes=10_000, synthesize=synth)
+
+        first = await cache.get_path("Xin chào Beanie", "vi")
+        second = await cache.get_path("Xin chào Beanie", "vi")
+        path = await cache.get_path("Xin chào Beanie", "vi")
+
+        assert first == second == path
+        with open(path, "rb") as f:
+            assert f.read().startswith("vi:Xin chào Beanie".encode("utf-8"))
+        assert len(synth.calls) == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 2
+
+    def test_key_normalizes_text(self):
+        """Whitespace and Unicode composition do not change the key; the language does."""
+        assert cache_key("Xin  chào\tBeanie ", "vi") == cache_key("Xin chào Beanie", "vi")
+        assert cache_key("hello", "vi") != cache_key("hello", "en")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_synthesis(self, tmp_path):
+        synth = FakeSynth(delay=0.05)
+        cache = TTSCache(str(tmp_path), max_bytes=10_000, synthesize=synth)
+
+        results = await asyncio.gather(*(cache.get_path("Xin chào", "vi") for _ in range(5)))
+
+        assert len(synth.calls) == 1
+        assert len(set(results)) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_synthesis_leaves_no_files(self, tmp_path):
+        def failing(text, lang, path):
+            open(path, "wb").close()
+            raise RuntimeError("gTTS unavailable")
+
+        cache = TTSCache(str(tmp_path), max_bytes=10_000, synthesize=failing)
+        with pytest.raises(RuntimeError):
+            await cache.get_path("Xin chào", "vi")
+
+        assert os.listdir(tmp_path) == []
+        assert cache.stats()["clips"] == 0
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_over_budget(self, tmp_path):
+        synth = FakeSynth(size=100)
+        cache = TTSCache(str(tmp_path), max_bytes=250, synthesize=synth)
+
+        a = await cache.get_path("a", "vi")
+        b = await cache.get_path("b", "vi")
+        open(opus_path_for(b), "wb").close()
+        await cache.get_path("a", "vi")  # b is now least recently used
+        c = await cache.get_path("c", "vi")
+
+        assert os.path.exists(a) and os.path.exists(c)
+        assert not os.path.exists(b)
+        assert not os.path.exists(opus_path_for(b))
+        assert cache.stats()["disk_bytes"] == 200
+
+    @pytest.mark.asyncio
+    async def test_reloads_index_from_disk(self, tmp_path):
+        synth = FakeSynth()
+        cache = TTSCache(str(tmp_path), max_bytes=10_000, synthesize=synth)
+        await cache.get_path("Xin chào A", "vi")
+        await cache.get_path("Xin chào B", "vi")
+        (tmp_path / "stale.mp3.1.tmp").write_bytes(b"partial")
+
+        reloaded = TTSCache(str(tmp_path), max_bytes=10_000, synthesize=synth)
+        await reloaded.get_path("Xin chào A", "vi")
+
+        assert len(synth.calls) == 2
+        assert reloaded.stats()["clips"] == 2
+        assert not (tmp_path / "stale.mp3.1.tmp").exists()
+
+    @pytest.mark.asyncio
+    async def test_opus_packet_files_count_against_budget(self, tmp_path):
+        synth = FakeSynth(size=100)
+        cache = TTSCache(str(tmp_path), max_bytes=300, synthesize=synth)
+
+        a = await cache.get_path("a", "vi")
+        b = await cache.get_path("b", "vi")
+        with open(opus_path_for(b), "wb") as f:
+            f.write(b"\0" * 150)
+        cache.refresh(b)
+
+        assert not os.path.exists(a)
+        assert os.path.exists(b) and os.path.exists(opus_path_for(b))
+        assert cache.stats()["disk_bytes"] == 250
+
+        # The packet file is counted again when the index is rebuilt
+        assert TTSCache(str(tmp_path), max_bytes=300, synthesize=synth).stats()["disk_bytes"] == 250
@@ -0,0 +1,251 @@
+"""
+Unit tests for voice connections and per-guild audio scheduling.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from core.voice_playback import PRIORITY_ENTRANCE, PRIORITY_SAY, AudioScheduler, VoiceConnectionManager
+
+
+class FakeVoiceClient:
+    """Voice client that finishes each source on the next loop turn, like discord.py's player thread."""
+
+    def __init__(self, guild, channel, finishes=True):
+        self.guild = guild
+        self.channel = channel
+        self.finishes = finishes
+        self.connected = True
+        self.played = []
+        self.stopped = 0
+        self._after = None
+        self.move_to = AsyncMock(side_effect=self._move)
+        self.disconnect = AsyncMock(side_effect=self._disconnect)
+
+    async def _move(self, channel):
+        self.channel = channel
+
+    async def _disconnect(self):
+        self.connected = False
+        self.guild.voice_client = None
+
+    def is_connected(self):
+        return self.connected
+
+    def play(self, source, after=None):
+        self.played.append((self.channel.id, source))
+        self._after = after
+        if self.finishes:
+            asyncio.get_running_loop().call_soon(self._end, None)
+
+    def _end(self, error):
+        after, self._after = self._after, None
+        if after is not None:
+            after(error)
+
+    def is_playing(self):
+        return self._after is not None
+
+    def stop(self):
+        self.stopped += 1
+        self._end(None)
+
+
+def _guild(guild_id=1):
+    guild = MagicMock(id=guild_id)
+    guild.voice_client = None
+    return guild
+
+
+def _channel(guild, channel_id):
+    channel = MagicMock(id=channel_id)
+
+    async def connect():
+        guild.voice_client = FakeVoiceClient(guild, channel)
+        return guild.voice_client
+
+    channel.connect = AsyncMock(side_effect=connect)
+    return channel
+
+
+@pytest.mark.unit
+class TestVoiceConnectionManager:
+    @pytest.mark.asyncio
+    async def test_reuses_connection_and_moves_between_channels(self):
+        manager = VoiceConnectionManager(idle_timeout=60)
+        guild = _guild()
+        first, second = _channel(guild, 10), _channel(guild, 20)
+
+        await manager.play(guild, first, "a")
+        await manager.play(guild, first, "b")
+        await manager.play(guild, second, "c")
+
+        assert first.connect.await_count == 1
+        assert second.connect.await_count == 0
+        voice_client = guild.voice_client
+        voice_client.move_to.assert_awaited_once_with(second)
+        assert voice_client.played == [(10, "a"), (10, "b"), (20, "c")]
+        voice_client.disconnect.assert_not_awaited()
+        await manager.close([guild])
+        voice_client.disconnect.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_disconnects_after_idle_timeout(self):
+        manager = VoiceConnectionManager(idle_timeout=0.01)
+        guild = _guild()
+        channel = _channel(guild, 10)
+
+        await manager.play(guild, channel, "a")
+        voice_client = guild.voice_client
+        await asyncio.sleep(0.05)
+
+        voice_client.disconnect.assert_awaited_once()
+        assert guild.voice_client is None
+        assert manager.idle_tasks == {}
+
+        # The next sound reconnects
+        await manager.play(guild, channel, "b")
+        assert channel.connect.await_count == 2
+        await manager.close([guild])
+
+    @pytest.mark.asyncio
+    async def test_plays_in_order_per_guild(self):
+        manager = VoiceConnectionManager(idle_timeout=60)
+        guild = _guild()
+        channel = _channel(guild, 10)
+
+        await asyncio.gather(*(manager.play(guild, channel, name) for name in "abc"))
+
+        assert [source for _, source in guild.voice_client.played] == ["a", "b", "c"]
+        await manager.close([guild])
+
+    @pytest.mark.asyncio
+    async def test_failed_connect_cleans_up_source(self):
+        manager = VoiceConnectionManager(idle_timeout=60)
+        guild = _guild()
+        channel = MagicMock(id=10, connect=AsyncMock(side_effect=asyncio.TimeoutError()))
+        source = MagicMock()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await manager.play(guild, channel, source)
+
+        source.cleanup.assert_called_once()
+        await manager.close([guild])
+
+    @pytest.mark.asyncio
+    async def test_playback_errors_and_timeouts_reach_caller(self):
+        manager = VoiceConnectionManager(idle_timeout=60, play_timeout=0.01)
+        guild = _guild()
+        channel = _channel(guild, 10)
+        await manager.play(guild, channel, "warmup")
+        voice_client = guild.voice_client
+
+        # The player thread reports a failure through after=
+        voice_client.finishes = False
+        play = asyncio.create_task(manager.play(guild, channel, MagicMock()))
+        await asyncio.sleep(0)
+        voice_client._end(RuntimeError("opus error"))
+        with pytest.raises(RuntimeError):
+            await play
+
+        # A source that never ends is stopped
+        with pytest.raises(asyncio.TimeoutError):
+            await manager.play(guild, channel, MagicMock())
+        assert voice_client.stopped == 1
+        await manager.close([guild])
+
+
+class RecordingConnections:
+    """Stands in for VoiceConnectionManager; each play takes one loop turn."""
+
+    def __init__(self):
+        self.played = []
+
+    async def play(self, guild, channel, source):
+        self.played.append((guild.id, channel.id, source))
+        await asyncio.sleep(0)
+
+    async def close(self, guilds):
+        pass
+
+
+def _load(value):
+    async def load():
+        return value
+    return load
+
+
+@pytest.mark.unit
+class TestAudioScheduler:
+    @pytest.mark.asyncio
+    async def test_entrances_jump_ahead_of_queued_say(self):
+        connections = RecordingConnections()
+        scheduler = AudioScheduler(connections, max_wait={})
+        guild, channel = _guild(), MagicMock(id=10)
+
+        futures = [
+            scheduler.submit(guild, channel, _load("say1"), priority=PRIORITY_SAY),
+            scheduler.submit(guild, channel, _load("say2"), priority=PRIORITY_SAY),
+            scheduler.submit(guild, channel, _load("hello"), priority=PRIORITY_ENTRANCE),
+        ]
+
+        assert await asyncio.gather(*futures) == [True, True, True]
+        assert [source for _, _, source in connections.played] == ["hello", "say1", "say2"]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_entrances_coalesce(self):
+        connections = RecordingConnections()
+        scheduler = AudioScheduler(connections, max_wait={})
+        guild = _guild()
+
+        first = scheduler.submit(guild, MagicMock(id=10), _load("old"), priority=PRIORITY_ENTRANCE, key=("entrance", 5))
+        second = scheduler.submit(guild, MagicMock(id=20), _load("new"), priority=PRIORITY_ENTRANCE, key=("entrance", 5))
+
+        assert first is second
+        assert await first
+        assert connections.played == [(1, 20, "new")]
+
+    @pytest.mark.asyncio
+    async def test_drops_sounds_past_max_wait_and_limits_queue(self):
+        clock = MagicMock(return_value=0.0)
+        connections = RecordingConnections()
+        scheduler = AudioScheduler(connections, max_wait={PRIORITY_ENTRANCE: 5.0},
+                                   queue_limits={PRIORITY_ENTRANCE: 1}, clock=clock)
+        guild, channel = _guild(), MagicMock(id=10)
+
+        stale = scheduler.submit(guild, channel, _load("stale"), priority=PRIORITY_ENTRANCE)
+        with pytest.raises(asyncio.QueueFull):
+            scheduler.submit(guild, channel, _load("extra"), priority=PRIORITY_ENTRANCE)
+        clock.return_value = 6.0
+
+        assert await stale is False
+        assert connections.played == []
+
+    @pytest.mark.asyncio
+    async def test_guilds_play_concurrently_and_errors_reach_caller(self):
+        release = asyncio.Event()
+        connections = RecordingConnections()
+        scheduler = AudioScheduler(connections, max_wait={})
+        busy, other, channel = _guild(1), _guild(2), MagicMock(id=10)
+
+        async def slow_load():
+            await release.wait()
+            return "slow"
+
+        async def failing_load():
+            raise RuntimeError("gTTS unavailable")
+
+        slow = scheduler.submit(busy, channel, slow_load)
+        assert await scheduler.submit(other, channel, _load("fast"))
+        assert connections.played == [(2, 10, "fast")]
+
+        failed = scheduler.submit(other, channel, failing_load)
+        with pytest.raises(RuntimeError):
+            await failed
+
+        release.set()
+        assert await slow
+        skipped = scheduler.submit(other, channel, _load(None))
+        assert await skipped is False
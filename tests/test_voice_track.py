@@ -1,19 +1,27 @@
 """
 Unit tests for Voice Tracking feature module.
 """
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from core.edit_scheduler import EditScheduler
+from core.tts_cache import TTSCache
 from features.voice_track import VoiceTrackingFeature
 from tests.conftest import TEST_GUILD_ID
 
 
+def _fake_synthesize(text, lang, path):
+    with open(path, "wb") as f:
+        f.write(f"{lang}:{text}".encode())
+
+
 @pytest.mark.unit
 class TestVoiceTrackingFeature:
     """Test suite for VoiceTrackingFeature cog."""
     
     @pytest.fixture
-    def voice_feature(self, mock_bot, mock_config):
+    def voice_feature(self, mock_bot, mock_config, tmp_path):
         """Create VoiceTrackingFeature instance with mocked dependencies."""
         # Patch all task loops and async task creation to prevent them from starting
         with patch.multiple(
@@ -24,7 +32,10 @@ class TestVoiceTrackingFeature:
             voice_checkpoint=MagicMock(start=MagicMock(), cancel=MagicMock())
         ):
             with patch('asyncio.create_task', return_value=AsyncMock()):
-                feature = VoiceTrackingFeature(mock_bot, "ffmpeg", mock_config)
+                with patch('features.voice_track.get_edit_scheduler', return_value=EditScheduler()):
+                    feature = VoiceTrackingFeature(mock_bot, "ffmpeg", mock_config)
+        # Keep synthesized clips out of data/ and off the network
+        feature.tts_cache = TTSCache(str(tmp_path / "tts_cache"), synthesize=_fake_synthesize)
         return feature
     
     def test_initialization(self, voice_feature, mock_bot, mock_config):
@@ -34,6 +45,27 @@ class TestVoiceTrackingFeature:
         assert voice_feature.ffmpeg_exec == "ffmpeg"
         assert voice_feature.voice_join_times == {}
     
+    @pytest.mark.asyncio
+    async def test_startup_tasks_start_on_cog_load_and_stop_on_unload(self, voice_feature):
+        """Startup work begins in cog_load and its task handles are cancelled on unload."""
+        started = asyncio.Event()
+
+        async def wait_forever():
+            started.set()
+            await asyncio.Event().wait()
+
+        assert voice_feature.startup_tasks == []
+        with patch.object(voice_feature, 'reconcile_voice_sessions', wait_forever), \
+                patch.object(voice_feature, 'prewarm_entrance_tts', wait_forever):
+            await voice_feature.cog_load()
+            await started.wait()
+
+        tasks = list(voice_feature.startup_tasks)
+        assert len(tasks) == 2 and not any(task.done() for task in tasks)
+        voice_feature.cog_unload()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(task.cancelled() for task in tasks)
+
     def test_load_voice_stats_empty(self, voice_feature):  
         """Test loading voice stats when none stored."""
         result = voice_feature.load_voice_stats(TEST_GUILD_ID)
@@ -41,14 +73,14 @@ class TestVoiceTrackingFeature:
     
     def test_load_voice_stats_with_data(self, voice_feature):
         """Test loading voice stats from storage."""
-        test_data = {"123456": 3600, "789012": 7200}
+        test_data = {123456: 3600, 789012: 7200}
         voice_feature.save_voice_stats(TEST_GUILD_ID, test_data)
         result = voice_feature.load_voice_stats(TEST_GUILD_ID)
         assert result == test_data
     
     def test_save_voice_stats(self, voice_feature):
         """Test saving voice stats via storage."""
-        test_data = {"123456": 3600}
+        test_data = {123456: 3600}
         voice_feature.save_voice_stats(TEST_GUILD_ID, test_data)
         result = voice_feature.load_voice_stats(TEST_GUILD_ID)
         assert result == test_data
@@ -75,6 +107,41 @@ class TestVoiceTrackingFeature:
         assert "/entry" in str(perks)
         assert mult == 4.0
     
+    def test_rank_table_uses_guild_thresholds_and_role_ids(self, voice_feature, mock_config):
+        """Guild thresholds and role IDs drive lookups; the cached table refreshes on config saves."""
+        guild_config = mock_config.get_guild_config(TEST_GUILD_ID)
+        assert voice_feature.get_user_rank(20, TEST_GUILD_ID) == ("Bronze", 1002, [], 1.2)
+        assert voice_feature.get_user_rank(19.99, TEST_GUILD_ID).name == "Iron"
+        assert voice_feature.get_rank_role_id_for_guild(TEST_GUILD_ID, "Legendary") == 1009
+        assert voice_feature.get_rank_role_id_for_guild(TEST_GUILD_ID, "Unknown") is None
+
+        guild_config.get_rank_thresholds.return_value = [0, 5, 10, 15, 20, 25, 30, 35, 40]
+        assert voice_feature.get_user_rank(20, TEST_GUILD_ID).name == "Bronze"  # Cached until a save
+        guild_config.version += 1
+        assert voice_feature.get_user_rank(20, TEST_GUILD_ID).name == "Platinum"
+        assert not voice_feature.note_rank_transition(TEST_GUILD_ID, 1, 21 * 3600, 24 * 3600)
+        assert voice_feature.note_rank_transition(TEST_GUILD_ID, 1, 24 * 3600, 25 * 3600)
+
+    @pytest.mark.asyncio
+    async def test_rank_thresholds_replies_before_the_role_sweep(self, voice_feature, mock_interaction):
+        """Setting thresholds answers right away; the role sweep runs as a tracked background task."""
+        sweep_started = asyncio.Event()
+
+        async def sweep(guild):
+            assert mock_interaction.followup.send.await_count == 1
+            sweep_started.set()
+            await asyncio.Event().wait()
+
+        with patch.object(voice_feature, 'apply_rank_roles_to_guild', sweep):
+            await voice_feature.rank_thresholds_cmd.callback(voice_feature, mock_interaction, "0,5,10,15,20,25,30,35,40")
+            await sweep_started.wait()
+
+        assert "background" in mock_interaction.followup.send.call_args[0][0]
+        task = voice_feature.rank_sweep_tasks[TEST_GUILD_ID]
+        voice_feature.cog_unload()
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+
     def test_checkpoint_voice_stats_no_active_users(self, voice_feature):
         """Test checkpointing with no users in voice."""
         voice_feature.voice_join_times = {}
@@ -93,32 +160,36 @@ class TestVoiceTrackingFeature:
         
         voice_feature.voice_join_times = {
             TEST_GUILD_ID: {
-                "123456": now - 3600,  # User joined 1 hour ago
-                "789012": now - 1800   # User joined 30 minutes ago
+                123456: now - 3600,  # User joined 1 hour ago
+                789012: now - 1800   # User joined 30 minutes ago
             }
         }
         
-        with patch.object(voice_feature, 'load_voice_stats', return_value={"123456": 7200}):
-            with patch.object(voice_feature, 'save_voice_stats') as mock_save:
-                with patch('time.time', return_value=now):
-                    voice_feature.checkpoint_voice_stats(TEST_GUILD_ID)
-                    
-                    # Should save updated stats
-                    mock_save.assert_called_once()
-                    # guild_id is first param, data is second
-                    saved_data = mock_save.call_args[0][1]
-                    
-                    # User 123456 should have 7200 + ~3600 seconds
-                    assert saved_data["123456"] >= 10800
-                    # User 789012 should have ~1800 seconds
-                    assert saved_data["789012"] >= 1800
+        voice_feature.save_voice_stats(TEST_GUILD_ID, {123456: 7200})
+        with patch.object(voice_feature, 'save_voice_stats') as mock_save:
+            with patch('time.time', return_value=now):
+                voice_feature.checkpoint_voice_stats(TEST_GUILD_ID)
+                
+                # Should write per-user deltas, never the whole table
+                mock_save.assert_not_called()
+                saved_data = voice_feature.load_voice_stats(TEST_GUILD_ID)
+                
+                # User 123456 should have 7200 + ~3600 seconds
+                assert saved_data[123456] >= 10800
+                # User 789012 should have ~1800 seconds
+                assert saved_data[789012] >= 1800
+                
+                # Coins were credited for both users in the same checkpoint
+                storage = voice_feature._get_storage()
+                assert storage.get_balance(TEST_GUILD_ID, 123456) > 0
+                assert storage.get_balance(TEST_GUILD_ID, 789012) > 0
     
     @pytest.mark.asyncio
     async def test_say_cmd_insufficient_rank(self, voice_feature, mock_interaction):
         """Test /say command fails for users below Gold rank."""
         mock_interaction.user.id = 123456
         
-        with patch.object(voice_feature, 'load_voice_stats', return_value={"123456": 0}):
+        with patch.object(voice_feature, 'load_voice_stats', return_value={123456: 0}):
             await voice_feature.say_cmd.callback(voice_feature, mock_interaction, "test message")
             
             # Should reject with rank error
@@ -134,7 +205,7 @@ class TestVoiceTrackingFeature:
         mock_interaction.user.voice = None
         
         # Give user Gold rank (30+ hours)
-        with patch.object(voice_feature, 'load_voice_stats', return_value={"123456": 252000}):
+        with patch.object(voice_feature, 'load_voice_stats', return_value={123456: 252000}):
             await voice_feature.say_cmd.callback(voice_feature, mock_interaction, "test message")
             
             # Should reject because not in voice
@@ -149,7 +220,7 @@ class TestVoiceTrackingFeature:
         
         long_message = "a" * 51
         
-        with patch.object(voice_feature, 'load_voice_stats', return_value={"123456": 252000}):
+        with patch.object(voice_feature, 'load_voice_stats', return_value={123456: 252000}):
             await voice_feature.say_cmd.callback(voice_feature, mock_interaction, long_message)
             
             mock_interaction.followup.send.assert_called_once()
@@ -161,7 +232,7 @@ class TestVoiceTrackingFeature:
         mock_interaction.user.id = 123456
         mock_interaction.user.voice = MagicMock()
         
-        with patch.object(voice_feature, 'load_voice_stats', return_value={"123456": 252000}):
+        with patch.object(voice_feature, 'load_voice_stats', return_value={123456: 252000}):
             with patch('time.time', return_value=1000):
                 await voice_feature.say_cmd.callback(voice_feature, mock_interaction, "test message")
                 
@@ -184,18 +255,14 @@ class TestVoiceTrackingFeature:
         mock_bot.get_channel.return_value = mock_category
         
         with patch.object(voice_feature, 'load_competitors', return_value={}):
-            with patch.object(voice_feature, 'save_competitors') as mock_save:
-                with patch.object(voice_feature, 'load_voice_stats', return_value={"123456": 3600}):
-                    with patch.object(voice_feature, 'save_voice_stats'):
-                        await voice_feature.rank_cmd.callback(voice_feature, mock_interaction, action="add", user=None)
-                        
-                        # Should create channel and save competitor
-                        mock_category.create_voice_channel.assert_called_once()
-                        mock_save.assert_called_once()
-                        
-                        # guild_id is first param, data is second
-                        saved_data = mock_save.call_args[0][1]
-                        assert "123456" in saved_data
+            with patch.object(voice_feature, 'set_competitor') as mock_set:
+                with patch.object(voice_feature, 'add_voice_seconds', return_value=3600) as mock_add:
+                    await voice_feature.rank_cmd.callback(voice_feature, mock_interaction, action="add", user=None)
+                    
+                    # Should create channel and save competitor
+                    mock_category.create_voice_channel.assert_called_once()
+                    mock_add.assert_called_once_with(TEST_GUILD_ID, 123456, 0)
+                    mock_set.assert_called_once_with(TEST_GUILD_ID, 123456, 999888)
     
     @pytest.mark.asyncio
     async def test_on_voice_state_update_join(self, voice_feature, mock_member):
@@ -211,15 +278,44 @@ class TestVoiceTrackingFeature:
         after.channel.id = 999
         
         with patch('time.time', return_value=1000):
-            with patch.object(voice_feature, 'load_competitors', return_value={"123456": "999"}):
-                with patch.object(voice_feature, 'load_voice_stats', return_value={}):
+            with patch.object(voice_feature, 'aload_competitors', new_callable=AsyncMock, return_value={123456: 999}):
+                with patch.object(voice_feature, 'aload_voice_stats', new_callable=AsyncMock, return_value={}):
                     await voice_feature.on_voice_state_update(mock_member, before, after)
                     
                     # Should track join time under the correct guild
                     assert TEST_GUILD_ID in voice_feature.voice_join_times
-                    assert "123456" in voice_feature.voice_join_times[TEST_GUILD_ID]
-                    assert voice_feature.voice_join_times[TEST_GUILD_ID]["123456"] == 1000
+                    assert 123456 in voice_feature.voice_join_times[TEST_GUILD_ID]
+                    assert voice_feature.voice_join_times[TEST_GUILD_ID][123456] == 1000
     
+    @pytest.mark.asyncio
+    async def test_reconcile_voice_sessions_resumes_from_checkpoint(self, voice_feature, mock_bot, mock_config):
+        """Startup reconcile resumes crashed sessions from their checkpoint and drops stale ones."""
+        storage = mock_config.get_storage()
+        storage.open_voice_session(TEST_GUILD_ID, 1, 999, 1000)
+        storage.apply_voice_checkpoint(TEST_GUILD_ID, [(1, 300.0)], [], [(1, 999, 1000, 1300)])
+        storage.open_voice_session(TEST_GUILD_ID, 2, 999, 1000)  # left while the bot was down
+        storage.open_voice_session(777, 5, 1, 1000)  # guild the bot has left
+
+        def in_channel(channel_id):
+            state = MagicMock()
+            state.channel.id = channel_id
+            return state
+
+        guild = MagicMock()
+        guild.id = TEST_GUILD_ID
+        guild.voice_states = {1: in_channel(999), 3: in_channel(998), 4: in_channel(998)}
+        mock_bot.guilds = [guild]
+
+        with patch('time.time', return_value=1500):
+            with patch.object(voice_feature, 'aload_competitors', new_callable=AsyncMock, return_value={1: 0, 2: 0, 3: 0}):
+                await voice_feature.reconcile_voice_sessions()
+
+        assert voice_feature.voice_join_times[TEST_GUILD_ID] == {1: 1300, 3: 1500}
+        assert voice_feature.voice_join_channels[TEST_GUILD_ID] == {1: 999, 3: 998}
+        assert storage.load_open_voice_sessions() == {
+            TEST_GUILD_ID: {1: (999, 1000, 1300), 3: (998, 1500, 1500)}
+        }
+
     @pytest.mark.asyncio
     async def test_on_voice_state_update_leave(self, voice_feature, mock_member):
         """Test saving stats when competitor leaves voice channel."""
@@ -229,28 +325,167 @@ class TestVoiceTrackingFeature:
         # User was in voice for 1 hour (guild-scoped)
         voice_feature.voice_join_times = {
             TEST_GUILD_ID: {
-                "123456": 1000
+                123456: 1000
             }
         }
         
+        storage = voice_feature._get_storage()
+        storage.open_voice_session(TEST_GUILD_ID, 123456, 999, 1000)
+        
         before = MagicMock()
-        before.channel = MagicMock()
+        before.channel.id = 999
         
         after = MagicMock()
         after.channel = None
         
         with patch('time.time', return_value=4600):  # 1 hour later
-            with patch.object(voice_feature, 'load_competitors', return_value={"123456": "999"}):
-                with patch.object(voice_feature, 'load_voice_stats', return_value={"123456": 0}):
-                    with patch.object(voice_feature, 'save_voice_stats') as mock_save:
-                        await voice_feature.on_voice_state_update(mock_member, before, after)
-                        
-                        # Should save ~1 hour (3600 seconds)
-                        mock_save.assert_called_once()
-                        # guild_id is first param, data is second
-                        saved_data = mock_save.call_args[0][1]
-                        assert saved_data["123456"] >= 3600
+            with patch.object(voice_feature, 'aload_competitors', new_callable=AsyncMock, return_value={123456: 999}):
+                with patch.object(storage, 'record_voice_leave', wraps=storage.record_voice_leave) as mock_leave:
+                    await voice_feature.on_voice_state_update(mock_member, before, after)
+        
+        # Seconds, session and coins are written by one storage call
+        mock_leave.assert_called_once()
+        assert storage.load_voice_stats(TEST_GUILD_ID) == {123456: 3600}
+        assert storage.load_open_voice_sessions() == {}
+        assert storage.voice_seconds_between(TEST_GUILD_ID, 0, 5000) == {123456: 3600}
+        assert storage.get_balance(TEST_GUILD_ID, 123456) > 0
     
+    @pytest.mark.asyncio
+    async def test_on_voice_state_update_move(self, voice_feature, mock_member):
+        """A channel move credits the old channel's segment and keeps tracking in the new one."""
+        mock_member.id = 123456
+        mock_member.guild.id = TEST_GUILD_ID
+        voice_feature.voice_join_times = {TEST_GUILD_ID: {123456: 1000}}
+        voice_feature.voice_join_channels = {TEST_GUILD_ID: {123456: 999}}
+        storage = voice_feature._get_storage()
+        storage.open_voice_session(TEST_GUILD_ID, 123456, 999, 1000)
+
+        before = MagicMock()
+        before.channel.id = 999
+        after = MagicMock()
+        after.channel.id = 998
+        with patch('time.time', return_value=2800):
+            with patch.object(voice_feature, 'aload_competitors', new_callable=AsyncMock, return_value={123456: 999}):
+                await voice_feature.on_voice_state_update(mock_member, before, after)
+
+        assert voice_feature.voice_join_times[TEST_GUILD_ID] == {123456: 2800}
+        assert voice_feature.voice_join_channels[TEST_GUILD_ID] == {123456: 998}
+        assert storage.load_voice_stats(TEST_GUILD_ID) == {123456: 1800}
+        assert storage.load_open_voice_sessions() == {TEST_GUILD_ID: {123456: (998, 2800, 2800)}}
+        assert storage.voice_seconds_between(TEST_GUILD_ID, 0, 5000) == {123456: 1800}
+
+    @pytest.mark.asyncio
+    async def test_voice_activity_command(self, voice_feature, mock_interaction):
+        """/voice_activity lists this week's top members, peak hours and daily totals from the roll-ups."""
+        storage = voice_feature._get_storage()
+        member = MagicMock()
+        member.display_name = "Alice"
+        mock_interaction.guild.get_member = MagicMock(side_effect=lambda uid: member if uid == 1 else None)
+
+        with patch.object(storage, 'avoice_seconds_between', new_callable=AsyncMock, return_value={1: 7200.0, 2: 1800.0}), \
+             patch.object(storage, 'avoice_peak_hours', new_callable=AsyncMock, return_value=[(21, 5400.0), (9, 3600.0)]), \
+             patch.object(storage, 'avoice_daily_totals', new_callable=AsyncMock, return_value={"2026-04-06": 9000.0}):
+            await voice_feature.voice_activity_cmd.callback(voice_feature, mock_interaction)
+
+        message = mock_interaction.followup.send.call_args[0][0]
+        assert "#1 Alice: 2.0h" in message
+        assert "#2 <@2>: 0.5h" in message
+        assert "21:00 (1.5h)" in message
+        assert "06/04 2.5h" in message
+
+    @pytest.mark.asyncio
+    async def test_voice_activity_command_empty_week(self, voice_feature, mock_interaction):
+        """/voice_activity says so when nothing has been rolled up this week."""
+        await voice_feature.voice_activity_cmd.callback(voice_feature, mock_interaction)
+        assert "No voice activity" in mock_interaction.followup.send.call_args[0][0]
+
+    @staticmethod
+    def _rank_member(user_id, role_ids):
+        """Member mock holding @everyone, an unrelated role and the given rank roles."""
+        def role(role_id, default=False):
+            r = MagicMock(id=role_id)
+            r.is_default.return_value = default
+            return r
+
+        member = MagicMock(id=user_id)
+        member.roles = [role(TEST_GUILD_ID, default=True), role(42)] + [role(rid) for rid in role_ids]
+        member.guild.id = TEST_GUILD_ID
+        member.guild.get_role.side_effect = role
+        member.edit = AsyncMock()
+        return member
+
+    @pytest.mark.asyncio
+    async def test_leave_crossing_rank_boundary_syncs_roles_in_one_edit(self, voice_feature):
+        """A leave that moves a user from Iron to Bronze swaps rank roles with a single member.edit."""
+        member = self._rank_member(123456, [1001])
+        member.guild.get_member.return_value = member
+        voice_feature.voice_join_times = {TEST_GUILD_ID: {123456: 1000}}
+        storage = voice_feature._get_storage()
+        storage.save_competitors(TEST_GUILD_ID, {123456: 999})
+        storage.set_voice_seconds(TEST_GUILD_ID, 123456, 19 * 3600)
+
+        before = MagicMock()
+        before.channel.id = 999
+        after = MagicMock()
+        after.channel = None
+        with patch('time.time', return_value=1000 + 2 * 3600):
+            await voice_feature.on_voice_state_update(member, before, after)
+        member.edit.assert_not_awaited()  # The role sync runs in the background
+        await voice_feature.rank_flush_tasks[TEST_GUILD_ID]
+
+        member.edit.assert_awaited_once()
+        assert [r.id for r in member.edit.call_args.kwargs["roles"]] == [42, 1002]
+        assert voice_feature.pending_rank_transitions == {}
+
+    @pytest.mark.asyncio
+    async def test_credit_within_rank_skips_role_sync(self, voice_feature):
+        """Seconds that stay inside the same rank bucket never touch roles."""
+        assert not voice_feature.note_rank_transition(TEST_GUILD_ID, 1, 21 * 3600, 39 * 3600)
+        assert voice_feature.note_rank_transition(TEST_GUILD_ID, 1, 39 * 3600, 41 * 3600)
+
+        member = self._rank_member(1, [1003])
+        guild = MagicMock(id=TEST_GUILD_ID)
+        guild.get_member.return_value = member
+        storage = voice_feature._get_storage()
+        storage.save_competitors(TEST_GUILD_ID, {1: 999})
+        storage.set_voice_seconds(TEST_GUILD_ID, 1, 41 * 3600)
+        await voice_feature.flush_rank_transitions(guild)
+        member.edit.assert_not_called()  # Already holds the Silver role
+
+    @pytest.mark.asyncio
+    async def test_deferred_role_edits_stay_queued(self, voice_feature):
+        """Edits the scheduler defers are retried by the next flush instead of being lost."""
+        voice_feature.note_rank_transition(TEST_GUILD_ID, 1, 19 * 3600, 21 * 3600)
+        member = self._rank_member(1, [1001])
+        guild = MagicMock(id=TEST_GUILD_ID)
+        guild.get_member.return_value = member
+        storage = voice_feature._get_storage()
+        storage.save_competitors(TEST_GUILD_ID, {1: 999})
+        storage.set_voice_seconds(TEST_GUILD_ID, 1, 21 * 3600)
+
+        with patch.object(voice_feature.edit_scheduler, 'run', new_callable=AsyncMock, return_value=False):
+            await voice_feature.flush_rank_transitions(guild)
+        assert voice_feature.pending_rank_transitions == {TEST_GUILD_ID: {1}}
+
+        await voice_feature.flush_rank_transitions(guild)
+        member.edit.assert_awaited_once()
+        assert voice_feature.pending_rank_transitions == {}
+
+    @pytest.mark.asyncio
+    async def test_repair_sweep_edits_only_wrong_members(self, voice_feature):
+        """The full sweep strips rank roles from non-competitors and leaves correct members alone."""
+        correct = self._rank_member(1, [1001])
+        outsider = self._rank_member(2, [1005])
+        guild = MagicMock(id=TEST_GUILD_ID)
+        guild.members = [correct, outsider]
+        voice_feature._get_storage().save_competitors(TEST_GUILD_ID, {1: 999})
+
+        await voice_feature.apply_rank_roles_to_guild(guild)
+
+        correct.edit.assert_not_called()
+        outsider.edit.assert_awaited_once()
+        assert [r.id for r in outsider.edit.call_args.kwargs["roles"]] == [42]
+
     @pytest.mark.asyncio
     async def test_rank_cmd_set_not_admin(self, voice_feature, mock_interaction):
         """Test /rank set fails if user is not admin."""
@@ -306,14 +541,12 @@ class TestVoiceTrackingFeature:
         mock_user.display_name = "TestUser"
         
         # User currently has 36000 seconds (10 hours)
-        with patch.object(voice_feature, 'load_voice_stats', return_value={"789012": 36000}):
-            with patch.object(voice_feature, 'save_voice_stats') as mock_save:
+        with patch.object(voice_feature, 'load_voice_stats', return_value={789012: 36000}):
+            with patch.object(voice_feature, 'set_voice_seconds') as mock_set:
                 await voice_feature.rank_cmd.callback(voice_feature, mock_interaction, action="set", user=mock_user, seconds=180000)
                 
                 # Should save new hours
-                mock_save.assert_called_once()
-                saved_data = mock_save.call_args[0][1]
-                assert saved_data["789012"] == 180000
+                mock_set.assert_called_once_with(TEST_GUILD_ID, 789012, 180000)
                 
                 # Should confirm update
                 mock_interaction.followup.send.assert_called_once()
@@ -350,7 +583,7 @@ class TestVoiceTrackingFeature:
         guild_config = mock_config.get_guild_config(TEST_GUILD_ID)
         
         # Mock the archived stats
-        archived_stats = {"123456": 264000, "789012": 216000}  # Archived from March
+        archived_stats = {123456: 264000, 789012: 216000}  # Archived from March
         
         with patch.object(voice_feature, 'load_previous_month_archived_stats', return_value=archived_stats):
             with patch.object(voice_feature, 'checkpoint_voice_stats'):
@@ -367,15 +600,13 @@ class TestVoiceTrackingFeature:
                                         mock_now.strftime.return_value = "01/04/2026 00:48"
                                         mock_datetime.now.return_value = mock_now
                                         
-                                        with patch.object(voice_feature, '_get_storage'):
+                                        with patch.object(voice_feature, '_get_storage') as mock_get_storage:
                                             await voice_feature.admin_force_reset_cmd.callback(voice_feature, mock_interaction)
                                             
-                                            # Should save reset stats (all 0)
-                                            mock_save.assert_called_once()
-                                            saved_data = mock_save.call_args[0][1]
-                                            # All values should be 0
-                                            for value in saved_data.values():
-                                                assert value == 0
+                                            # Should archive March and zero the counters in one storage call
+                                            mock_get_storage.return_value.reset_voice_month.assert_called_once_with(TEST_GUILD_ID, 2026, 3)
+                                            # The table is no longer rewritten
+                                            mock_save.assert_not_called()
                                             
                                             # Should send hall of fame message
                                             mock_interaction.followup.send.assert_called()
@@ -388,10 +619,13 @@ class TestVoiceTrackingFeature:
         mock_guild.id = TEST_GUILD_ID
         mock_bot.guilds = [mock_guild]
         
-        mock_channel = AsyncMock()
-        mock_channel.id = 999
-        mock_channel.edit = AsyncMock()
-        mock_bot.get_channel.return_value = mock_channel
+        channels = {}
+        for channel_id, position in ((999, 0), (998, 1)):
+            channel = MagicMock(id=channel_id, position=position)
+            channel.name = f"Rank channel {channel_id}"
+            channel.edit = AsyncMock()
+            channels[channel_id] = channel
+        mock_bot.get_channel.side_effect = channels.get
         
         # Guild member with nickname different from global name
         mock_guild_member = MagicMock()
@@ -400,12 +634,12 @@ class TestVoiceTrackingFeature:
         
         # Competitors and stats
         competitors = {
-            "123456": "999",  # user_id: channel_id
-            "789012": "998"
+            123456: 999,  # user_id: channel_id
+            789012: 998
         }
         stats = {
-            "123456": 36000,  # 10h
-            "789012": 18000   # 5h
+            123456: 36000,  # 10h
+            789012: 18000   # 5h
         }
         
         with patch.object(voice_feature, 'load_competitors', return_value=competitors):
@@ -417,10 +651,40 @@ class TestVoiceTrackingFeature:
         mock_guild.get_member.assert_called()
         
         # Verify channel was updated with guild nickname
-        mock_channel.edit.assert_called()
-        channel_name_arg = mock_channel.edit.call_args[1]['name']
+        channels[999].edit.assert_called()
+        channel_name_arg = channels[999].edit.call_args[1]['name']
         assert "GuildNickname" in channel_name_arg
     
+    @pytest.mark.asyncio
+    async def test_leaderboard_skips_unchanged_channels(self, voice_feature, mock_bot):
+        """A refresh where nothing moved issues no channel edits."""
+        mock_guild = MagicMock()
+        mock_guild.id = TEST_GUILD_ID
+        mock_guild.get_member.return_value = None
+        mock_bot.guilds = [mock_guild]
+
+        channels = {}
+        for channel_id, name, position in ((999, "🥇 User123456: 10h", 3), (998, "🥈 User789012: 5h", 4)):
+            channel = MagicMock(id=channel_id, position=position)
+            channel.name = name
+            channel.edit = AsyncMock()
+            channels[channel_id] = channel
+        mock_bot.get_channel.side_effect = channels.get
+
+        competitors = {123456: 999, 789012: 998}
+        with patch.object(voice_feature, 'load_competitors', return_value=competitors):
+            with patch.object(voice_feature, 'checkpoint_voice_stats'):
+                with patch.object(voice_feature, 'load_voice_stats', return_value={123456: 36000, 789012: 18000}):
+                    await voice_feature.update_leaderboard()
+                for channel in channels.values():
+                    channel.edit.assert_not_called()
+
+                # 789012 overtakes 123456: both channels move and get renamed
+                with patch.object(voice_feature, 'load_voice_stats', return_value={123456: 36000, 789012: 40000}):
+                    await voice_feature.update_leaderboard()
+        channels[998].edit.assert_awaited_once_with(name="🥇 User789012: 11h", position=0)
+        channels[999].edit.assert_awaited_once_with(name="🥈 User123456: 10h", position=1)
+
     @pytest.mark.asyncio
     async def test_admin_force_reset_command(self, voice_feature, mock_interaction, mock_config, mock_bot):
         """Test /admin_force_reset command triggers manual reset (NEW FEATURE)."""
@@ -439,26 +703,26 @@ class TestVoiceTrackingFeature:
         mock_bot.get_channel.return_value = mock_general_channel
         
         # Setup stats and competitors
-        stats = {"123456": 36000, "789012": 0}  # 10h and 0h
-        competitors = {"123456": "999", "789012": "998"}
+        stats = {123456: 36000, 789012: 0}  # 10h and 0h
+        competitors = {123456: 999, 789012: 998}
         
         guild_config = mock_config.get_guild_config(TEST_GUILD_ID)
         guild_config.get_general_channel_id.return_value = 555
         
-        with patch.object(voice_feature, 'load_voice_stats', return_value=stats):
-            with patch.object(voice_feature, 'save_voice_stats') as mock_save_stats:
-                with patch.object(voice_feature, 'load_competitors', return_value=competitors):
-                    with patch.object(voice_feature, 'load_state', return_value={}):
-                        with patch.object(voice_feature, 'save_state'):
-                            with patch.object(voice_feature, 'apply_rank_roles_to_guild', new_callable=AsyncMock):
-                                with patch.object(voice_feature, 'update_leaderboard', new_callable=AsyncMock):
-                                    await voice_feature.admin_force_reset_cmd.callback(voice_feature, mock_interaction)
-        
-        # Verify stats were reset to 0
-        mock_save_stats.assert_called()
-        reset_data = mock_save_stats.call_args[0][1]
-        assert reset_data["123456"] == 0
-        assert reset_data["789012"] == 0
+        storage = voice_feature._get_storage()
+        storage.save_voice_stats(TEST_GUILD_ID, stats)
+        
+        with patch.object(voice_feature, 'load_competitors', return_value=competitors):
+            with patch.object(voice_feature, 'load_state', return_value={}):
+                with patch.object(voice_feature, 'save_state'):
+                    with patch.object(voice_feature, 'apply_rank_roles_to_guild', new_callable=AsyncMock):
+                        with patch.object(voice_feature, 'update_leaderboard', new_callable=AsyncMock):
+                            await voice_feature.admin_force_reset_cmd.callback(voice_feature, mock_interaction)
+        
+        # Verify stats were archived and reset to 0
+        assert storage.load_voice_stats(TEST_GUILD_ID) == {123456: 0, 789012: 0}
+        archives = storage._get(TEST_GUILD_ID, "voice_stats_archives", {})
+        assert list(archives.values()) == [{123456: 36000}]
         
         # Verify success message sent
         mock_interaction.followup.send.assert_called()
@@ -485,8 +749,8 @@ class TestVoiceTrackingFeature:
         mock_general_channel = AsyncMock()
         mock_guild.get_channel = MagicMock(return_value=mock_general_channel)
         
-        stats = {"123456": 36000}
-        competitors = {"123456": "999"}
+        stats = {123456: 36000}
+        competitors = {123456: 999}
         
         guild_config = mock_config.get_guild_config(TEST_GUILD_ID)
         guild_config.get_general_channel_id.return_value = 555